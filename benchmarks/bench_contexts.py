@@ -0,0 +1,128 @@
+"""
+会话查找基准测试
+多个线程同时查找（必要时创建）用户上下文，测量不同线程数下的查找吞吐（lookups/sec），结果以JSON输出
+
+对比四种实现：
+- global_lock：所有操作共用一把锁（分片之前的实现）
+- sharded_1：一个分片，查找已存在的上下文不加锁
+- sharded：默认分片数
+- sharded_ttl：默认分片数，启用空闲淘汰（每次查找更新访问时间和LRU顺序）
+每次操作以 --churn 的概率先移除一个用户再查找（触发创建），其余为查找已存在的用户。
+
+用法：python benchmarks/bench_contexts.py [--users 10000] [--operations 200000] [--threads 1 2 4 8 16 32]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import random
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.runtime.execution_context import ContextManager, ExecutionContext
+
+
+class GlobalLockContextManager:
+    """分片之前的实现：查找、创建和移除都获取同一把锁"""
+
+    def __init__(self):
+        self.contexts: Dict[str, ExecutionContext] = {}
+        self.lock = threading.Lock()
+
+    def get_context(self, user_id: str) -> ExecutionContext:
+        with self.lock:
+            if user_id not in self.contexts:
+                self.contexts[user_id] = ExecutionContext(user_id)
+            return self.contexts[user_id]
+
+    def remove_context(self, user_id: str):
+        with self.lock:
+            if user_id in self.contexts:
+                del self.contexts[user_id]
+
+
+MANAGERS = {
+    "global_lock": GlobalLockContextManager,
+    "sharded_1": lambda: ContextManager(shards=1),
+    "sharded": ContextManager,
+    "sharded_ttl": lambda: ContextManager(idle_ttl=3600),
+}
+
+
+def run(manager_name: str, threads: int, users: int, operations: int, churn: float, seed: int) -> dict:
+    """用threads个线程共执行operations次操作，返回测量结果"""
+    manager = MANAGERS[manager_name]()
+    user_ids = [f"user{index}" for index in range(users)]
+    for user_id in user_ids:
+        manager.get_context(user_id)
+
+    per_thread = operations // threads
+    # 预先生成每个线程的操作序列，计时部分只包含上下文管理器的调用
+    plans = []
+    for number in range(threads):
+        rng = random.Random(seed + number)
+        plans.append([(rng.choice(user_ids), rng.random() < churn) for _ in range(per_thread)])
+
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(plan):
+        get_context, remove_context = manager.get_context, manager.remove_context
+        barrier.wait()
+        for user_id, remove in plan:
+            if remove:
+                remove_context(user_id)
+            get_context(user_id)
+        barrier.wait()
+
+    workers = [threading.Thread(target=worker, args=(plan,)) for plan in plans]
+    for thread in workers:
+        thread.start()
+    gc.collect()
+    barrier.wait()
+    start = time.perf_counter()
+    barrier.wait()
+    seconds = time.perf_counter() - start
+    for thread in workers:
+        thread.join()
+
+    total = per_thread * threads
+    return {"manager": manager_name, "threads": threads, "operations": total, "seconds": seconds,
+            "lookups_per_sec": total / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话查找基准测试（JSON输出）")
+    parser.add_argument("--users", type=int, default=10000, help="预先创建的用户数")
+    parser.add_argument("--operations", type=int, default=200000, help="每组测量的总操作数")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32], help="线程数")
+    parser.add_argument("--churn", type=float, default=0.05, help="先移除再查找（触发创建）的操作比例")
+    parser.add_argument("--managers", nargs="+", default=list(MANAGERS), choices=list(MANAGERS), help="上下文管理器实现")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--output", "-o", help="结果写入的JSON文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "contexts",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"users": args.users, "operations": args.operations, "churn": args.churn, "seed": args.seed},
+        "results": [run(manager, threads, args.users, args.operations, args.churn, args.seed)
+                    for manager in args.managers for threads in args.threads],
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
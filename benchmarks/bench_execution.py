@@ -0,0 +1,90 @@
+"""
+执行引擎基准测试
+用合成脚本测量各执行引擎的吞吐（statements/sec），结果以JSON输出
+
+每轮对话从上一轮停下的listen继续：消费输入、执行第一个branch跳转到下一个step、
+执行该step的全部speak/set语句，再停在下一个listen，即每轮执行 statements + 3 条语句。
+
+用法：python benchmarks/bench_execution.py [--steps 200] [--turns 20000] [--engines tree vm]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import generate_script
+from src.dsl.cache import COMPILER_VERSION, compile_source
+from src.main import ENGINES
+from src.runtime.execution_context import ExecutionContext
+
+
+def run_engine(engine: str, script, turns: int, statements: int) -> dict:
+    """用一个执行引擎执行指定轮数，返回测量结果"""
+    interpreter = ENGINES[engine](script)
+    context = ExecutionContext("bench")
+    # 意图固定为第一个选项，每轮都跳转到下一个step
+    context.set_variable("user_intent", "选项1")
+    interpreter.execute(context)
+
+    def input_callback(prompt: str) -> str:
+        return context.get_and_consume_input() or ""
+
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(turns):
+        context.set_pending_input("继续")
+        result = interpreter.execute(context, input_callback)
+    seconds = time.perf_counter() - start
+
+    assert result["status"] == "waiting_input", result
+    executed = turns * (statements + 3)
+    return {
+        "engine": engine, "turns": turns, "statements": executed, "seconds": seconds,
+        "statements_per_sec": executed / seconds, "turns_per_sec": turns / seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="执行引擎基准测试（JSON输出）")
+    parser.add_argument("--steps", type=int, default=200, help="合成脚本的step数量")
+    parser.add_argument("--statements", type=int, default=10, help="每个step的speak/set语句数")
+    parser.add_argument("--string-length", type=int, default=40, help="speak字符串长度")
+    parser.add_argument("--var-density", type=float, default=0.3, help="每条speak的${var}平均数量")
+    parser.add_argument("--fanout", type=int, default=3, help="每个step的branch数量")
+    parser.add_argument("--turns", type=int, default=20000, help="每个引擎执行的对话轮数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES), help="执行引擎")
+    parser.add_argument("--output", "-o", help="结果写入的JSON文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    source = generate_script(args.steps, args.statements, args.string_length, args.var_density, args.fanout, args.seed)
+    script = compile_source(source)
+
+    report = {
+        "benchmark": "execution",
+        "compiler_version": COMPILER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "steps": args.steps, "statements": args.statements, "string_length": args.string_length,
+            "var_density": args.var_density, "fanout": args.fanout, "seed": args.seed,
+        },
+        "results": [run_engine(engine, script, args.turns, args.statements) for engine in args.engines],
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
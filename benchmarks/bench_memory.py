@@ -0,0 +1,95 @@
+"""
+内存占用基准测试
+统计Token和AST节点的平均字节数，对比字典实例（改造前的表示）、__slots__ 实例和结构数组Token缓冲区
+
+用法：python benchmarks/bench_memory.py [--copies N]
+"""
+
+import argparse
+import gc
+import sys
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+
+class DictToken:
+    """改造前的Token表示：普通字典实例"""
+
+    def __init__(self, token_type, value, line_number, column):
+        self.token_type = token_type
+        self.value = value
+        self.line_number = line_number
+        self.column = column
+
+
+class DictNode:
+    """改造前的AST节点表示：按原节点的属性构造普通字典实例"""
+
+    def __init__(self, node):
+        for cls in type(node).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                setattr(self, name, getattr(node, name))
+
+
+def _copy_node(node):
+    """不经过__init__复制一个 __slots__ 节点"""
+    copy = object.__new__(type(node))
+    for cls in type(node).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            setattr(copy, name, getattr(node, name))
+    return copy
+
+
+def measure(build) -> int:
+    """统计build()返回的对象在构造过程中新增的内存（字节），不含预先存在的字符串"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Token/AST节点内存占用对比")
+    parser.add_argument("--copies", type=int, default=100, help="将 scripts/ 下的脚本拼接的份数")
+    args = parser.parse_args()
+
+    source = "\n".join(path.read_text(encoding="utf-8") for path in sorted(SCRIPTS_DIR.glob("*.dsl"))) * args.copies
+
+    # Token：值字符串在各表示间共享，只统计容器和Token对象本身
+    tokens = Lexer(source).tokenize()
+    token_count = len(tokens)
+    dict_tokens = measure(lambda: [DictToken(t.token_type, t.value, t.line_number, t.column) for t in tokens])
+    slot_tokens = measure(lambda: [type(t)(t.token_type, t.value, t.line_number, t.column) for t in tokens])
+    compact_tokens = measure(lambda: Lexer(source).tokenize_compact())
+
+    # AST节点：统计Step和语句节点（消息字符串同样共享）
+    script = Parser(Lexer(source)).parse()
+    nodes = list(script.steps) + [s for step in script.steps for s in step.statements]
+    node_count = len(nodes)
+    dict_nodes = measure(lambda: [DictNode(node) for node in nodes])
+    slot_nodes = measure(lambda: [_copy_node(node) for node in nodes])
+
+    print(f"tokens: {token_count}, nodes: {node_count}")
+    print(f"{'representation':<32}{'bytes/token':>12}")
+    print(f"{'dict Token (before)':<32}{dict_tokens / token_count:>12.1f}")
+    print(f"{'__slots__ Token':<32}{slot_tokens / token_count:>12.1f}")
+    print(f"{'TokenBuffer (struct of arrays)':<32}{compact_tokens / token_count:>12.1f}")
+    print(f"{'representation':<32}{'bytes/node':>12}")
+    print(f"{'dict node (before)':<32}{dict_nodes / node_count:>12.1f}")
+    print(f"{'__slots__ node':<32}{slot_nodes / node_count:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+词法分析与语法分析基准测试
+用合成脚本测量 Lexer.tokenize 和 Parser.parse 的吞吐（tokens/sec、nodes/sec）和峰值内存，
+结果以JSON输出，便于在版本之间对比回归
+
+用法：python benchmarks/bench_parser.py [--steps 1000 10000 100000] [--output result.json]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import generate_script
+from src.dsl.cache import COMPILER_VERSION
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser, StreamingParser
+
+
+def timed(func):
+    """执行一次，返回(结果, 耗时秒)"""
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def peak_memory(func) -> int:
+    """单独执行一次并统计峰值内存（tracemalloc会拖慢执行，因此不与计时混在一起）"""
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def count_nodes(script) -> int:
+    """统计AST节点数（Step和语句）"""
+    return len(script.steps) + sum(len(step.statements) for step in script.steps)
+
+
+def bench_size(args, steps: int) -> list:
+    """对一个规模的合成脚本执行各项测量"""
+    source = generate_script(steps, args.statements, args.string_length, args.var_density, args.fanout, args.seed)
+    common = {"steps": steps, "source_bytes": len(source.encode("utf-8"))}
+    records = []
+
+    for engine in args.engines:
+        tokens, seconds = timed(lambda: Lexer(source, engine).tokenize())
+        token_count = len(tokens)
+        del tokens
+        record = dict(common, phase="tokenize", engine=engine, seconds=seconds,
+                      tokens=token_count, tokens_per_sec=token_count / seconds)
+        if not args.no_memory:
+            record["peak_bytes"] = peak_memory(lambda: Lexer(source, engine).tokenize())
+        records.append(record)
+
+    for parser_class in (Parser, StreamingParser):
+        script, seconds = timed(lambda: parser_class(Lexer(source)).parse())
+        node_count = count_nodes(script)
+        del script
+        record = dict(common, phase="parse", parser=parser_class.__name__, seconds=seconds,
+                      tokens=token_count, nodes=node_count,
+                      tokens_per_sec=token_count / seconds, nodes_per_sec=node_count / seconds)
+        if not args.no_memory:
+            record["peak_bytes"] = peak_memory(lambda: parser_class(Lexer(source)).parse())
+        records.append(record)
+
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="词法/语法分析基准测试（JSON输出）")
+    parser.add_argument("--steps", type=int, nargs="+", default=[1000, 10000, 100000], help="合成脚本的step数量")
+    parser.add_argument("--statements", type=int, default=10, help="每个step的speak/set语句数")
+    parser.add_argument("--string-length", type=int, default=40, help="speak字符串长度")
+    parser.add_argument("--var-density", type=float, default=0.3, help="每条speak的${var}平均数量")
+    parser.add_argument("--fanout", type=int, default=3, help="每个step的branch数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--engines", nargs="+", default=["fast", "legacy"], choices=Lexer.ENGINES, help="词法分析引擎")
+    parser.add_argument("--no-memory", action="store_true", help="不统计峰值内存（更快）")
+    parser.add_argument("--output", "-o", help="结果写入的JSON文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    report = {
+        "benchmark": "parser",
+        "compiler_version": COMPILER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "statements": args.statements, "string_length": args.string_length,
+            "var_density": args.var_density, "fanout": args.fanout, "seed": args.seed,
+        },
+        "results": [record for steps in args.steps for record in bench_size(args, steps)],
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+语句恢复基准测试
+一个step由1000条listen组成，每轮对话从上一条listen继续、消费输入后停在下一条listen。
+分别统计停在step前部和尾部时每轮的耗时：恢复执行位置为O(1)时两者应基本相同
+
+用法：python benchmarks/bench_resume.py [--statements 1000] [--passes 20]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.cache import compile_source
+from src.main import ENGINES
+from src.runtime.execution_context import ExecutionContext
+
+
+def generate_listen_script(statements: int) -> str:
+    """生成一个由连续listen组成的step"""
+    body = "\n".join(f"    listen answer_{index}" for index in range(statements))
+    return f"step start {{\n{body}\n    end\n}}\n"
+
+
+def run_engine(engine: str, script, statements: int, passes: int, window: int) -> dict:
+    """按轮计时，返回前window轮和后window轮的平均耗时"""
+    interpreter = ENGINES[engine](script)
+    timings = [0.0] * statements
+
+    def input_callback(prompt: str) -> str:
+        return context.get_and_consume_input() or ""
+
+    for _ in range(passes):
+        context = ExecutionContext("bench")
+        interpreter.execute(context)
+        gc.collect()
+        for index in range(statements):
+            context.set_pending_input("好的")
+            start = time.perf_counter()
+            interpreter.execute(context, input_callback)
+            timings[index] += time.perf_counter() - start
+
+    head = sum(timings[:window]) / (window * passes)
+    tail = sum(timings[-window:]) / (window * passes)
+    return {
+        "engine": engine,
+        "head_us_per_turn": head * 1e6,
+        "tail_us_per_turn": tail * 1e6,
+        "tail_to_head": tail / head,
+        "turns_per_sec": statements * passes / sum(timings),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="语句恢复基准测试（JSON输出）")
+    parser.add_argument("--statements", type=int, default=1000, help="step中的listen数量")
+    parser.add_argument("--passes", type=int, default=20, help="完整走完step的次数")
+    parser.add_argument("--window", type=int, default=100, help="统计step前部/尾部的轮数")
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES), help="执行引擎")
+    args = parser.parse_args()
+
+    script = compile_source(generate_listen_script(args.statements))
+    print(json.dumps({
+        "benchmark": "resume",
+        "statements": args.statements,
+        "passes": args.passes,
+        "results": [run_engine(engine, script, args.statements, args.passes, args.window) for engine in args.engines],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
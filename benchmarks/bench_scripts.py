@@ -0,0 +1,99 @@
+"""
+业务场景基准测试
+用 scripts/ 下的四个业务脚本测量各执行引擎的吞吐（turns/sec），结果以JSON输出
+
+每个场景回放一组固定的对话（覆盖各场景的主要分支），意图识别结果预先计算好，
+只测量执行引擎本身。每个引擎的结果附带相对树遍历解释器（tree）的加速比。
+
+用法：python benchmarks/bench_scripts.py [--repeat 2000] [--engines tree vm native]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.cache import COMPILER_VERSION, compile_source
+from src.llm.intent_analyzer import MockIntentAnalyzer
+from src.main import ENGINES, INTENTS
+from src.runtime.execution_context import ExecutionContext
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+# 覆盖各场景主要分支的输入序列，None 表示不带输入的首轮
+CONVERSATIONS = [
+    [None, "1", "12345", "查看订单详情", "返回主菜单", "2", "退出"],
+    [None, "查询订单", "abc", "重新查询", "67890", "查看物流信息", "返回主菜单"],
+    [None, "退款", "12345", "商品质量问题", "确认", "返回主菜单"],
+    [None, "投诉", "提交投诉", "商品有问题", "13800000000", "查询投诉", "1", "返回主菜单"],
+    [None, "物流", "SF123456", "返回主菜单", "3", "4", "5", "你好"],
+]
+
+
+def precomputed_analyzer():
+    """预先计算所有输入的意图识别结果，基准测试中只做字典查找"""
+    analyzer = MockIntentAnalyzer()
+    results = {text: analyzer.analyze(text, INTENTS)
+               for conversation in CONVERSATIONS for text in conversation if text is not None}
+    return lambda text: dict(results[text])
+
+
+def run_engine(engine: str, script, repeat: int) -> dict:
+    """用一个执行引擎回放所有对话repeat遍，返回测量结果"""
+    interpreter = ENGINES[engine](script, precomputed_analyzer())
+    turns = 0
+    gc.collect()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for conversation in CONVERSATIONS:
+            context = ExecutionContext("bench")
+            for user_input in conversation:
+                pending = [user_input] if user_input is not None else []
+                interpreter.execute(context, lambda prompt: pending.pop() if pending else "")
+            turns += len(conversation)
+    seconds = time.perf_counter() - start
+    return {"engine": engine, "turns": turns, "seconds": seconds, "turns_per_sec": turns / seconds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="业务场景基准测试（JSON输出）")
+    parser.add_argument("--repeat", type=int, default=2000, help="每个引擎回放全部对话的遍数")
+    parser.add_argument("--engines", nargs="+", default=sorted(ENGINES), choices=sorted(ENGINES), help="执行引擎")
+    parser.add_argument("--output", "-o", help="结果写入的JSON文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    scenarios = []
+    for path in sorted(SCRIPTS_DIR.glob("*.dsl")):
+        script = compile_source(path.read_text(encoding="utf-8"))
+        results = [run_engine(engine, script, args.repeat) for engine in args.engines]
+        baseline = next((result["turns_per_sec"] for result in results if result["engine"] == "tree"), None)
+        if baseline:
+            for result in results:
+                result["speedup_vs_tree"] = result["turns_per_sec"] / baseline
+        scenarios.append({"script": path.name, "results": results})
+
+    report = {
+        "benchmark": "scripts",
+        "compiler_version": COMPILER_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"repeat": args.repeat, "conversations": len(CONVERSATIONS)},
+        "scenarios": scenarios,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+会话持久化基准测试
+多个用户交替进行对话，测量不同会话存储下 AgentSystem 的吞吐（turns/sec），结果以JSON输出
+
+对比四种配置：
+- none：不持久化
+- memory：进程内存储（MemorySessionStore）
+- sqlite：SQLite，延迟批量写入（SQLiteSessionStore）
+- sqlite_per_turn：SQLite，每轮对话结束后立即在单独的事务中写入（synchronous=FULL，每次提交都落盘）
+
+用法：python benchmarks/bench_sessions.py [--users 200] [--rounds 5] [--stores none memory sqlite sqlite_per_turn]
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import AgentSystem
+from src.runtime.session_store import MemorySessionStore, SQLiteSessionStore
+
+
+ORDER_SCRIPT = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+
+# 一个用户的一组对话输入，None 表示不带输入的首轮
+CONVERSATION = [None, "12345", "1", "返回主菜单"]
+
+
+class PerTurnSQLiteSessionStore(SQLiteSessionStore):
+    """每次保存都立即写入的SQLite存储（对照组）"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        with self.db_lock:
+            self.connection.execute("PRAGMA synchronous=FULL")
+
+    def save(self, user_id, state):
+        super().save(user_id, state)
+        self.flush()
+
+
+def create_store(name: str, directory: str):
+    path = str(Path(directory) / f"{name}.db")
+    return {
+        "none": lambda: None,
+        "memory": MemorySessionStore,
+        "sqlite": lambda: SQLiteSessionStore(path),
+        "sqlite_per_turn": lambda: PerTurnSQLiteSessionStore(path),
+    }[name]()
+
+
+STORES = ["none", "memory", "sqlite", "sqlite_per_turn"]
+
+
+def run(store_name: str, users: int, rounds: int, engine: str) -> dict:
+    """users个用户交替进行rounds遍对话，返回测量结果（包括关闭存储时写入剩余状态的时间）"""
+    with tempfile.TemporaryDirectory() as directory:
+        store = create_store(store_name, directory)
+        agent = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, engine=engine,
+                            session_store=store)
+        user_ids = [f"user{index}" for index in range(users)]
+        turns = 0
+        gc.collect()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for user_input in CONVERSATION:
+                for user_id in user_ids:
+                    agent.process_user_input(user_id, user_input)
+                turns += users
+        agent.close()
+        seconds = time.perf_counter() - start
+        result = {"store": store_name, "turns": turns, "seconds": seconds, "turns_per_sec": turns / seconds}
+        if isinstance(store, SQLiteSessionStore):
+            result["transactions"] = store.flush_count
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会话持久化基准测试（JSON输出）")
+    parser.add_argument("--users", type=int, default=200, help="同时进行对话的用户数")
+    parser.add_argument("--rounds", type=int, default=5, help="每个用户进行对话的遍数")
+    parser.add_argument("--stores", nargs="+", default=STORES, choices=STORES, help="会话存储")
+    parser.add_argument("--engine", default="tree", help="执行引擎")
+    parser.add_argument("--output", "-o", help="结果写入的JSON文件（默认输出到标准输出）")
+    args = parser.parse_args()
+
+    results = [run(store, args.users, args.rounds, args.engine) for store in args.stores]
+    baseline = next((result["turns_per_sec"] for result in results if result["store"] == "none"), None)
+    if baseline:
+        for result in results:
+            result["relative_to_none"] = result["turns_per_sec"] / baseline
+
+    report = {
+        "benchmark": "sessions",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"users": args.users, "rounds": args.rounds, "engine": args.engine,
+                       "conversation": CONVERSATION},
+        "results": results,
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+话术渲染微基准测试
+渲染 scripts/order_inquiry.dsl 中 order_detail 步骤的全部speak（一连串连续的speak），
+对比每次用正则替换 ${var} 与使用编译好的话术片段的耗时
+
+用法：python benchmarks/bench_speak.py [--number 20000] [--repeat 5]
+"""
+
+import argparse
+import json
+import re
+import sys
+import timeit
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.ast import SpeakNode
+from src.dsl.cache import load_script
+from src.dsl.interpreter import Interpreter
+from src.runtime.execution_context import ExecutionContext
+
+
+SCRIPT_PATH = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+
+
+def regex_substitute(text: str, context: ExecutionContext) -> str:
+    """编译话术之前的实现：每条speak都执行一次带闭包的 re.sub"""
+    def replace_var(match):
+        value = context.get_variable(match.group(1))
+        return str(value) if value is not None else match.group(0)
+    return re.sub(r'\$\{(\w+)\}', replace_var, text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="话术渲染微基准测试（JSON输出）")
+    parser.add_argument("--step", default="order_detail", help="渲染的step名称")
+    parser.add_argument("--number", type=int, default=20000, help="每次计时渲染整个step的次数")
+    parser.add_argument("--repeat", type=int, default=5, help="计时重复次数（取最小值）")
+    args = parser.parse_args()
+
+    script = load_script(str(SCRIPT_PATH))
+    speaks = [s for s in script.get_step(args.step).statements if isinstance(s, SpeakNode)]
+    interpreter = Interpreter(script)
+    context = ExecutionContext("bench")
+    context.set_variable("order_id", "1234567890")
+
+    def render_regex():
+        return [regex_substitute(node.message, context) for node in speaks]
+
+    def render_template():
+        return [interpreter._render_template(node.template, context) for node in speaks]
+
+    assert render_regex() == render_template()
+
+    results = {}
+    for name, func in (("regex", render_regex), ("template", render_template)):
+        best = min(timeit.repeat(func, number=args.number, repeat=args.repeat))
+        results[name] = {
+            "us_per_step": best / args.number * 1e6,
+            "ns_per_speak": best / args.number / len(speaks) * 1e9,
+        }
+
+    print(json.dumps({
+        "benchmark": "speak",
+        "step": args.step,
+        "speaks": len(speaks),
+        "placeholders": sum(len(node.template) // 2 for node in speaks),
+        "results": results,
+        "speedup": results["regex"]["us_per_step"] / results["template"]["us_per_step"],
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+启动耗时基准测试
+对比 scripts/ 下各脚本在无缓存（冷启动）和缓存命中（热启动）时的加载耗时
+
+用法：python benchmarks/bench_startup.py [--repeat N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.cache import ScriptCache, load_script
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+
+def measure(func, repeat: int) -> float:
+    """多次执行取最小耗时（毫秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷/热启动加载耗时对比")
+    parser.add_argument("--repeat", type=int, default=20, help="每项重复次数（取最小值）")
+    args = parser.parse_args()
+
+    print(f"{'script':<28}{'cold(ms)':>10}{'warm(ms)':>10}{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ScriptCache(cache_dir)
+        for script_path in sorted(SCRIPTS_DIR.glob("*.dsl")):
+            path = str(script_path)
+            cold = measure(lambda: load_script(path), args.repeat)
+            load_script(path, cache)  # 预热缓存
+            warm = measure(lambda: load_script(path, cache), args.repeat)
+            print(f"{script_path.name:<28}{cold:>10.3f}{warm:>10.3f}{cold / warm:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+合成DSL脚本生成器
+按参数生成任意规模的脚本，用于词法分析、语法分析和执行的性能基准测试
+"""
+
+import random
+
+
+def generate_script(steps: int = 100, statements_per_step: int = 10, string_length: int = 40,
+                    var_density: float = 0.3, branch_fanout: int = 3, seed: int = 0) -> str:
+    """
+    生成合成DSL脚本
+
+    每个step包含 statements_per_step 条 speak/set 语句，随后是一条 listen、
+    branch_fanout 条 branch 和一条 end。第一个step名为 start，branch 的第一个目标总是
+    下一个step，保证所有step可达，且每个循环中都有 listen。
+
+    Args:
+        steps: step数量
+        statements_per_step: 每个step中 speak/set 语句的数量（每5条中有1条set）
+        string_length: speak 字符串的长度（字符数）
+        var_density: 每条 speak 中 ${var} 占位符的平均数量
+        branch_fanout: 每个step末尾的 branch 数量
+        seed: 随机种子，相同参数和种子生成相同的脚本
+
+    Returns:
+        脚本源码
+    """
+    rng = random.Random(seed)
+    names = ["start"] + [f"step_{i}" for i in range(1, steps)]
+    filler = "客服消息abcdefghij"
+    lines = [f"# synthetic: steps={steps} statements={statements_per_step} "
+             f"string_length={string_length} var_density={var_density} fanout={branch_fanout}"]
+
+    for index, name in enumerate(names):
+        lines.append(f"step {name} {{")
+        for position in range(statements_per_step):
+            if position % 5 == 4:
+                lines.append(f'    set var_{rng.randrange(10)} = "value_{index}_{position}"')
+                continue
+            placeholders = int(var_density) + (1 if rng.random() < var_density % 1 else 0)
+            parts = [f"${{var_{rng.randrange(10)}}}" for _ in range(placeholders)]
+            text_length = max(string_length - sum(len(part) for part in parts), 0)
+            text = (filler * (text_length // len(filler) + 1))[:text_length]
+            # 把占位符均匀插入到文本中
+            cuts = [text_length * k // (placeholders + 1) for k in range(placeholders + 2)]
+            pieces = [text[cuts[k]:cuts[k + 1]] for k in range(placeholders + 1)]
+            message = pieces[0] + "".join(part + piece for part, piece in zip(parts, pieces[1:]))
+            lines.append(f'    speak "{message}"')
+        lines.append("    listen user_input")
+        for branch in range(branch_fanout):
+            target = names[(index + 1) % steps] if branch == 0 else names[rng.randrange(steps)]
+            lines.append(f'    branch user_intent == "选项{branch + 1}" -> {target}')
+        lines.append("    end")
+        lines.append("}")
+        lines.append("")
+
+    return "\n".join(lines)
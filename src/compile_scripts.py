@@ -0,0 +1,65 @@
+"""
+批量编译入口
+并行编译脚本目录，报告每个文件的编译耗时和错误，并可预热编译缓存
+
+用法：python src/compile_scripts.py scripts/ --workers 8 --slowest 10
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.bulk import compile_directory
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description="并行编译DSL脚本目录")
+    parser.add_argument("directory", help="脚本目录")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="工作进程数（默认：CPU核数）")
+    parser.add_argument("--pattern", default="*.dsl", help="脚本文件匹配模式（默认：*.dsl）")
+    parser.add_argument("--cache-dir", help="编译缓存目录（默认：~/.cache/dsl）")
+    parser.add_argument("--no-cache", action="store_true", help="不写入编译缓存")
+    parser.add_argument("--slowest", type=int, default=0, help="只显示编译最慢的N个文件")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+
+    args = parser.parse_args()
+
+    if not Path(args.directory).is_dir():
+        print(f"错误：脚本目录不存在: {args.directory}")
+        sys.exit(1)
+
+    results = compile_directory(args.directory, workers=args.workers, pattern=args.pattern,
+                                cache_dir=args.cache_dir, use_cache=not args.no_cache)
+    failed = [result for result in results if not result.ok]
+
+    ranked = sorted(results, key=lambda result: result.elapsed, reverse=True)
+    if args.slowest:
+        ranked = ranked[:args.slowest]
+
+    if args.json:
+        print(json.dumps([
+            {
+                "path": result.path,
+                "ok": result.ok,
+                "error": result.error,
+                "elapsed_ms": round(result.elapsed * 1000, 3),
+                "steps": len(result.script.steps) if result.ok else None,
+            }
+            for result in ranked
+        ], ensure_ascii=False, indent=2))
+    else:
+        for result in ranked:
+            status = f"{len(result.script.steps)} steps" if result.ok else f"错误: {result.error}"
+            print(f"{result.elapsed * 1000:10.3f} ms  {result.path}  {status}")
+        print(f"共 {len(results)} 个脚本，成功 {len(results) - len(failed)} 个，失败 {len(failed)} 个")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
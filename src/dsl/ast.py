@@ -5,6 +5,10 @@
 
 from typing import List, Optional, Any
 from enum import Enum
+import copy
+import re
+
+from src.dsl.symbols import BASE_SYMBOLS, SymbolTable
 
 
 class NodeType(Enum):
@@ -21,10 +25,34 @@ class NodeType(Enum):
 class ASTNode:
     """抽象语法树节点基类"""
     
+    # 使用 __slots__ 代替实例字典，大脚本可能包含数百万个节点
+    __slots__ = ('node_type', 'line_number')
+    
+    # 不参与序列化的属性（链接结果等，反序列化后重新计算）
+    _transient = ()
+    
     def __init__(self, node_type: NodeType, line_number: int = 0):
         self.node_type = node_type
         self.line_number = line_number
     
+    def __getstate__(self):
+        state = {}
+        for cls in type(self).__mro__:
+            for name in cls.__dict__.get('__slots__', ()):
+                if name != '__weakref__' and name not in self._transient and hasattr(self, name):
+                    state[name] = getattr(self, name)
+        return state
+    
+    def __setstate__(self, state):
+        for name in self._transient:
+            setattr(self, name, None)
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def bind(self, symbols: SymbolTable):
+        """链接时把语句用到的变量名解析为槽位下标（没有变量的语句不需要处理）"""
+        pass
+    
     def __repr__(self):
         return f"{self.node_type.value}(line={self.line_number})"
 
@@ -32,44 +60,193 @@ class ASTNode:
 class StepNode(ASTNode):
     """Step节点：定义一个执行步骤"""
     
+    __slots__ = ('name', 'statements', 'fingerprint', 'linked')
+    _transient = ('linked',)
+    
     def __init__(self, name: str, statements: List[ASTNode], line_number: int = 0):
         super().__init__(NodeType.STEP, line_number)
         self.name = name
         self.statements = statements
+        self.fingerprint: Optional[bytes] = None  # 源码块指纹，供增量编译复用
+        self.linked: Optional[bool] = None  # 是否已被某个脚本版本链接（之后不再修改，复用时需要复制）
+    
+    def copy(self) -> 'StepNode':
+        """复制Step及其语句节点：解析结果（模板、条件等）共享，链接结果不复制"""
+        step = copy.copy(self)
+        step.statements = [copy.copy(statement) for statement in self.statements]
+        return step
     
     def __repr__(self):
         return f"StepNode(name={self.name}, statements={len(self.statements)})"
 
 
+# 话术中的变量占位符：${variable_name}
+PLACEHOLDER_PATTERN = re.compile(r'\$\{(\w+)\}')
+
+
+def compile_template(message: str) -> tuple:
+    """
+    把话术编译为片段元组：偶数位置是文本，奇数位置是变量名
+
+    不含占位符的话术编译为只有一个元素的元组，即预先渲染好的常量。
+    """
+    return tuple(PLACEHOLDER_PATTERN.split(message))
+
+
 class SpeakNode(ASTNode):
     """Speak节点：输出话术"""
     
+    __slots__ = ('message', 'template', 'slots')
+    _transient = ('slots',)
+    
     def __init__(self, message: str, line_number: int = 0):
         super().__init__(NodeType.SPEAK, line_number)
         self.message = message
+        self.template = compile_template(message)  # 编译后的话术片段
+        self.slots: Optional[tuple] = None  # 链接后与template对齐：变量名位置是槽位下标，文本位置是None
+    
+    def bind(self, symbols: SymbolTable):
+        template = self.template
+        self.slots = tuple(symbols.intern(template[index]) if index % 2 else None
+                           for index in range(len(template)))
     
     def __repr__(self):
         return f"SpeakNode(message={self.message[:30]}...)"
 
 
+# listen语句的意图识别方式：变量名相关的部分在编译时确定，运行时只检查输入本身
+RECOGNIZE_ALWAYS = "always"  # 总是识别（变量名包含input/intent，或标注了intent）
+RECOGNIZE_NEVER = "never"  # 不识别（数据字段，或标注了raw）
+RECOGNIZE_TEXT = "text"  # 输入不是纯数字时识别（退款原因等字段，用户可能直接输入"质量问题"）
+RECOGNIZE_MENU = "menu"  # 只在输入是菜单选项（1-9）时识别
+RECOGNIZE_USER = "user"  # 除了短数字（菜单选项除外）都识别
+
+# 数据字段，通常不需要意图识别
+DATA_FIELDS = frozenset({
+    "order_id",
+    "complaint_id",
+    "complaint_content",
+    "suggestion_content",
+    "contact_info",
+    "refund_reason",
+    "refund_reason_code",
+    "refund_reason_detail",
+    "logistics_number",
+    "confirm",
+})
+
+# listen语句的显式标注：listen <variable_name> intent|raw
+LISTEN_ANNOTATIONS = {
+    "intent": RECOGNIZE_ALWAYS,
+    "raw": RECOGNIZE_NEVER,
+}
+
+
+def classify_listen(variable: str) -> str:
+    """根据变量名确定listen语句的意图识别方式"""
+    var_lower = variable.lower()
+    # 变量名包含 "input" 或 "intent" 的，通常需要意图识别
+    if "input" in var_lower or "intent" in var_lower:
+        return RECOGNIZE_ALWAYS
+    if var_lower in DATA_FIELDS:
+        # 对于数据字段，纯数字直接跳过意图识别；退款原因等字段的文字描述可以尝试意图识别
+        return RECOGNIZE_TEXT if var_lower.startswith("refund_reason") else RECOGNIZE_NEVER
+    # 变量名看起来像用户输入的，进行意图识别，否则只识别菜单选项
+    return RECOGNIZE_USER if "user" in var_lower else RECOGNIZE_MENU
+
+
 class ListenNode(ASTNode):
     """Listen节点：接收用户输入并进行意图识别"""
     
-    def __init__(self, variable: str, line_number: int = 0):
+    __slots__ = ('variable', 'recognize', 'slot')
+    _transient = ('slot',)
+    
+    def __init__(self, variable: str, line_number: int = 0, recognize: Optional[str] = None):
         super().__init__(NodeType.LISTEN, line_number)
         self.variable = variable
+        # 意图识别方式（RECOGNIZE_*），未显式标注时根据变量名推断
+        self.recognize = recognize or classify_listen(variable)
+        self.slot: Optional[int] = None  # 链接后为变量的槽位下标
+    
+    def bind(self, symbols: SymbolTable):
+        self.slot = symbols.intern(self.variable)
+    
+    def __repr__(self):
+        return f"ListenNode(variable={self.variable}, recognize={self.recognize})"
+
+
+class Condition:
+    """
+    结构化的branch条件：变量 运算符 操作数
+
+    比较按字符串进行，字面量在编译时就转换为字符串。右侧为标识符时先按变量取值，
+    变量不存在时使用标识符本身（与原先按字符串解析条件的行为一致）。
+    """
+    
+    __slots__ = ('variable', 'operator', 'negate', 'reference', 'literal')
+    
+    # 按字符串解析条件表达式的格式（用于只有条件字符串的节点）
+    PATTERN = re.compile(r'(\w+)\s*(==|!=)\s*(".*?"|\'.*?\'|\w+)')
+    
+    def __init__(self, variable: str, operator: str, literal: Any, reference: Optional[str] = None):
+        self.variable = variable  # 左侧变量名
+        self.operator = operator  # "==" 或 "!="
+        self.negate = operator == "!="
+        self.reference = reference  # 右侧引用的变量名（右侧为标识符时）
+        self.literal = str(literal)  # 右侧的比较值（引用的变量不存在时使用）
+    
+    @classmethod
+    def parse(cls, condition: str) -> Optional['Condition']:
+        """从条件字符串解析，格式不正确时返回None"""
+        match = cls.PATTERN.match(condition)
+        if not match:
+            return None
+        variable, operator, value = match.groups()
+        if value[0] in '"\'' and value[-1] == value[0]:
+            return cls(variable, operator, value[1:-1])
+        # 可能是变量名或数字
+        try:
+            literal = float(value) if '.' in value else int(value)
+        except ValueError:
+            literal = value
+        return cls(variable, operator, literal, reference=value)
+    
+    def __eq__(self, other):
+        return (isinstance(other, Condition) and self.variable == other.variable and self.operator == other.operator
+                and self.reference == other.reference and self.literal == other.literal)
+    
+    def __hash__(self):
+        return hash((self.variable, self.operator, self.reference, self.literal))
     
     def __repr__(self):
-        return f"ListenNode(variable={self.variable})"
+        right = self.reference if self.reference is not None else repr(self.literal)
+        return f"Condition({self.variable} {self.operator} {right})"
 
 
 class BranchNode(ASTNode):
     """Branch节点：条件分支"""
     
-    def __init__(self, condition: str, target_step: str, line_number: int = 0):
+    __slots__ = ('condition', 'predicate', 'target_step', 'target', 'variable_slot', 'reference_slot')
+    _transient = ('target', 'variable_slot', 'reference_slot')
+    
+    def __init__(self, condition: str, target_step: str, line_number: int = 0,
+                 predicate: Optional[Condition] = None):
         super().__init__(NodeType.BRANCH, line_number)
         self.condition = condition  # 条件表达式，如 "user_intent == '订单查询'"
+        # 结构化条件（语法分析时生成，未提供时从条件字符串解析；格式不正确时为None）
+        self.predicate = predicate if predicate is not None else Condition.parse(condition)
         self.target_step = target_step
+        self.target: Optional[StepNode] = None  # 链接后指向目标Step节点
+        self.variable_slot: Optional[int] = None  # 链接后为条件左侧变量的槽位下标
+        self.reference_slot: Optional[int] = None  # 链接后为右侧引用变量的槽位下标（右侧为标识符时）
+    
+    def bind(self, symbols: SymbolTable):
+        predicate = self.predicate
+        if predicate is None:
+            return
+        self.variable_slot = symbols.intern(predicate.variable)
+        if predicate.reference is not None:
+            self.reference_slot = symbols.intern(predicate.reference)
     
     def __repr__(self):
         return f"BranchNode(condition={self.condition}, target={self.target_step})"
@@ -78,10 +255,20 @@ class BranchNode(ASTNode):
 class SetNode(ASTNode):
     """Set节点：设置变量"""
     
+    __slots__ = ('variable', 'value', 'slot', 'value_slot')
+    _transient = ('slot', 'value_slot')
+    
     def __init__(self, variable: str, value: Any, line_number: int = 0):
         super().__init__(NodeType.SET, line_number)
         self.variable = variable
         self.value = value
+        self.slot: Optional[int] = None  # 链接后为变量的槽位下标
+        self.value_slot: Optional[int] = None  # 链接后为值的槽位下标（值是标识符形式的字符串时可能引用同名变量）
+    
+    def bind(self, symbols: SymbolTable):
+        self.slot = symbols.intern(self.variable)
+        if isinstance(self.value, str) and self.value.isidentifier():
+            self.value_slot = symbols.intern(self.value)
     
     def __repr__(self):
         return f"SetNode(variable={self.variable}, value={self.value})"
@@ -90,6 +277,8 @@ class SetNode(ASTNode):
 class EndNode(ASTNode):
     """End节点：结束当前流程"""
     
+    __slots__ = ()
+    
     def __init__(self, line_number: int = 0):
         super().__init__(NodeType.END, line_number)
 
@@ -97,10 +286,28 @@ class EndNode(ASTNode):
 class ScriptNode(ASTNode):
     """Script节点：整个脚本的根节点"""
     
+    __slots__ = ('steps', 'step_map', 'linked', 'symbols', '__weakref__')
+    _transient = ('symbols',)
+    
     def __init__(self, steps: List[StepNode], line_number: int = 0):
         super().__init__(NodeType.SCRIPT, line_number)
         self.steps = steps
         self.step_map = {step.name: step for step in steps}
+        self.linked = False  # 是否已经过链接（branch目标已解析为Step节点并通过校验）
+        self.symbols: Optional[SymbolTable] = None  # 本版本的符号表（链接时创建或由增量编译从上一版本派生）
+    
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        # 链接结果不参与序列化（避免沿跳转链深度递归；槽位下标只在本进程内有效），
+        # 反序列化后重新解析
+        if self.linked:
+            self.symbols = BASE_SYMBOLS.derive()
+            for step in self.steps:
+                for statement in step.statements:
+                    if isinstance(statement, BranchNode):
+                        statement.target = self.step_map[statement.target_step]
+                    statement.bind(self.symbols)
+                step.linked = True
     
     def get_step(self, name: str) -> Optional[StepNode]:
         """根据名称获取Step节点"""
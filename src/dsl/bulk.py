@@ -0,0 +1,83 @@
+"""
+批量编译（Bulk Compile）
+使用进程池并行编译整个目录下的DSL脚本，逐文件收集编译结果、错误和耗时
+"""
+
+from typing import List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import time
+
+from src.dsl.ast import ScriptNode
+from src.dsl.cache import ScriptCache, load_script
+
+
+class CompileResult:
+    """单个脚本的编译结果（可pickle，用于从工作进程传回）"""
+
+    __slots__ = ('path', 'script', 'error', 'elapsed')
+
+    def __init__(self, path: str, script: Optional[ScriptNode] = None,
+                 error: Optional[str] = None, elapsed: float = 0.0):
+        self.path = path
+        self.script = script  # 编译成功时的ScriptNode
+        self.error = error  # 编译失败时的错误信息
+        self.elapsed = elapsed  # 编译耗时（秒）
+
+    @property
+    def ok(self) -> bool:
+        """是否编译成功"""
+        return self.error is None
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error}"
+        return f"CompileResult(path={self.path}, {status}, elapsed={self.elapsed * 1000:.2f}ms)"
+
+
+def compile_file(script_path: str, cache_dir: Optional[str] = None, use_cache: bool = False) -> CompileResult:
+    """
+    编译单个脚本文件（在工作进程中执行），异常不会向外抛出而是记录在结果中
+
+    Args:
+        script_path: DSL脚本文件路径
+        cache_dir: 编译缓存目录
+        use_cache: 是否使用编译缓存
+    """
+    cache = ScriptCache(cache_dir) if use_cache else None
+    start = time.perf_counter()
+    try:
+        script = load_script(script_path, cache)
+    except Exception as e:
+        return CompileResult(script_path, error=f"{type(e).__name__}: {e}", elapsed=time.perf_counter() - start)
+    return CompileResult(script_path, script, elapsed=time.perf_counter() - start)
+
+
+def compile_directory(directory: str, workers: Optional[int] = None, pattern: str = "*.dsl",
+                      cache_dir: Optional[str] = None, use_cache: bool = False) -> List[CompileResult]:
+    """
+    并行编译目录下的所有脚本
+
+    Args:
+        directory: 脚本目录
+        workers: 工作进程数，默认为CPU核数；为1时在当前进程中顺序编译
+        pattern: 脚本文件匹配模式
+        cache_dir: 编译缓存目录
+        use_cache: 是否使用编译缓存（工作进程会写入缓存，供之后的启动直接命中）
+
+    Returns:
+        按文件路径排序的编译结果列表，单个文件的错误不会中断其余文件的编译
+    """
+    paths = [str(path) for path in sorted(Path(directory).glob(pattern))]
+    if workers == 1 or len(paths) <= 1:
+        return [compile_file(path, cache_dir, use_cache) for path in paths]
+
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(compile_file, path, cache_dir, use_cache) for path in paths]
+        for path, future in zip(paths, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # 工作进程异常退出等情况，同样只记录到该文件的结果中
+                results.append(CompileResult(path, error=f"{type(e).__name__}: {e}"))
+    return results
@@ -0,0 +1,111 @@
+"""
+字节码编译器（Bytecode Compiler）
+把ScriptNode降级为扁平的指令数组：整数操作码和操作数，branch的目标为指令地址
+"""
+
+from typing import Any, Dict, List
+import threading
+import weakref
+
+from src.dsl.ast import ScriptNode, SpeakNode, ListenNode, BranchNode, SetNode, EndNode
+
+
+# 操作码
+OP_SPEAK = 0  # 操作数：SpeakNode
+OP_LISTEN = 1  # 操作数：ListenNode
+OP_BRANCH = 2  # 操作数：(BranchNode, 目标地址)，目标不存在时地址为-1
+OP_SET = 3  # 操作数：SetNode
+OP_END = 4  # 操作数：None
+OP_STEP_END = 5  # Step的最后一条指令（语句执行完毕），操作数：Step名称
+
+OPCODE_NAMES = ("SPEAK", "LISTEN", "BRANCH", "SET", "END", "STEP_END")
+
+
+class Program:
+    """
+    编译后的脚本
+
+    每个Step编译为连续的一段指令：每条语句一条指令，末尾是一条 STEP_END。
+    因此指令地址减去所在Step的起始地址就是语句索引，可以和树遍历解释器的执行位置互相换算。
+    """
+
+    __slots__ = ('opcodes', 'operands', 'step_start', 'step_end', 'entry')
+
+    def __init__(self):
+        self.opcodes: List[int] = []
+        self.operands: List[Any] = []
+        self.step_start: List[int] = []  # 每条指令所在Step的起始地址
+        self.step_end: List[int] = []  # 每条指令所在Step的 STEP_END 地址
+        self.entry: Dict[str, int] = {}  # Step名称 -> 起始地址
+
+    def __len__(self):
+        return len(self.opcodes)
+
+    def disassemble(self) -> str:
+        """反汇编，用于调试"""
+        lines = []
+        for pc, (opcode, operand) in enumerate(zip(self.opcodes, self.operands)):
+            if opcode == OP_BRANCH:
+                operand = f"{operand[0].condition} -> {operand[1]}"
+            elif opcode == OP_SPEAK:
+                operand = operand.message
+            elif opcode in (OP_LISTEN, OP_SET):
+                operand = operand.variable
+            lines.append(f"{pc:6d}  {OPCODE_NAMES[opcode]:<9} {'' if operand is None else operand}")
+        return "\n".join(lines)
+
+
+def compile_program(script: ScriptNode) -> Program:
+    """把ScriptNode编译为字节码"""
+    program = Program()
+    opcodes, operands = program.opcodes, program.operands
+    branches = []
+
+    for step in script.steps:
+        start = len(opcodes)
+        end = start + len(step.statements)
+        for statement in step.statements:
+            if isinstance(statement, SpeakNode):
+                opcodes.append(OP_SPEAK)
+                operands.append(statement)
+            elif isinstance(statement, ListenNode):
+                opcodes.append(OP_LISTEN)
+                operands.append(statement)
+            elif isinstance(statement, BranchNode):
+                branches.append(len(opcodes))
+                opcodes.append(OP_BRANCH)
+                operands.append(statement)
+            elif isinstance(statement, SetNode):
+                opcodes.append(OP_SET)
+                operands.append(statement)
+            elif isinstance(statement, EndNode):
+                opcodes.append(OP_END)
+                operands.append(None)
+            else:
+                raise ValueError(f"Unknown statement type: {type(statement)}")
+        opcodes.append(OP_STEP_END)
+        operands.append(step.name)
+        program.step_start.extend([start] * (end - start + 1))
+        program.step_end.extend([end] * (end - start + 1))
+        # 同名的Step以最后一个为准，与 ScriptNode.step_map 一致
+        program.entry[step.name] = start
+
+    for pc in branches:
+        node = operands[pc]
+        operands[pc] = (node, program.entry.get(node.target_step, -1))
+    return program
+
+
+# 每个脚本版本只编译一次，多个解释器共享；脚本版本被回收后编译结果随之释放
+_programs: "weakref.WeakKeyDictionary[ScriptNode, Program]" = weakref.WeakKeyDictionary()
+_programs_lock = threading.Lock()
+
+
+def program_for(script: ScriptNode) -> Program:
+    """获取脚本的字节码（首次使用时编译）"""
+    program = _programs.get(script)
+    if program is None:
+        program = compile_program(script)
+        with _programs_lock:
+            program = _programs.setdefault(script, program)
+    return program
@@ -0,0 +1,188 @@
+"""
+编译缓存（Script Cache）
+按脚本内容哈希和编译器版本缓存解析后的ScriptNode，命中时跳过词法分析和语法分析
+"""
+
+from typing import Optional
+from pathlib import Path
+import hashlib
+import hmac
+import os
+import pickle
+import secrets
+import threading
+
+from src.dsl.ast import ScriptNode
+from src.dsl.incremental import incremental_parse
+from src.dsl.linker import link
+
+
+# 编译器版本：AST结构或编译流程发生变化时递增，使旧的缓存条目失效
+COMPILER_VERSION = "9"
+
+CACHE_SUFFIX = ".dslc"
+
+# 缓存目录中的签名密钥文件
+KEY_FILE_NAME = "cache.key"
+KEY_SIZE = 32
+
+
+def default_cache_dir() -> Path:
+    """默认缓存目录：当前用户的缓存目录（$XDG_CACHE_HOME 或 ~/.cache）下的 dsl"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(base) / "dsl"
+
+
+def compile_source(source: str) -> ScriptNode:
+    """编译脚本源码，返回链接后的ScriptNode（按 step 块编译，带有供增量编译复用的指纹）"""
+    return link(incremental_parse(None, source))
+
+
+def recompile(previous: Optional[ScriptNode], source: str) -> ScriptNode:
+    """增量编译修改后的脚本源码并重新链接（链接失败时抛出LinkError，previous保持可用）"""
+    return link(incremental_parse(previous, source))
+
+
+class ScriptCache:
+    """
+    编译产物缓存
+
+    缓存条目以pickle二进制格式保存(编译器版本, 内容哈希, ScriptNode)，
+    读取时版本或哈希不一致即视为未命中。
+
+    反序列化pickle可以执行任意代码，因此缓存不放在脚本旁边（能修改脚本目录的人不能借此植入条目）：
+    缓存目录由当前用户独占（新建时权限为0700；在POSIX系统上，属于其他用户或允许组/其他用户写入的目录
+    不使用），每个条目带有用目录中的密钥（cache.key，权限0600）计算的HMAC签名，签名校验通过后才反序列化。
+    无法使用缓存目录时缓存不生效，总是重新编译。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        初始化缓存
+
+        Args:
+            cache_dir: 缓存目录，为None时使用 default_cache_dir()
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self._key: Optional[bytes] = None
+        self._key_loaded = False
+        self._key_lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(source: str) -> str:
+        """根据脚本内容和编译器版本计算缓存键"""
+        digest = hashlib.sha256()
+        digest.update(COMPILER_VERSION.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8'))
+        return digest.hexdigest()
+
+    def cache_path(self, script_path: str) -> Path:
+        """
+        获取脚本对应的缓存文件路径
+
+        不同目录下可能有同名脚本，文件名由脚本名和脚本绝对路径的摘要组成。
+        """
+        path = Path(script_path)
+        digest = hashlib.sha256(str(path.resolve()).encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / f"{path.name}.{digest}{CACHE_SUFFIX}"
+
+    def secret(self) -> Optional[bytes]:
+        """条目的签名密钥（首次使用时创建缓存目录和密钥文件），缓存目录不可用时返回None"""
+        if not self._key_loaded:
+            with self._key_lock:
+                if not self._key_loaded:
+                    self._key = self._load_key()
+                    self._key_loaded = True
+        return self._key
+
+    def _load_key(self) -> Optional[bytes]:
+        directory = self.cache_dir
+        try:
+            directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            status = directory.stat()
+            if hasattr(os, "getuid") and (status.st_uid != os.getuid() or status.st_mode & 0o022):
+                return None
+            key_path = directory / KEY_FILE_NAME
+            try:
+                descriptor = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            except FileExistsError:
+                key = key_path.read_bytes()
+                return key if len(key) == KEY_SIZE else None
+            key = secrets.token_bytes(KEY_SIZE)
+            with os.fdopen(descriptor, 'wb') as f:
+                f.write(key)
+            return key
+        except OSError:
+            return None
+
+    def load(self, script_path: str, key: str) -> Optional[ScriptNode]:
+        """读取缓存条目，未命中、签名不符或条目损坏时返回None"""
+        secret = self.secret()
+        if secret is None:
+            return None
+        try:
+            data = self.cache_path(script_path).read_bytes()
+        except OSError:
+            return None
+        signature, payload = data[:KEY_SIZE], data[KEY_SIZE:]
+        if not hmac.compare_digest(signature, hmac.new(secret, payload, hashlib.sha256).digest()):
+            return None
+        try:
+            version, entry_key, script = pickle.loads(payload)
+        except Exception:
+            # 签名正确但内容无法还原（例如AST类已变化）时同样视为未命中，重新编译
+            return None
+        if version != COMPILER_VERSION or entry_key != key or not isinstance(script, ScriptNode):
+            return None
+        return script
+
+    def store(self, script_path: str, key: str, script: ScriptNode) -> bool:
+        """写入缓存条目（先写临时文件再原子替换），缓存目录不可用或写入失败时返回False"""
+        secret = self.secret()
+        if secret is None:
+            return False
+        path = self.cache_path(script_path)
+        temp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        payload = pickle.dumps((COMPILER_VERSION, key, script), protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(hmac.new(secret, payload, hashlib.sha256).digest())
+                f.write(payload)
+            os.replace(temp_path, path)
+            return True
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            return False
+
+
+def load_script(script_path: str, cache: Optional[ScriptCache] = None) -> ScriptNode:
+    """
+    读取并编译脚本文件
+
+    Args:
+        script_path: DSL脚本文件路径
+        cache: 编译缓存，为None时不使用缓存
+
+    Returns:
+        编译后的ScriptNode
+    """
+    with open(script_path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    return compile_cached(script_path, source, cache)
+
+
+def compile_cached(script_path: str, source: str, cache: Optional[ScriptCache] = None) -> ScriptNode:
+    """编译已读取的脚本源码，缓存命中时跳过编译"""
+    if cache is None:
+        return compile_source(source)
+
+    key = cache.cache_key(source)
+    script = cache.load(script_path, key)
+    if script is None:
+        script = compile_source(source)
+        cache.store(script_path, key, script)
+    return script
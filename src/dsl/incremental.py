@@ -0,0 +1,153 @@
+"""
+增量编译（Incremental Parse）
+按 step 块切分新源码，只对文本发生变化的块重新进行词法和语法分析，未变化的块复用上一版本的解析结果
+"""
+
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import re
+
+from src.dsl.lexer import Lexer, Token
+from src.dsl.parser import Parser, ParseError
+from src.dsl.ast import ScriptNode, StepNode
+
+
+# 空白和注释（写成无歧义的形式，避免回溯爆炸）
+_BLANK = r'[ \t\r\n]*(?:#[^\n]*(?=\n|\Z)[ \t\r\n]*)*'
+
+# 顶层的 step 头部：step <name> {，前面可以有空白和注释
+_STEP_HEADER = re.compile(_BLANK + r'(step)[ \t\r]+[A-Za-z_]\w*' + _BLANK + r'\{')
+
+# step 块体：一直匹配到结束的 }，期间的字符串和注释作为整体跳过。
+# 写成 普通字符* (特殊片段 普通字符*)* 的展开形式，整个块体由一次C层匹配完成；
+# 块内出现 {、未闭合的引号或缺少 } 时匹配失败
+_BODY_PATTERN = re.compile(r'''
+    [^{}"'\#]*
+    (?:
+        (?: "[^"\\]*(?:\\.[^"\\]*)*"
+          | '[^'\\]*(?:\\.[^'\\]*)*'
+          | \#[^\n]*(?=\n|\Z)
+        )
+        [^{}"'\#]*
+    )*
+    \}
+''', re.VERBOSE | re.DOTALL)
+
+# 脚本末尾只允许空白和注释
+_TRAILER = re.compile(_BLANK + r'\Z')
+
+
+def split_steps(source: str) -> Optional[List[Tuple[int, int, int]]]:
+    """
+    将源码切分为 step 块
+
+    Returns:
+        (起始位置, 结束位置, 起始行号) 列表；结构不规则（无法可靠切分）时返回None，
+        由调用方退回整体编译，以便给出与Parser一致的错误信息
+    """
+    chunks: List[Tuple[int, int, int]] = []
+    position = 0
+    line = 1
+
+    while not _TRAILER.match(source, position):
+        header = _STEP_HEADER.match(source, position)
+        if not header:
+            return None
+        start = header.start(1)
+        line += source.count('\n', position, start)
+
+        # 寻找与 { 配对的 }
+        body = _BODY_PATTERN.match(source, header.end())
+        if not body:
+            return None
+        end = body.end()
+
+        chunks.append((start, end, line))
+        line += source.count('\n', start, end)
+        position = end
+
+    return chunks
+
+
+def fingerprint(text: str) -> bytes:
+    """计算 step 块文本的指纹"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+
+def incremental_parse(previous: Optional[ScriptNode], source: str) -> ScriptNode:
+    """
+    增量编译脚本
+
+    Args:
+        previous: 上一版本的ScriptNode（可以为None）
+        source: 新的脚本源码
+
+    Returns:
+        新的ScriptNode。文本未变化的 step 块复用上一版本解析的结果：StepNode和语句节点浅拷贝后
+        更新行号（上一版本可能仍在为会话服务，其节点不做任何修改），只有发生变化的块被重新解析，
+        step_map 根据新的 steps 重建，符号表从上一版本派生（链接时登记新的变量名）
+    """
+    chunks = split_steps(source)
+    if chunks is None:
+        return _derive_symbols(Parser(Lexer(source)).parse(), previous)
+
+    # 上一版本中可复用的StepNode：指纹 -> 节点
+    reusable: Dict[bytes, List[StepNode]] = {}
+    if previous is not None:
+        for step in previous.steps:
+            if step.fingerprint is not None:
+                reusable.setdefault(step.fingerprint, []).append(step)
+
+    steps: List[StepNode] = []
+    for start, end, line in chunks:
+        text = source[start:end]
+        digest = fingerprint(text)
+        candidates = reusable.get(digest)
+        if candidates:
+            step = _reuse(candidates.pop(), line)
+        else:
+            step = _parse_chunk(text, line, start - source.rfind('\n', 0, start) - 1)
+            step.fingerprint = digest
+        steps.append(step)
+
+    return _derive_symbols(ScriptNode(steps), previous)
+
+
+def _derive_symbols(script: ScriptNode, previous: Optional[ScriptNode]) -> ScriptNode:
+    """新版本的符号表从上一版本派生，会话在两个版本之间切换时槽位保持不变"""
+    if previous is not None and previous.symbols is not None:
+        script.symbols = previous.symbols.derive()
+    return script
+
+
+def _parse_chunk(text: str, line: int, column: int) -> StepNode:
+    """解析单个 step 块，并把行号（首行还有列号）换算回整个脚本中的位置"""
+    try:
+        script = Parser(Lexer(text)).parse()
+    except ParseError as e:
+        if e.token is None:
+            raise
+        token = e.token
+        shifted = Token(token.token_type, token.value, token.line_number + line - 1,
+                        token.column + column if token.line_number == 1 else token.column)
+        raise ParseError(e.message, shifted) from None
+
+    step = script.steps[0]
+    _shift_lines(step, line - 1)
+    return step
+
+
+def _reuse(step: StepNode, line: int) -> StepNode:
+    """复制上一版本的StepNode及其语句，并移到新的起始行（链接结果不复制，由新版本重新链接）"""
+    reused = step.copy()
+    _shift_lines(reused, line - step.line_number)
+    return reused
+
+
+def _shift_lines(step: StepNode, delta: int):
+    """平移 step 及其语句的行号"""
+    if not delta:
+        return
+    step.line_number += delta
+    for statement in step.statements:
+        statement.line_number += delta
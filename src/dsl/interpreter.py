@@ -3,13 +3,16 @@
 执行抽象语法树，驱动脚本流程
 """
 
-from typing import Optional, Callable, Any
+from typing import Optional, Callable, Any, Iterator, Generator, Union
 from src.dsl.ast import (
     ScriptNode, StepNode, SpeakNode, ListenNode, 
-    BranchNode, SetNode, EndNode, ASTNode
+    BranchNode, SetNode, EndNode, ASTNode, compile_template, classify_listen,
+    RECOGNIZE_ALWAYS, RECOGNIZE_NEVER, RECOGNIZE_TEXT, RECOGNIZE_USER
 )
+from src.dsl.symbols import USER_INTENT_SLOT
 from src.runtime.execution_context import ExecutionContext
-import re
+from src.runtime.profiler import ActiveTimer, Profiler
+from time import perf_counter
 import os
 
 
@@ -18,22 +21,35 @@ class InterpreterError(Exception):
     pass
 
 
+class IntentRequest:
+    """执行过程中需要的一次意图识别：逐个执行时立即识别，批量执行时由调用方统一发起"""
+    
+    __slots__ = ('user_input', 'result', 'error')
+    
+    def __init__(self, user_input: str):
+        self.user_input = user_input
+        self.result: Optional[dict[str, Any]] = None  # 意图识别结果
+        self.error: Optional[Exception] = None  # 意图识别抛出的异常
+
+
 class Interpreter:
     """解释器：执行AST"""
     
-    def __init__(self, script: ScriptNode, intent_analyzer: Optional[Callable[[str], dict[str, Any]]] = None, max_recursion_depth: int = 100):
+    def __init__(self, script: ScriptNode, intent_analyzer: Optional[Callable[[str], dict[str, Any]]] = None, step_budget: int = 1000,
+                 batch_intent_analyzer: Optional[Callable[[list], list]] = None, profiler: Optional[Profiler] = None):
         self.script = script
         self.intent_analyzer = intent_analyzer  # 意图识别函数
-        self.max_recursion_depth = max_recursion_depth  # 最大递归深度
+        self.batch_intent_analyzer = batch_intent_analyzer  # 批量意图识别函数：输入列表 -> 结果（或异常）列表
+        self.step_budget = step_budget  # 每轮对话最多进入的Step数，防止脚本无限跳转
+        self.profiler = profiler  # 执行剖析器（None表示不统计）
     
-    def execute(self, context: ExecutionContext, input_callback: Optional[Callable[[str], str]] = None, recursion_depth: int = 0) -> dict[str, Any]:
+    def execute(self, context: ExecutionContext, input_callback: Optional[Callable[[str], str]] = None) -> dict[str, Any]:
         """
         执行脚本
         
         Args:
             context: 执行上下文
             input_callback: 用户输入回调函数，接收提示信息，返回用户输入
-            recursion_depth: 当前递归深度（内部使用）
         
         Returns:
             执行结果字典，包含：
@@ -42,34 +58,126 @@ class Interpreter:
             - next_step: 下一个要执行的Step名称
             - error: 错误信息（如果有）
         """
+        return self._drive(self._execute(context, input_callback))
+    
+    def _drive(self, events: Generator[Union[str, IntentRequest], None, dict[str, Any]]) -> dict[str, Any]:
+        """驱动执行生成器直到结束：完成意图识别请求，丢弃话术，返回执行结果"""
         try:
-            # 检查递归深度
-            if recursion_depth >= self.max_recursion_depth:
-                return {
-                    "status": "error",
-                    "message": f"递归深度超限（最大{self.max_recursion_depth}），可能存在无限循环",
-                    "error": "Maximum recursion depth exceeded"
-                }
-            
-            # 如果没有当前Step，从start开始
-            if not context.current_step:
-                if "start" in self.script.step_map:
-                    context.set_current_step("start")
+            while True:
+                event = next(events)
+                if type(event) is IntentRequest:
+                    self._analyze(event)
+        except StopIteration as stop:
+            return stop.value
+    
+    def execute_stream(self, context: ExecutionContext,
+                       input_callback: Optional[Callable[[str], str]] = None) -> Iterator[dict[str, Any]]:
+        """
+        以流的形式执行脚本：每条speak渲染后立即产出，不等待整个Step执行完毕
+        
+        Args:
+            context: 执行上下文
+            input_callback: 用户输入回调函数，接收提示信息，返回用户输入
+        
+        Yields:
+            - {"event": "speak", "message": 话术}：每条speak一个事件
+            - {"event": "status", ...}：最后一个事件，其余字段与 execute 的返回值相同
+              （message 仍是合并后的完整消息，已经逐条输出过话术的调用方可以忽略）
+        
+        调用方中途放弃（关闭生成器）时，这一轮在关闭时执行完毕（不再产出话术），
+        会话不会停在半途。各执行引擎的流式执行都使用树遍历解释器逐条执行，
+        保存的执行位置与其他引擎可以互相恢复。
+        """
+        events = self._execute(context, input_callback)
+        finished = False
+        try:
+            while True:
+                event = next(events)
+                if type(event) is IntentRequest:
+                    self._analyze(event)
+                else:
+                    yield {"event": "speak", "message": event}
+        except StopIteration as stop:
+            finished = True
+            yield dict(stop.value, event="status")
+        finally:
+            if not finished:
+                self._drive(events)
+    
+    def execute_batch(self, turns: list) -> list:
+        """
+        批量执行多个会话的一轮对话
+        
+        先推进所有会话中确定性的执行部分，直到每个会话都执行完毕或停在需要意图识别的listen上；
+        然后把所有待识别的输入一起交给 batch_intent_analyzer（未设置时逐个调用 intent_analyzer），
+        再继续推进这些会话，如此反复直到全部执行完毕。
+        
+        Args:
+            turns: [(执行上下文, 输入回调函数)] 列表，同一批中的上下文不能重复
+        
+        Returns:
+            与 turns 顺序一致的执行结果字典列表（与 execute 的返回值相同）
+        """
+        if len({id(context) for context, _ in turns}) != len(turns):
+            raise ValueError("execute_batch requires distinct contexts")
+        
+        results: list = [None] * len(turns)
+        active = [(index, self._execute(context, input_callback))
+                  for index, (context, input_callback) in enumerate(turns)]
+        while active:
+            waiting, requests = [], []
+            for index, events in active:
+                try:
+                    event = next(events)
+                    # 批量执行不输出话术，推进到意图识别请求或执行结束
+                    while type(event) is not IntentRequest:
+                        event = next(events)
+                    waiting.append((index, events))
+                    requests.append(event)
+                except StopIteration as stop:
+                    results[index] = stop.value
+            if requests:
+                self._analyze_batch(requests)
+            active = waiting
+        return results
+    
+    def _analyze_batch(self, requests: list):
+        """一起完成一批意图识别请求"""
+        if self.batch_intent_analyzer is None:
+            for request in requests:
+                self._analyze(request)
+            return
+        started = perf_counter()
+        try:
+            outcomes = self.batch_intent_analyzer([request.user_input for request in requests])
+            for request, outcome in zip(requests, outcomes):
+                if isinstance(outcome, Exception):
+                    request.error = outcome
                 else:
-                    # 如果没有start，使用第一个Step
-                    if self.script.steps:
-                        context.set_current_step(self.script.steps[0].name)
-                    else:
-                        return {
-                            "status": "error",
-                            "message": "脚本中没有定义任何Step",
-                            "error": "No steps defined"
-                        }
-                # 重置语句索引，因为开始新步骤
-                context.set_statement_index(0)
+                    request.result = outcome
+        except Exception as e:
+            for request in requests:
+                request.error = e
+        if self.profiler is not None:
+            self.profiler.record_intent("analyze_batch", perf_counter() - started, len(requests))
+    
+    def _execute(self, context: ExecutionContext,
+                 input_callback: Optional[Callable[[str], str]]) -> Generator[Union[str, IntentRequest], None, dict[str, Any]]:
+        """执行脚本的生成器：逐条产出speak话术和需要驱动方完成的意图识别请求，返回执行结果字典"""
+        try:
+            # 停留在step中的会话继续使用其所属的脚本版本，其余会话使用最新版本
+            # （热加载只替换 self.script，这里读取一次，不需要加锁）
+            script = context.get_script() or self.script
+            
+            error = self._enter_script(script, context)
+            if error:
+                return error
             
             current_step_name = context.get_current_step()
-            step_node = self.script.get_step(current_step_name)
+            # 停留在step中的会话直接恢复到保存的Step节点
+            step_node = context.get_step_node()
+            if step_node is None or step_node.name != current_step_name:
+                step_node = script.get_step(current_step_name)
             
             if not step_node:
                 return {
@@ -79,33 +187,151 @@ class Interpreter:
                 }
             
             # 执行Step中的语句
-            result = self._execute_step(step_node, context, input_callback, recursion_depth)
+            context.set_script(script, step_node)
+            result = yield from self._run_steps(step_node, context, input_callback)
+            # 只有停在step中等待输入的会话才保留所属版本，其余会话下一轮使用最新版本
+            if result.get("status") != "waiting_input":
+                context.set_script(None)
             return result
         
         except Exception as e:
+            context.set_script(None)
             return {
                 "status": "error",
                 "message": f"执行错误: {str(e)}",
                 "error": str(e)
             }
     
-    def _execute_step(self, step: StepNode, context: ExecutionContext, 
-                     input_callback: Optional[Callable[[str], str]], recursion_depth: int = 0) -> dict[str, Any]:
-        """执行Step节点"""
-        messages = []  # 收集所有speak消息
+    def _run_steps(self, step: StepNode, context: ExecutionContext,
+                   input_callback: Optional[Callable[[str], str]]) -> Generator[Union[str, IntentRequest], None, dict[str, Any]]:
+        """
+        从给定的Step开始执行，branch跳转作为循环的下一次迭代（不递归），
+        每轮进入的Step数受 step_budget 限制
+        """
+        messages = []  # 当前Step收集的speak消息，跳转时清空后复用
+        entered = 1
+        profiler = self.profiler
         
-        # 获取当前执行位置（从上次中断的地方继续）
-        start_index = context.get_statement_index()
+        timer = ActiveTimer() if profiler is not None else None
         
-        for index, statement in enumerate(step.statements):
-            # 如果索引小于起始位置，跳过已执行的语句
-            if index < start_index:
-                continue
-            result = self._execute_statement(statement, context, input_callback)
+        while True:
+            if profiler is None:
+                result = yield from self._execute_step(step, context, input_callback, messages)
+            else:
+                started = timer.now()
+                result = yield from self._timed(self._execute_step(step, context, input_callback, messages, timer),
+                                                timer)
+                profiler.record_step(step.name, timer.now() - started)
+            if not result.get("next_step"):
+                return result
+            
+            # 跳转到下一个Step
+            context.set_current_step(result["next_step"])
+            # 重置语句索引，因为跳转到新步骤
+            context.set_statement_index(0)
+            # 跳转进入新的Step时切换到最新的脚本版本；会话所在的就是最新版本且已链接时，
+            # 直接使用branch上链接好的目标节点，否则按名称查找
+            script = self.script
+            context.use_symbols(script.symbols)
+            next_step_node = result.get("target")
+            if next_step_node is None or context.get_script() is not script:
+                next_step_node = script.get_step(result["next_step"])
+            context.set_script(script, next_step_node)
+            
+            if not next_step_node:
+                return self._with_messages(messages, {
+                    "status": "error",
+                    "message": f"Step '{result['next_step']}' 不存在",
+                    "error": f"Step not found: {result['next_step']}"
+                })
+            if entered >= self.step_budget:
+                return self._with_messages(messages, self._budget_exceeded())
+            entered += 1
+            
+            # 当branch跳转时，不合并之前步骤的消息，只显示新步骤的消息
+            # 这样可以避免显示不相关的信息
+            messages.clear()
+            step = next_step_node
+    
+    @staticmethod
+    def _timed(events: Generator, timer: ActiveTimer) -> Generator:
+        """转发生成器产出的事件，挂起期间暂停计时（驱动方可能在此期间执行其他会话）"""
+        while True:
+            try:
+                event = next(events)
+            except StopIteration as stop:
+                return stop.value
+            timer.pause()
+            try:
+                yield event
+            finally:
+                timer.resume()
+    
+    def _budget_exceeded(self) -> dict[str, Any]:
+        """单轮执行的Step数超过上限时的错误结果"""
+        return {
+            "status": "error",
+            "message": f"单轮执行的Step数超过上限（{self.step_budget}），可能存在无限循环",
+            "error": "Step budget exceeded"
+        }
+    
+    @staticmethod
+    def _with_messages(messages: list, result: dict[str, Any]) -> dict[str, Any]:
+        """把已收集的speak消息合并到结果消息之前"""
+        if messages:
+            result["message"] = "\n".join(messages) + "\n" + result.get("message", "")
+        return result
+    
+    def _enter_script(self, script: ScriptNode, context: ExecutionContext) -> Optional[dict[str, Any]]:
+        """按脚本版本的符号表排列会话变量；没有当前Step的会话从入口Step开始，脚本中没有Step时返回错误结果"""
+        context.use_symbols(script.symbols)
+        # 如果没有当前Step，从start开始
+        if not context.current_step:
+            if "start" in script.step_map:
+                context.set_current_step("start")
+            else:
+                # 如果没有start，使用第一个Step
+                if script.steps:
+                    context.set_current_step(script.steps[0].name)
+                else:
+                    return {
+                        "status": "error",
+                        "message": "脚本中没有定义任何Step",
+                        "error": "No steps defined"
+                    }
+            # 重置语句索引，因为开始新步骤
+            context.set_statement_index(0)
+        return None
+    
+    def _execute_step(self, step: StepNode, context: ExecutionContext, input_callback: Optional[Callable[[str], str]],
+                      messages: list, timer: Optional[ActiveTimer] = None) -> Generator[Union[str, IntentRequest], None, dict[str, Any]]:
+        """
+        执行Step节点，直到等待输入、结束、出错或跳转；每条speak的话术渲染后立即产出
+        （启用剖析时由 _run_steps 传入 timer，语句按执行时间计时）
+
+        Returns:
+            执行结果字典；需要跳转时返回branch的结果（带有next_step），由 _run_steps 继续执行
+        """
+        # 从上次中断的位置直接继续，不再逐条跳过已执行的语句
+        statements = step.statements
+        profiler = self.profiler
+        for index in range(context.get_statement_index(), len(statements)):
+            statement = statements[index]
+            if profiler is not None:
+                started = timer.now()
+            if type(statement) is ListenNode:
+                result = yield from self._listen(statement, context, input_callback)
+            else:
+                result = self._execute_statement(statement, context, input_callback)
+            if profiler is not None:
+                profiler.record_statement(step.name, statement.line_number, statement.node_type.value,
+                                          timer.now() - started)
             
             # 收集speak消息
             if isinstance(result, dict) and result.get("status") == "running" and result.get("message"):
                 messages.append(result.get("message"))
+                if type(statement) is SpeakNode:
+                    yield result["message"]
             
             # 如果语句返回结果，需要处理
             if isinstance(result, dict):
@@ -114,9 +340,7 @@ class Interpreter:
                     # 保存当前执行位置，下次从这个位置继续
                     context.set_statement_index(index)
                     # 如果有收集到的消息，合并到结果中
-                    if messages:
-                        result["message"] = "\n".join(messages) + "\n" + result.get("message", "")
-                    return result
+                    return self._with_messages(messages, result)
                 
                 # 如果状态是finished或error，直接返回
                 if result.get("status") in ("finished", "error"):
@@ -129,38 +353,9 @@ class Interpreter:
                             result["message"] = "\n".join(messages) + "\n" + result.get("message", "")
                     return result
                 
-                # 如果有next_step，跳转到下一个Step
+                # 如果有next_step，交给 _run_steps 跳转到下一个Step
                 if result.get("next_step"):
-                    context.set_current_step(result["next_step"])
-                    # 重置语句索引，因为跳转到新步骤
-                    context.set_statement_index(0)
-                    # 递归执行下一个Step，增加递归深度
-                    next_step_node = self.script.get_step(result["next_step"])
-                    if next_step_node:
-                        # 检查递归深度
-                        if recursion_depth + 1 >= self.max_recursion_depth:
-                            error_result = {
-                                "status": "error",
-                                "message": f"递归深度超限（最大{self.max_recursion_depth}），可能存在无限循环",
-                                "error": "Maximum recursion depth exceeded"
-                            }
-                            if messages:
-                                error_result["message"] = "\n".join(messages) + "\n" + error_result["message"]
-                            return error_result
-                        
-                        next_result = self._execute_step(next_step_node, context, input_callback, recursion_depth + 1)
-                        # 当branch跳转时，不合并之前步骤的消息，只显示新步骤的消息
-                        # 这样可以避免显示不相关的信息
-                        return next_result
-                    else:
-                        error_result = {
-                            "status": "error",
-                            "message": f"Step '{result['next_step']}' 不存在",
-                            "error": f"Step not found: {result['next_step']}"
-                        }
-                        if messages:
-                            error_result["message"] = "\n".join(messages) + "\n" + error_result["message"]
-                        return error_result
+                    return result
                 
                 # 如果listen返回running状态，说明已经处理了输入，继续执行下一个语句
                 # 不需要特殊处理，继续循环
@@ -177,6 +372,25 @@ class Interpreter:
             result["message"] = "\n".join(messages)
         return result
     
+    def _listen(self, node: ListenNode, context: ExecutionContext,
+                input_callback: Optional[Callable[[str], str]]) -> Generator[IntentRequest, None, dict[str, Any]]:
+        """执行Listen语句（生成器版本）：需要意图识别时产出 IntentRequest，由驱动方完成识别后继续"""
+        user_input = self._accept_input(node, context, input_callback)
+        if type(user_input) is dict:
+            return user_input
+        
+        if self._needs_intent(node, user_input):
+            request = IntentRequest(user_input)
+            yield request
+            self._apply_intent(request, context)
+        else:
+            self._keep_intent(context)
+        
+        return {
+            "status": "running",
+            "message": f"收到输入: {user_input}"
+        }
+    
     def _execute_statement(self, statement: ASTNode, context: ExecutionContext,
                           input_callback: Optional[Callable[[str], str]]) -> Optional[dict[str, Any]]:
         """执行单个语句"""
@@ -195,7 +409,7 @@ class Interpreter:
     
     def _execute_speak(self, node: SpeakNode, context: ExecutionContext) -> dict[str, Any]:
         """执行Speak语句"""
-        message = self._substitute_variables(node.message, context)
+        message = self._render_template(node.template, context, node.slots)
         return {
             "status": "running",
             "message": message
@@ -204,6 +418,26 @@ class Interpreter:
     def _execute_listen(self, node: ListenNode, context: ExecutionContext,
                        input_callback: Optional[Callable[[str], str]]) -> dict[str, Any]:
         """执行Listen语句"""
+        user_input = self._accept_input(node, context, input_callback)
+        if type(user_input) is dict:
+            return user_input
+        
+        # 如果有意图识别器且需要识别，进行意图识别
+        if self._needs_intent(node, user_input):
+            request = IntentRequest(user_input)
+            self._analyze(request)
+            self._apply_intent(request, context)
+        else:
+            self._keep_intent(context)
+        
+        return {
+            "status": "running",
+            "message": f"收到输入: {user_input}"
+        }
+    
+    def _accept_input(self, node: ListenNode, context: ExecutionContext,
+                      input_callback: Optional[Callable[[str], str]]):
+        """读取并存储用户输入，返回输入文本；没有输入时返回等待输入的结果字典"""
         if not input_callback:
             # 如果没有输入回调，返回等待状态
             return {
@@ -224,42 +458,55 @@ class Interpreter:
             }
         
         # 存储原始输入
-        context.set_variable(node.variable, user_input)
-        
-        # 判断是否需要意图识别
-        # 如果变量名是 user_input 或包含 "input"，通常需要意图识别
-        # 如果变量名是 order_id、complaint_content、suggestion_content 等数据字段，通常不需要意图识别
-        needs_intent_recognition = self._should_recognize_intent(node.variable, user_input)
-        
-        # 如果有意图识别器且需要识别，进行意图识别
-        if self.intent_analyzer and needs_intent_recognition:
-            try:
-                intent_result = self.intent_analyzer(user_input)
-                # 将意图识别结果存储到变量中
-                for key, value in intent_result.items():
-                    context.set_variable(key, value)
-                
-                # 如果识别到意图，存储到user_intent变量
-                if "intent" in intent_result:
-                    recognized_intent = intent_result["intent"]
-                    context.set_variable("user_intent", recognized_intent)
-                    # 调试信息：打印识别到的意图（可选，可以通过环境变量控制）
-                    if os.getenv("DEBUG_INTENT", "").lower() == "true":
-                        print(f"[DEBUG] 用户输入: '{user_input}' -> 识别意图: '{recognized_intent}' (置信度: {intent_result.get('confidence', 0.0):.2f})")
-            except Exception as e:
-                # 意图识别失败，继续执行
-                context.set_variable("user_intent", "unknown")
-                if os.getenv("DEBUG_INTENT", "").lower() == "true":
-                    print(f"[DEBUG] 意图识别失败: {e}")
+        if node.slot is not None:
+            context.set_slot(node.slot, user_input)
         else:
-            # 不需要意图识别时，不要覆盖已有的 user_intent
-            if context.get_variable("user_intent") is None:
-                context.set_variable("user_intent", "unknown")
-        
-        return {
-            "status": "running",
-            "message": f"收到输入: {user_input}"
-        }
+            context.set_variable(node.variable, user_input)
+        return user_input
+    
+    def _needs_intent(self, node: ListenNode, user_input: str) -> bool:
+        """
+        判断是否需要进行意图识别
+        变量名相关的判断已在编译时完成（ListenNode.recognize），这里只检查输入本身
+        """
+        return bool(self.intent_analyzer) and self._recognize_input(node.recognize, user_input)
+    
+    def _analyze(self, request: 'IntentRequest'):
+        """调用意图识别器，结果或异常记录在请求中"""
+        started = perf_counter()
+        try:
+            request.result = self.intent_analyzer(request.user_input)
+        except Exception as e:
+            request.error = e
+        if self.profiler is not None:
+            self.profiler.record_intent("analyze", perf_counter() - started)
+    
+    def _apply_intent(self, request: 'IntentRequest', context: ExecutionContext):
+        """把意图识别结果写入上下文变量，识别失败时意图为unknown"""
+        try:
+            if request.error is not None:
+                raise request.error
+            intent_result = request.result
+            # 将意图识别结果存储到变量中
+            context.set_variables(intent_result)
+            
+            # 如果识别到意图，存储到user_intent变量
+            if "intent" in intent_result:
+                recognized_intent = intent_result["intent"]
+                context.set_slot(USER_INTENT_SLOT, recognized_intent)
+                # 调试信息：打印识别到的意图（可选，可以通过环境变量控制）
+                if os.getenv("DEBUG_INTENT", "").lower() == "true":
+                    print(f"[DEBUG] 用户输入: '{request.user_input}' -> 识别意图: '{recognized_intent}' (置信度: {intent_result.get('confidence', 0.0):.2f})")
+        except Exception as e:
+            # 意图识别失败，继续执行
+            context.set_slot(USER_INTENT_SLOT, "unknown")
+            if os.getenv("DEBUG_INTENT", "").lower() == "true":
+                print(f"[DEBUG] 意图识别失败: {e}")
+    
+    def _keep_intent(self, context: ExecutionContext):
+        """不需要意图识别时，不要覆盖已有的 user_intent"""
+        if context.get_slot(USER_INTENT_SLOT) is None:
+            context.set_slot(USER_INTENT_SLOT, "unknown")
     
     def _should_recognize_intent(self, variable_name: str, user_input: str) -> bool:
         """
@@ -272,114 +519,75 @@ class Interpreter:
         Returns:
             是否需要意图识别
         """
-        # 变量名包含 "input" 或 "intent" 的，通常需要意图识别
-        if "input" in variable_name.lower() or "intent" in variable_name.lower():
+        return self._recognize_input(classify_listen(variable_name), user_input)
+    
+    @staticmethod
+    def _recognize_input(recognize: str, user_input: str) -> bool:
+        """按listen语句的意图识别方式（RECOGNIZE_*）判断这次输入是否需要意图识别"""
+        if recognize == RECOGNIZE_ALWAYS:
             return True
-        
-        var_lower = variable_name.lower()
-
-        # 变量名是数据字段的，通常不需要意图识别
-        data_fields = {
-            "order_id",
-            "complaint_id",
-            "complaint_content",
-            "suggestion_content",
-            "contact_info",
-            "refund_reason",
-            "refund_reason_code",
-            "refund_reason_detail",
-            "logistics_number",
-            "confirm",
-        }
-        if var_lower in data_fields:
-            # 对于数据字段，如果输入是纯数字，直接跳过意图识别
-            if user_input.strip().isdigit():
-                return False
-            # 如果是退款原因等字段的文字描述，则可以尝试意图识别
-            # 例如用户直接输入“质量问题”
-            if var_lower.startswith("refund_reason"):
-                return True
+        if recognize == RECOGNIZE_NEVER:
             return False
         
-        # 如果输入是纯数字且很短（1-3位），可能是数据而不是意图
-        if user_input.strip().isdigit() and len(user_input.strip()) <= 3:
-            # 检查是否可能是菜单选项（1-9）
-            if len(user_input.strip()) == 1 and user_input.strip() in "123456789":
-                # 可能是菜单选项，需要意图识别
-                return True
-            # 其他短数字可能是数据（如订单号的一部分）
-            return False
+        text = user_input.strip()
+        if recognize == RECOGNIZE_TEXT:
+            # 纯数字直接跳过意图识别，文字描述尝试意图识别
+            return not text.isdigit()
         
-        # 默认情况下，如果变量名看起来像用户输入，进行意图识别
-        # 否则不进行意图识别
-        return "user" in variable_name.lower() or "input" in variable_name.lower()
+        # 如果输入是纯数字且很短（1-3位），可能是数据而不是意图
+        if text.isdigit() and len(text) <= 3:
+            # 菜单选项（1-9）需要意图识别，其他短数字可能是数据（如订单号的一部分）
+            return len(text) == 1 and text in "123456789"
+        return recognize == RECOGNIZE_USER
     
-    def _execute_branch(self, node: BranchNode, context: ExecutionContext) -> dict[str, Any]:
+    def _execute_branch(self, node: BranchNode, context: ExecutionContext) -> Optional[dict[str, Any]]:
         """执行Branch语句"""
-        # 解析条件表达式
-        # 格式：variable == "value" 或 variable != "value"
-        condition = node.condition
-        
-        # 使用正则表达式解析条件
-        # 匹配：identifier operator value
-        pattern = r'(\w+)\s*(==|!=)\s*(".*?"|\'.*?\'|\w+)'
-        match = re.match(pattern, condition)
-        
-        if not match:
-            raise InterpreterError(f"Invalid branch condition: {condition}")
-        
-        var_name = match.group(1)
-        operator = match.group(2)
-        value_str = match.group(3)
-        
-        # 获取变量值
-        var_value = context.get_variable(var_name)
-        
-        # 解析比较值（去除引号）
-        if value_str.startswith('"') and value_str.endswith('"'):
-            compare_value = value_str[1:-1]
-        elif value_str.startswith("'") and value_str.endswith("'"):
-            compare_value = value_str[1:-1]
-        else:
-            # 可能是变量名或数字
-            compare_value = context.get_variable(value_str)
-            if compare_value is None:
-                # 尝试作为数字
-                try:
-                    if '.' in value_str:
-                        compare_value = float(value_str)
-                    else:
-                        compare_value = int(value_str)
-                except ValueError:
-                    compare_value = value_str
-        
-        # 执行比较
-        if operator == "==":
-            condition_met = str(var_value) == str(compare_value)
-        elif operator == "!=":
-            condition_met = str(var_value) != str(compare_value)
-        else:
-            raise InterpreterError(f"Unsupported operator: {operator}")
-        
         # 如果条件满足，跳转到目标Step
-        if condition_met:
+        if self._evaluate_condition(node, context):
             return {
                 "status": "running",
-                "next_step": node.target_step
+                "next_step": node.target_step,
+                "target": node.target
             }
         
         # 条件不满足，继续执行下一条语句
         return None
     
+    def _evaluate_condition(self, node: BranchNode, context: ExecutionContext) -> bool:
+        """计算Branch语句的条件（使用语法分析时生成的结构化条件，不再解析条件字符串）"""
+        predicate = node.predicate
+        if predicate is None:
+            raise InterpreterError(f"Invalid branch condition: {node.condition}")
+        
+        # 比较按字符串进行，右侧的字面量已在编译时转换为字符串
+        slot = node.variable_slot
+        value = context.get_slot(slot) if slot is not None else context.get_variable(predicate.variable)
+        if type(value) is not str:
+            value = str(value)
+        expected = predicate.literal
+        if predicate.reference is not None:
+            # 右侧是标识符时优先取同名变量的值
+            slot = node.reference_slot
+            referenced = context.get_slot(slot) if slot is not None else context.get_variable(predicate.reference)
+            if referenced is not None:
+                expected = referenced if type(referenced) is str else str(referenced)
+        return (value == expected) != predicate.negate
+    
     def _execute_set(self, node: SetNode, context: ExecutionContext) -> None:
         """执行Set语句"""
         # 如果值是变量名，需要获取变量值
-        if isinstance(node.value, str) and context.get_variable(node.value) is not None:
-            value = context.get_variable(node.value)
+        if node.value_slot is not None:
+            referenced = context.get_slot(node.value_slot)
+        elif isinstance(node.value, str):
+            referenced = context.get_variable(node.value)
         else:
-            value = node.value
+            referenced = None
+        value = node.value if referenced is None else referenced
         
-        context.set_variable(node.variable, value)
+        if node.slot is not None:
+            context.set_slot(node.slot, value)
+        else:
+            context.set_variable(node.variable, value)
         return None
     
     def _execute_end(self, node: EndNode, context: ExecutionContext) -> dict[str, Any]:
@@ -389,15 +597,20 @@ class Interpreter:
             "message": "流程结束"
         }
     
+    def _render_template(self, template: tuple, context: ExecutionContext, slots: Optional[tuple] = None) -> str:
+        """渲染编译后的话术：常量直接返回，否则代入变量后拼接一次（链接过的话术按槽位取值）"""
+        if len(template) == 1:
+            return template[0]
+        parts = list(template)
+        for index in range(1, len(parts), 2):
+            if slots is not None:
+                value = context.get_slot(slots[index])
+            else:
+                value = context.get_variable(parts[index])
+            # 变量不存在时保留占位符
+            parts[index] = str(value) if value is not None else "${" + parts[index] + "}"
+        return "".join(parts)
+    
     def _substitute_variables(self, text: str, context: ExecutionContext) -> str:
-        """替换文本中的变量占位符"""
-        # 简单的变量替换：${variable_name}
-        pattern = r'\$\{(\w+)\}'
-        
-        def replace_var(match):
-            var_name = match.group(1)
-            value = context.get_variable(var_name)
-            return str(value) if value is not None else match.group(0)
-        
-        return re.sub(pattern, replace_var, text)
-
+        """替换文本中的变量占位符：${variable_name}"""
+        return self._render_template(compile_template(text), context)
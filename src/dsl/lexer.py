@@ -3,7 +3,8 @@
 将DSL脚本文件解析为Token序列
 """
 
-from typing import List, Optional
+from typing import Iterable, Iterator, List, Optional
+from array import array
 from enum import Enum
 import re
 
@@ -40,6 +41,8 @@ class TokenType(Enum):
 class Token:
     """Token类：表示词法单元"""
     
+    __slots__ = ('token_type', 'value', 'line_number', 'column')
+    
     def __init__(self, token_type: TokenType, value: str, line_number: int = 0, column: int = 0):
         self.token_type = token_type
         self.value = value
@@ -56,9 +59,96 @@ class Token:
                 self.value == other.value)
 
 
+class TokenBuffer:
+    """
+    紧凑Token缓冲区（结构数组）
+    
+    用并行数组保存类型编码、值偏移、行号和列号，所有Token的值拼接在一个字符串池中，
+    第i个Token的值为 pool[value_offsets[i]:value_offsets[i + 1]]。
+    按下标访问时才临时构造Token对象。
+    """
+    
+    __slots__ = ('type_codes', 'value_offsets', 'line_numbers', 'columns', 'pool')
+    
+    # 类型编码表：编码为TokenType在枚举中的序号
+    TOKEN_TYPES = tuple(TokenType)
+    TYPE_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+    
+    def __init__(self, tokens: Iterable[Token] = ()):
+        self.type_codes = array('B')
+        self.value_offsets = array('I', [0])
+        self.line_numbers = array('I')
+        self.columns = array('I')
+        
+        type_codes = self.TYPE_CODES
+        values = []
+        offset = 0
+        for token in tokens:
+            self.type_codes.append(type_codes[token.token_type])
+            offset += len(token.value)
+            self.value_offsets.append(offset)
+            self.line_numbers.append(token.line_number)
+            self.columns.append(token.column)
+            values.append(token.value)
+        self.pool = ''.join(values)
+    
+    def __len__(self) -> int:
+        return len(self.type_codes)
+    
+    def token_type(self, index: int) -> TokenType:
+        """获取第index个Token的类型"""
+        return self.TOKEN_TYPES[self.type_codes[index]]
+    
+    def value(self, index: int) -> str:
+        """获取第index个Token的值"""
+        return self.pool[self.value_offsets[index]:self.value_offsets[index + 1]]
+    
+    def __getitem__(self, index: int) -> Token:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("token index out of range")
+        return Token(self.token_type(index), self.value(index), self.line_numbers[index], self.columns[index])
+    
+    def __iter__(self) -> Iterator[Token]:
+        for index in range(len(self)):
+            yield self[index]
+    
+    def __repr__(self):
+        return f"TokenBuffer(tokens={len(self)})"
+
+
+# 快速引擎使用的主正则：一次匹配一个词法单元，分组名即单元类别
+# ASCII以外的起始字符交给 OTHER 分支，按旧引擎的 isdigit/isalpha 规则处理
+_MASTER_PATTERN = re.compile(r'''
+    (?P<NEWLINE>\n)
+  | (?P<SKIP>[ \t\r]+)
+  | (?P<COMMENT>\#[^\n]*)
+  | (?P<STRING>"(?P<DQ>(?:[^"\\]|\\.)*)(?:"|\\?\Z)|'(?P<SQ>(?:[^'\\]|\\.)*)(?:'|\\?\Z))
+  | (?P<NUMBER>[0-9][\d.]*)
+  | (?P<IDENT>[A-Za-z_]\w*)
+  | (?P<OP>==|!=|->|[{}=])
+  | (?P<OTHER>.)
+''', re.VERBOSE | re.DOTALL)
+
+_NUMBER_TAIL = re.compile(r'[\d.]*')
+_IDENT_TAIL = re.compile(r'\w*')
+_ESCAPE_PATTERN = re.compile(r'\\(.)', re.DOTALL)
+_ESCAPES = {'n': '\n', 't': '\t'}
+
+
+def _unescape(match) -> str:
+    """转义序列替换：\\n、\\t 之外的转义都还原为字符本身"""
+    char = match.group(1)
+    return _ESCAPES.get(char, char)
+
+
 class Lexer:
     """词法分析器"""
     
+    # 可选的词法分析引擎：fast 为单遍主正则扫描，legacy 为逐字符扫描
+    ENGINES = ('fast', 'legacy')
+    
     # 关键字映射
     KEYWORDS = {
         'step': TokenType.STEP,
@@ -69,8 +159,21 @@ class Lexer:
         'end': TokenType.END,
     }
     
-    def __init__(self, source: str):
+    # 运算符映射
+    OPERATORS = {
+        '{': TokenType.LBRACE,
+        '}': TokenType.RBRACE,
+        '=': TokenType.EQUALS,
+        '==': TokenType.EQ,
+        '!=': TokenType.NE,
+        '->': TokenType.ARROW,
+    }
+    
+    def __init__(self, source: str, engine: str = 'fast'):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown lexer engine: {engine}")
         self.source = source
+        self.engine = engine
         self.position = 0
         self.line_number = 1
         self.column = 0
@@ -163,7 +266,82 @@ class Lexer:
     
     def tokenize(self) -> List[Token]:
         """执行词法分析，返回Token列表"""
-        self.tokens = []
+        self.tokens = list(self.iter_tokens())
+        return self.tokens
+    
+    def tokenize_compact(self) -> TokenBuffer:
+        """执行词法分析，返回紧凑的结构数组Token缓冲区"""
+        return TokenBuffer(self.iter_tokens())
+    
+    def iter_tokens(self) -> Iterator[Token]:
+        """执行词法分析，以生成器方式逐个产出Token（不保留完整列表）"""
+        if self.engine == 'fast':
+            return self._iter_fast()
+        return self._iter_legacy()
+    
+    def _iter_fast(self) -> Iterator[Token]:
+        """快速引擎：用主正则单遍扫描，按切片取值"""
+        source = self.source
+        keywords = self.KEYWORDS
+        operators = self.OPERATORS
+        line = 1
+        line_start = 0  # 当前行首字符的位置，列号 = 位置 - 行首
+        position = 0
+        length = len(source)
+        match_at = _MASTER_PATTERN.match
+        
+        while position < length:
+            match = match_at(source, position)
+            kind = match.lastgroup
+            end = match.end()
+            
+            if kind == 'SKIP' or kind == 'COMMENT':
+                pass
+            elif kind == 'NEWLINE':
+                yield Token(TokenType.NEWLINE, '\n', line, position - line_start)
+                line += 1
+                line_start = end
+            elif kind == 'IDENT':
+                value = match.group()
+                yield Token(keywords.get(value.lower(), TokenType.IDENTIFIER), value, line, position - line_start)
+            elif kind == 'STRING':
+                raw = match.group('DQ')
+                if raw is None:
+                    raw = match.group('SQ')
+                value = _ESCAPE_PATTERN.sub(_unescape, raw) if '\\' in raw else raw
+                yield Token(TokenType.STRING, value, line, position - line_start)
+                newlines = source.count('\n', position, end)
+                if newlines:
+                    line += newlines
+                    line_start = source.rindex('\n', position, end) + 1
+            elif kind == 'NUMBER':
+                yield Token(TokenType.NUMBER, match.group(), line, position - line_start)
+            elif kind == 'OP':
+                value = match.group()
+                yield Token(operators[value], value, line, position - line_start)
+            else:
+                # ASCII以外的字符：与旧引擎一致，先判断数字，再判断字母
+                char = match.group()
+                if char.isdigit():
+                    end = _NUMBER_TAIL.match(source, end).end()
+                    yield Token(TokenType.NUMBER, source[position:end], line, position - line_start)
+                elif char.isalpha():
+                    end = _IDENT_TAIL.match(source, end).end()
+                    value = source[position:end]
+                    yield Token(keywords.get(value.lower(), TokenType.IDENTIFIER), value, line, position - line_start)
+                else:
+                    yield Token(TokenType.UNKNOWN, char, line, position - line_start)
+            position = end
+        
+        self.position = position
+        self.line_number = line
+        self.column = position - line_start
+        
+        # 添加EOF标记
+        yield Token(TokenType.EOF, '', line, position - line_start)
+    
+    def _iter_legacy(self) -> Iterator[Token]:
+        """旧引擎：逐字符扫描"""
         self.position = 0
         self.line_number = 1
         self.column = 0
@@ -181,7 +359,7 @@ class Lexer:
             
             # 换行符
             if self.current_char() == '\n':
-                self.tokens.append(Token(TokenType.NEWLINE, '\n', self.line_number, self.column))
+                yield Token(TokenType.NEWLINE, '\n', self.line_number, self.column)
                 self.advance()
                 continue
             
@@ -192,56 +370,54 @@ class Lexer:
             # 字符串字面量
             if char in ('"', "'"):
                 value = self.read_string()
-                self.tokens.append(Token(TokenType.STRING, value, start_line, start_column))
+                yield Token(TokenType.STRING, value, start_line, start_column)
                 continue
             
             # 数字
             if char.isdigit():
                 value = self.read_number()
-                self.tokens.append(Token(TokenType.NUMBER, value, start_line, start_column))
+                yield Token(TokenType.NUMBER, value, start_line, start_column)
                 continue
             
             # 标识符或关键字
             if char.isalpha() or char == '_':
                 value = self.read_identifier()
                 token_type = self.KEYWORDS.get(value.lower(), TokenType.IDENTIFIER)
-                self.tokens.append(Token(token_type, value, start_line, start_column))
+                yield Token(token_type, value, start_line, start_column)
                 continue
             
             # 运算符和分隔符
             if char == '{':
-                self.tokens.append(Token(TokenType.LBRACE, '{', start_line, start_column))
+                yield Token(TokenType.LBRACE, '{', start_line, start_column)
                 self.advance()
             elif char == '}':
-                self.tokens.append(Token(TokenType.RBRACE, '}', start_line, start_column))
+                yield Token(TokenType.RBRACE, '}', start_line, start_column)
                 self.advance()
             elif char == '=':
                 if self.peek_char() == '=':
                     self.advance()
                     self.advance()
-                    self.tokens.append(Token(TokenType.EQ, '==', start_line, start_column))
+                    yield Token(TokenType.EQ, '==', start_line, start_column)
                 else:
-                    self.tokens.append(Token(TokenType.EQUALS, '=', start_line, start_column))
+                    yield Token(TokenType.EQUALS, '=', start_line, start_column)
                     self.advance()
             elif char == '!':
                 if self.peek_char() == '=':
                     self.advance()
                     self.advance()
-                    self.tokens.append(Token(TokenType.NE, '!=', start_line, start_column))
+                    yield Token(TokenType.NE, '!=', start_line, start_column)
                 else:
-                    self.tokens.append(Token(TokenType.UNKNOWN, char, start_line, start_column))
+                    yield Token(TokenType.UNKNOWN, char, start_line, start_column)
                     self.advance()
             elif char == '-' and self.peek_char() == '>':
                 self.advance()
                 self.advance()
-                self.tokens.append(Token(TokenType.ARROW, '->', start_line, start_column))
+                yield Token(TokenType.ARROW, '->', start_line, start_column)
             else:
                 # 未知字符
-                self.tokens.append(Token(TokenType.UNKNOWN, char, start_line, start_column))
+                yield Token(TokenType.UNKNOWN, char, start_line, start_column)
                 self.advance()
         
         # 添加EOF标记
-        self.tokens.append(Token(TokenType.EOF, '', self.line_number, self.column))
-        
-        return self.tokens
+        yield Token(TokenType.EOF, '', self.line_number, self.column)
 
@@ -0,0 +1,140 @@
+"""
+链接器（Linker）
+在语法分析之后把 branch 的目标名称解析为Step节点引用，并对跳转图进行静态校验
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from src.dsl.ast import ScriptNode, StepNode, BranchNode, ListenNode
+from src.dsl.symbols import BASE_SYMBOLS
+
+
+class LinkError(Exception):
+    """链接错误：跳转目标不存在、Step不可达或存在不经过listen的循环"""
+    def __init__(self, problems: List[str]):
+        self.problems = problems
+        super().__init__("; ".join(problems))
+
+
+def entry_step(script: ScriptNode) -> Optional[StepNode]:
+    """获取脚本入口Step：优先 start，否则为第一个Step"""
+    return script.get_step("start") or (script.steps[0] if script.steps else None)
+
+
+def build_step_graph(script: ScriptNode) -> Dict[str, List[Tuple[str, bool]]]:
+    """
+    构建Step跳转图
+
+    Returns:
+        Step名称 -> [(目标Step名称, 是否经过listen)]。进入Step后总是从第一条语句开始执行，
+        因此一条跳转边“经过listen”是指该branch之前存在listen语句
+    """
+    graph: Dict[str, List[Tuple[str, bool]]] = {}
+    for step in script.steps:
+        edges = graph.setdefault(step.name, [])
+        listened = False
+        for statement in step.statements:
+            if isinstance(statement, ListenNode):
+                listened = True
+            elif isinstance(statement, BranchNode):
+                edges.append((statement.target_step, listened))
+    return graph
+
+
+def _unreachable_steps(script: ScriptNode, graph: Dict[str, List[Tuple[str, bool]]]) -> List[str]:
+    """从入口出发不可达的Step"""
+    entry = entry_step(script)
+    if entry is None:
+        return []
+    reached = {entry.name}
+    pending = [entry.name]
+    while pending:
+        for target, _ in graph.get(pending.pop(), ()):
+            if target not in reached:
+                reached.add(target)
+                pending.append(target)
+    return [step.name for step in script.steps if step.name not in reached]
+
+
+def _silent_cycle(graph: Dict[str, List[Tuple[str, bool]]]) -> Optional[List[str]]:
+    """查找一个不经过listen的跳转循环（迭代式DFS，避免大脚本递归过深），返回循环上的Step名称"""
+    silent = {name: [target for target, listened in edges if not listened and target in graph]
+              for name, edges in graph.items()}
+    state: Dict[str, int] = {}  # 1：在当前路径上，2：已完成
+    for root in silent:
+        if root in state:
+            continue
+        path = [root]
+        iterators = [iter(silent[root])]
+        state[root] = 1
+        while iterators:
+            target = next(iterators[-1], None)
+            if target is None:
+                state[path.pop()] = 2
+                iterators.pop()
+            elif state.get(target) == 1:
+                return path[path.index(target):] + [target]
+            elif target not in state:
+                state[target] = 1
+                path.append(target)
+                iterators.append(iter(silent[target]))
+    return None
+
+
+def link(script: ScriptNode, validate: bool = True) -> ScriptNode:
+    """
+    链接脚本：把每个 branch 的目标解析为Step节点引用，把语句用到的变量名登记到本版本的符号表
+    （script.symbols，未设置时新建）并解析为槽位下标
+
+    链接结果写在节点上，只写入本脚本独占的节点：已被其他版本链接过的Step
+    （例如直接复用上一版本的StepNode构造的脚本，旧版本可能仍在为会话服务）先复制一份再链接。
+
+    Args:
+        script: 语法分析得到的ScriptNode
+        validate: 是否校验跳转图（不可达的Step、不经过listen的循环）
+
+    Returns:
+        链接后的ScriptNode（即传入的对象）
+
+    Raises:
+        LinkError: 存在不存在的跳转目标，或校验未通过。此时不修改任何节点
+    """
+    if any(step.linked for step in script.steps):
+        script.steps = [step.copy() if step.linked else step for step in script.steps]
+        script.step_map = {step.name: step for step in script.steps}
+
+    problems = []
+    resolved: List[Tuple[BranchNode, StepNode]] = []
+    for step in script.steps:
+        for statement in step.statements:
+            if isinstance(statement, BranchNode):
+                target = script.get_step(statement.target_step)
+                if target is None:
+                    problems.append(f"Step '{statement.target_step}' not found "
+                                    f"(branch in step '{step.name}' at line {statement.line_number})")
+                else:
+                    resolved.append((statement, target))
+
+    if validate and not problems:
+        graph = build_step_graph(script)
+        for name in _unreachable_steps(script, graph):
+            problems.append(f"Step '{name}' is unreachable (line {script.get_step(name).line_number})")
+        cycle = _silent_cycle(graph)
+        if cycle:
+            problems.append(f"Cycle without listen: {' -> '.join(cycle)}")
+
+    if problems:
+        raise LinkError(problems)
+
+    # 校验通过后才写入节点，避免失败的链接影响正在使用的旧版本
+    for branch, target in resolved:
+        branch.target = target
+    if script.symbols is None:
+        script.symbols = BASE_SYMBOLS.derive()
+    symbols = script.symbols
+    for step in script.steps:
+        for statement in step.statements:
+            statement.bind(symbols)
+        step.linked = True
+    script.linked = True
+    return script
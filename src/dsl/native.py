@@ -0,0 +1,103 @@
+"""
+转译执行引擎
+执行由转译器生成的Python函数，结果与树遍历解释器（Interpreter）一致
+"""
+
+from typing import Optional, Callable, Any
+
+from src.dsl.interpreter import Interpreter
+from src.dsl.transpiler import transpiled_for, DONE, CONTINUE
+from src.runtime.execution_context import ExecutionContext
+
+
+class NativeInterpreter(Interpreter):
+    """
+    转译执行模式的解释器
+
+    脚本首次执行时转译为Python函数（每个Step按listen切分为若干片段），之后每轮对话
+    从上下文中保存的Step和语句索引找到对应的片段函数继续执行。branch跳转由这里的循环完成，
+    不会递归调用。执行位置的保存方式与 Interpreter 相同，两种实现可以互相恢复；
+    恢复位置不在片段起点时（外部修改了语句索引）交给 Interpreter 执行。
+    流式执行（execute_stream）需要逐条产出话术，沿用 Interpreter 的实现。
+    """
+
+    def execute(self, context: ExecutionContext, input_callback: Optional[Callable[[str], str]] = None) -> dict[str, Any]:
+        """
+        执行脚本
+
+        Args:
+            context: 执行上下文
+            input_callback: 用户输入回调函数，接收提示信息，返回用户输入
+
+        Returns:
+            执行结果字典，与 Interpreter.execute 相同
+        """
+        if self.profiler is not None:
+            # 剖析按Step和语句统计，交给 Interpreter 逐条执行
+            return super().execute(context, input_callback)
+        try:
+            script = context.get_script() or self.script
+            error = self._enter_script(script, context)
+            if error:
+                return error
+
+            step_name = context.get_current_step()
+            entries = transpiled_for(script).entries
+            segments = entries.get(step_name)
+            if segments is None:
+                return {
+                    "status": "error",
+                    "message": f"Step '{step_name}' 不存在",
+                    "error": f"Step not found: {step_name}"
+                }
+            segment = segments.get(context.get_statement_index())
+            if segment is None:
+                return super().execute(context, input_callback)
+
+            messages = []  # 当前Step收集的speak消息，跳转时清空后复用
+            entered = 1
+            while True:
+                operation, value = segment(self, context, input_callback, messages)
+                if operation == CONTINUE:
+                    segment = value
+                    continue
+                if operation == DONE:
+                    # 只有停在step中等待输入的会话才保留所属版本和Step节点
+                    if value.get("status") == "waiting_input":
+                        context.set_script(script, script.get_step(step_name))
+                    else:
+                        context.set_script(None)
+                    return value
+
+                # 跳转进入新的Step时切换到最新的脚本版本
+                step_name = value
+                context.set_current_step(step_name)
+                context.set_statement_index(0)
+                latest = self.script
+                if latest is not script:
+                    script = latest
+                    context.use_symbols(script.symbols)
+                    entries = transpiled_for(script).entries
+                segments = entries.get(step_name)
+                if segments is None:
+                    context.set_script(None)
+                    return self._with_messages(messages, {
+                        "status": "error",
+                        "message": f"Step '{step_name}' 不存在",
+                        "error": f"Step not found: {step_name}"
+                    })
+                if entered >= self.step_budget:
+                    context.set_script(None)
+                    return self._with_messages(messages, self._budget_exceeded())
+                entered += 1
+                # 跳转时不合并之前步骤的消息，只显示新步骤的消息
+                messages.clear()
+                segment = segments[0]
+
+        except Exception as e:
+            context.set_script(None)
+            return {
+                "status": "error",
+                "message": f"执行错误: {str(e)}",
+                "error": str(e)
+            }
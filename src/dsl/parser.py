@@ -3,11 +3,13 @@
 将Token序列解析为抽象语法树（AST）
 """
 
-from typing import List, Optional
+from collections import deque
+from typing import Deque, Iterator, List, Optional
 from src.dsl.lexer import Lexer, Token, TokenType
 from src.dsl.ast import (
     ASTNode, ScriptNode, StepNode, SpeakNode, 
-    ListenNode, BranchNode, SetNode, EndNode
+    ListenNode, BranchNode, SetNode, EndNode, Condition,
+    LISTEN_ANNOTATIONS
 )
 
 
@@ -70,6 +72,10 @@ class Parser:
         self.tokens = self.lexer.tokenize()
         self.position = 0
         
+        return self.parse_script()
+    
+    def parse_script(self) -> ScriptNode:
+        """从当前Token位置开始解析所有Step"""
         # 跳过开头的换行符
         self.skip_newlines()
         
@@ -155,7 +161,19 @@ class Parser:
         var_token = self.expect(TokenType.IDENTIFIER, "Expected variable name after 'listen'")
         variable = var_token.value
         
-        return ListenNode(variable, line_number)
+        # 可选的标注：intent 表示总是进行意图识别，raw 表示不进行意图识别
+        recognize = None
+        annotation_token = self.current_token()
+        if annotation_token and annotation_token.token_type == TokenType.IDENTIFIER:
+            recognize = LISTEN_ANNOTATIONS.get(annotation_token.value.lower())
+            if recognize is None:
+                raise ParseError(
+                    f"Unknown listen annotation '{annotation_token.value}', expected 'intent' or 'raw'",
+                    annotation_token
+                )
+            self.advance()
+        
+        return ListenNode(variable, line_number, recognize)
     
     def parse_branch(self) -> BranchNode:
         """解析Branch语句"""
@@ -185,12 +203,20 @@ class Parser:
         right_token = self.current_token()
         if right_token and right_token.token_type == TokenType.STRING:
             right = f'"{right_token.value}"'
+            predicate = Condition(left, op, right_token.value)
             self.advance()
         elif right_token and right_token.token_type == TokenType.IDENTIFIER:
             right = right_token.value
+            predicate = Condition(left, op, right, reference=right)
             self.advance()
         elif right_token and right_token.token_type == TokenType.NUMBER:
             right = right_token.value
+            # 数字在编译时转换好，比较时不再转换
+            try:
+                literal = float(right) if '.' in right else int(right)
+            except ValueError:
+                literal = right
+            predicate = Condition(left, op, literal)
             self.advance()
         else:
             raise ParseError("Expected value in branch condition", right_token)
@@ -204,7 +230,7 @@ class Parser:
         target_token = self.expect(TokenType.IDENTIFIER, "Expected target step name after '->'")
         target_step = target_token.value
         
-        return BranchNode(condition, target_step, line_number)
+        return BranchNode(condition, target_step, line_number, predicate)
     
     def parse_set(self) -> SetNode:
         """解析Set语句"""
@@ -249,3 +275,52 @@ class Parser:
         token = self.expect(TokenType.END, "Expected 'end' keyword")
         return EndNode(token.line_number)
 
+
+class StreamingParser(Parser):
+    """
+    流式语法分析器
+    
+    通过词法分析器的生成器按需读取Token，只在前瞻缓冲区中保留尚未消费的Token，
+    峰值内存取决于前瞻深度而不是脚本大小。报错的行号和列号与Parser一致。
+    """
+    
+    def __init__(self, lexer: Lexer):
+        super().__init__(lexer)
+        self.buffer: Deque[Token] = deque()  # 前瞻缓冲区
+        self.token_stream: Optional[Iterator[Token]] = None
+    
+    def fill_buffer(self, count: int) -> bool:
+        """从Token流补充缓冲区，直到至少有count个Token；Token流耗尽时返回False"""
+        while len(self.buffer) < count:
+            token = next(self.token_stream, None)
+            if token is None:
+                return False
+            self.buffer.append(token)
+        return True
+    
+    def current_token(self) -> Optional[Token]:
+        """获取当前Token"""
+        if self.buffer or self.fill_buffer(1):
+            return self.buffer[0]
+        return None
+    
+    def peek_token(self, offset: int = 1) -> Optional[Token]:
+        """向前查看Token"""
+        if len(self.buffer) > offset or self.fill_buffer(offset + 1):
+            return self.buffer[offset]
+        return None
+    
+    def advance(self) -> Optional[Token]:
+        """前进一个Token"""
+        if self.buffer or self.fill_buffer(1):
+            self.position += 1
+            return self.buffer.popleft()
+        return None
+    
+    def parse(self) -> ScriptNode:
+        """以流式方式解析整个脚本，返回ScriptNode"""
+        self.token_stream = self.lexer.iter_tokens()
+        self.buffer.clear()
+        self.position = 0
+        
+        return self.parse_script()
@@ -0,0 +1,73 @@
+"""
+符号表（Symbol Table）
+把变量名编号为槽位下标，会话按槽位存储变量值，执行时不再按名称查找
+"""
+
+from typing import Dict, List, Optional
+import threading
+import weakref
+
+
+# 解释器在每次意图识别后写入的变量，所有符号表都把它放在第一个槽位
+USER_INTENT = "user_intent"
+USER_INTENT_SLOT = 0
+
+
+class SymbolTable:
+    """
+    变量名 -> 槽位下标
+
+    每个脚本版本有自己的符号表，链接时登记脚本中出现的变量名，之后不再修改。
+    热加载的新版本从上一版本的符号表派生（derive）：沿用已有的编号，只在末尾追加新的变量名，
+    因此停留在旧版本中的会话和新版本看到的是同一组槽位；不相关的符号表之间，
+    会话按名称重新排列变量（见 ExecutionContext.use_symbols）。
+    """
+
+    def __init__(self, base: Optional['SymbolTable'] = None):
+        """
+        Args:
+            base: 派生自的符号表（复制其全部编号），None表示只包含 user_intent 的根符号表
+        """
+        names = list(base.names) if base is not None else [USER_INTENT]
+        self.names: List[str] = names  # 槽位下标 -> 变量名
+        self.slots: Dict[str, int] = {name: slot for slot, name in enumerate(names)}  # 变量名 -> 槽位下标
+        # 只保留弱引用：旧版本释放后，派生关系不再可查，使用它的会话按名称重新排列
+        self.base = weakref.ref(base) if base is not None else None
+        self.lock = threading.Lock()
+
+    def derive(self) -> 'SymbolTable':
+        """派生新的符号表（已有编号不变，新的变量名追加在末尾）"""
+        return SymbolTable(self)
+
+    def extends(self, other: 'SymbolTable') -> bool:
+        """是否是 other 本身或从它派生（other 的每个槽位在这里编号相同）"""
+        table = self
+        while table is not None:
+            if table is other:
+                return True
+            table = table.base() if table.base is not None else None
+        return False
+
+    def intern(self, name: str) -> int:
+        """获取变量名的槽位下标，第一次出现时分配新的槽位"""
+        slot = self.slots.get(name)
+        if slot is None:
+            with self.lock:
+                slot = self.slots.get(name)
+                if slot is None:
+                    slot = len(self.names)
+                    # 先登记名称再公开下标，读到下标的线程一定能取到名称
+                    self.names.append(name)
+                    self.slots[name] = slot
+        return slot
+
+    def lookup(self, name: str) -> Optional[int]:
+        """获取变量名的槽位下标，未分配时返回None"""
+        return self.slots.get(name)
+
+    def __len__(self):
+        return len(self.names)
+
+
+# 根符号表：只包含 user_intent；新建的会话使用它，链接脚本时从它派生
+BASE_SYMBOLS = SymbolTable()
@@ -0,0 +1,202 @@
+"""
+转译器（Transpiler）
+把ScriptNode转换为Python源码并用 compile() 编译一次：speak变为常量追加，branch变为普通的if比较，
+listen是函数的切分点（等待输入时返回，下一轮从这条listen对应的函数继续）
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+import threading
+import weakref
+
+from src.dsl.ast import ScriptNode, StepNode, SpeakNode, ListenNode, BranchNode, SetNode, EndNode
+from src.dsl.interpreter import InterpreterError
+from src.dsl.symbols import SymbolTable
+
+
+# 片段函数的返回值：(操作, 值)
+DONE = 0  # 值：执行结果字典
+JUMP = 1  # 值：目标Step名称
+CONTINUE = 2  # 值：同一Step中下一个片段函数（从下一条listen开始）
+
+
+class TranspiledScript:
+    """
+    转译后的脚本
+
+    每个Step在第一条语句和每条listen处切分为若干片段，每个片段是一个生成的函数
+    fn(interpreter, context, input_callback, messages) -> (操作, 值)。
+    从listen恢复时直接调用这条listen对应的片段，不需要跳过之前的语句。
+    """
+
+    __slots__ = ('entries', 'source')
+
+    def __init__(self, entries: Dict[str, Dict[int, Callable]], source: str):
+        self.entries = entries  # Step名称 -> {片段起始语句索引: 片段函数}
+        self.source = source  # 生成的Python源码，用于调试
+
+
+class _Generator:
+    """生成一个脚本的Python源码"""
+
+    def __init__(self, symbols: Optional[SymbolTable]):
+        self.symbols = symbols  # 脚本版本的符号表（未链接的脚本为None，变量按名称读写）
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}  # 生成的代码引用的对象（AST节点、set的值）
+        self.functions: List[tuple] = []  # (Step名称, 起始语句索引, 函数名)
+
+    def constant(self, value: Any) -> str:
+        name = f"K{len(self.constants)}"
+        self.constants[name] = value
+        return name
+
+    def load(self, name: str) -> str:
+        """读取变量的表达式：符号表中有的变量按槽位读取，否则按名称"""
+        slot = self.symbols.lookup(name) if self.symbols is not None else None
+        return f"context.get_variable({name!r})" if slot is None else f"get_slot({slot})"
+
+    def store(self, name: str, value: str) -> str:
+        """写入变量的语句"""
+        slot = self.symbols.lookup(name) if self.symbols is not None else None
+        return f"context.set_variable({name!r}, {value})" if slot is None else f"set_slot({slot}, {value})"
+
+    def emit(self, line: str, indent: int = 1):
+        self.lines.append("    " * indent + line)
+
+    def step(self, step: StepNode):
+        statements = step.statements
+        # 片段起点：第一条语句和每条listen
+        starts = [0] + [index for index, statement in enumerate(statements)
+                        if index and isinstance(statement, ListenNode)]
+        names = [f"seg_{len(self.functions) + number}" for number in range(len(starts))]
+        for number, start in enumerate(starts):
+            self.functions.append((step.name, start, names[number]))
+
+        for number, start in enumerate(starts):
+            end = starts[number + 1] if number + 1 < len(starts) else len(statements)
+            self.emit(f"def {names[number]}(interp, context, input_callback, messages):", 0)
+            self.emit("get_slot = context.get_slot")
+            self.emit("set_slot = context.set_slot")
+            self.emit("append = messages.append")
+            for index in range(start, end):
+                self.statement(statements[index], index)
+            if end < len(statements):
+                self.emit(f"return CONTINUE, {names[number + 1]}")
+            else:
+                # Step执行完毕，但没有明确的结束或跳转
+                finished = self.constant(f"Step '{step.name}' 执行完毕")
+                self.emit("context.set_statement_index(0)")
+                self.emit(f"return DONE, {{'status': 'finished', 'message': '\\n'.join(messages) if messages else {finished}}}")
+            self.emit("", 0)
+
+    def statement(self, statement, index: int):
+        if isinstance(statement, SpeakNode):
+            self.speak(statement)
+        elif isinstance(statement, ListenNode):
+            node = self.constant(statement)
+            self.emit(f"result = interp._execute_listen({node}, context, input_callback)")
+            self.emit("if result['status'] == 'waiting_input':")
+            self.emit(f"context.set_statement_index({index})", 2)
+            self.emit("return DONE, interp._with_messages(messages, result)", 2)
+            self.emit("append(result['message'])")
+        elif isinstance(statement, BranchNode):
+            self.branch(statement)
+        elif isinstance(statement, SetNode):
+            self.set(statement)
+        elif isinstance(statement, EndNode):
+            self.emit("return DONE, {'status': 'finished', 'message': '\\n'.join(messages) if messages else '流程结束'}")
+        else:
+            raise ValueError(f"Unknown statement type: {type(statement)}")
+
+    def speak(self, node: SpeakNode):
+        template = node.template
+        if len(template) == 1:
+            # 常量话术，空话术不输出
+            if template[0]:
+                self.emit(f"append({template[0]!r})")
+            return
+        parts = []
+        for index, part in enumerate(template):
+            if index % 2 == 0:
+                if part:
+                    parts.append(repr(part))
+                continue
+            value = f"v{index}"
+            self.emit(f"{value} = {self.load(part)}")
+            # 变量不存在时保留占位符
+            parts.append(f"({'${' + part + '}'!r} if {value} is None else str({value}))")
+        if any(template[0::2]):
+            self.emit(f"append({' + '.join(parts)})")
+        else:
+            self.emit(f"message = {' + '.join(parts)}")
+            self.emit("if message:")
+            self.emit("append(message)", 2)
+
+    def branch(self, node: BranchNode):
+        predicate = node.predicate
+        if predicate is None:
+            self.emit(f"raise InterpreterError({f'Invalid branch condition: {node.condition}'!r})")
+            return
+        # 比较按字符串进行，右侧的字面量已在编译时转换为字符串
+        self.emit(f"value = {self.load(predicate.variable)}")
+        self.emit("if type(value) is not str:")
+        self.emit("value = str(value)", 2)
+        expected = repr(predicate.literal)
+        if predicate.reference is not None:
+            # 右侧是标识符时优先取同名变量的值
+            self.emit(f"expected = {self.load(predicate.reference)}")
+            self.emit("if expected is None:")
+            self.emit(f"expected = {expected}", 2)
+            self.emit("elif type(expected) is not str:")
+            self.emit("expected = str(expected)", 2)
+            expected = "expected"
+        self.emit(f"if value {'!=' if predicate.negate else '=='} {expected}:")
+        self.emit(f"return JUMP, {node.target_step!r}", 2)
+
+    def set(self, node: SetNode):
+        value = self.constant(node.value)
+        if isinstance(node.value, str):
+            # 如果值是变量名，使用变量值
+            if node.value.isidentifier():
+                self.emit(f"referenced = {self.load(node.value)}")
+            else:
+                self.emit(f"referenced = context.get_variable({value})")
+            self.emit(self.store(node.variable, f"{value} if referenced is None else referenced"))
+        else:
+            self.emit(self.store(node.variable, value))
+
+
+def transpile(script: ScriptNode) -> TranspiledScript:
+    """把ScriptNode转译为Python函数"""
+    generator = _Generator(script.symbols)
+    for step in script.steps:
+        generator.step(step)
+    source = "\n".join(generator.lines) + "\n"
+
+    namespace: Dict[str, Any] = {
+        "DONE": DONE, "JUMP": JUMP, "CONTINUE": CONTINUE, "InterpreterError": InterpreterError,
+    }
+    namespace.update(generator.constants)
+    exec(compile(source, "<dsl>", "exec"), namespace)
+
+    entries: Dict[str, Dict[int, Callable]] = {}
+    for step_name, start, function in generator.functions:
+        # 同名的Step以最后一个为准，与 ScriptNode.step_map 一致
+        if start == 0:
+            entries[step_name] = {}
+        entries[step_name][start] = namespace[function]
+    return TranspiledScript(entries, source)
+
+
+# 每个脚本版本只转译一次，多个解释器共享；脚本版本被回收后随之释放
+_transpiled: "weakref.WeakKeyDictionary[ScriptNode, TranspiledScript]" = weakref.WeakKeyDictionary()
+_transpiled_lock = threading.Lock()
+
+
+def transpiled_for(script: ScriptNode) -> TranspiledScript:
+    """获取脚本的转译结果（首次使用时转译）"""
+    transpiled = _transpiled.get(script)
+    if transpiled is None:
+        transpiled = transpile(script)
+        with _transpiled_lock:
+            transpiled = _transpiled.setdefault(script, transpiled)
+    return transpiled
@@ -0,0 +1,148 @@
+"""
+字节码虚拟机（VM）
+在扁平的指令数组上循环执行，结果与树遍历解释器（Interpreter）一致
+"""
+
+from typing import Optional, Callable, Any
+
+from src.dsl.ast import ScriptNode
+from src.dsl.bytecode import (
+    Program, program_for,
+    OP_SPEAK, OP_LISTEN, OP_BRANCH, OP_SET, OP_END
+)
+from src.dsl.interpreter import Interpreter
+from src.runtime.execution_context import ExecutionContext
+
+
+class VMInterpreter(Interpreter):
+    """
+    编译执行模式的解释器
+
+    脚本首次执行时编译为字节码，之后每轮对话从上下文中保存的指令地址继续执行。
+    branch跳转只修改指令地址，不会递归调用；语句的执行语义（意图识别、变量替换、
+    条件计算等）与 Interpreter 共用。流式执行（execute_stream）沿用 Interpreter 的实现，
+    两种实现保存的执行位置可以互相恢复。
+    """
+
+    def execute(self, context: ExecutionContext, input_callback: Optional[Callable[[str], str]] = None) -> dict[str, Any]:
+        """
+        执行脚本
+
+        Args:
+            context: 执行上下文
+            input_callback: 用户输入回调函数，接收提示信息，返回用户输入
+
+        Returns:
+            执行结果字典，与 Interpreter.execute 相同
+        """
+        if self.profiler is not None:
+            # 剖析按Step和语句统计，交给 Interpreter 逐条执行
+            return super().execute(context, input_callback)
+        try:
+            script = context.get_script() or self.script
+            error = self._enter_script(script, context)
+            if error:
+                return error
+
+            program = program_for(script)
+            pc = context.get_program_counter()
+            if pc is None:
+                current_step_name = context.get_current_step()
+                start = program.entry.get(current_step_name)
+                if start is None:
+                    return {
+                        "status": "error",
+                        "message": f"Step '{current_step_name}' 不存在",
+                        "error": f"Step not found: {current_step_name}"
+                    }
+                pc = min(start + context.get_statement_index(), program.step_end[start])
+
+            result = self._run(script, program, pc, context, input_callback)
+            # 只有停在step中等待输入的会话才保留所属版本和指令地址
+            if result.get("status") != "waiting_input":
+                context.set_script(None)
+            return result
+
+        except Exception as e:
+            context.set_script(None)
+            return {
+                "status": "error",
+                "message": f"执行错误: {str(e)}",
+                "error": str(e)
+            }
+
+    def _run(self, script: ScriptNode, program: Program, pc: int, context: ExecutionContext,
+             input_callback: Optional[Callable[[str], str]]) -> dict[str, Any]:
+        """从指令地址pc开始执行，直到等待输入、结束或出错"""
+        opcodes = program.opcodes
+        operands = program.operands
+        messages = []
+        entered = 1  # 本轮进入的Step数
+
+        while True:
+            opcode = opcodes[pc]
+
+            if opcode == OP_SPEAK:
+                node = operands[pc]
+                template = node.template
+                message = template[0] if len(template) == 1 else self._render_template(template, context, node.slots)
+                if message:
+                    messages.append(message)
+                pc += 1
+
+            elif opcode == OP_BRANCH:
+                node, target = operands[pc]
+                if not self._evaluate_condition(node, context):
+                    pc += 1
+                    continue
+                # 跳转进入新的Step时切换到最新的脚本版本
+                latest = self.script
+                if latest is not script:
+                    script = latest
+                    context.use_symbols(script.symbols)
+                    program = program_for(script)
+                    opcodes = program.opcodes
+                    operands = program.operands
+                    target = program.entry.get(node.target_step, -1)
+                context.set_current_step(node.target_step)
+                context.set_statement_index(0)
+                if target < 0:
+                    return self._with_messages(messages, {
+                        "status": "error",
+                        "message": f"Step '{node.target_step}' 不存在",
+                        "error": f"Step not found: {node.target_step}"
+                    })
+                if entered >= self.step_budget:
+                    return self._with_messages(messages, self._budget_exceeded())
+                entered += 1
+                # 跳转时不合并之前步骤的消息，只显示新步骤的消息
+                messages.clear()
+                pc = target
+
+            elif opcode == OP_LISTEN:
+                result = self._execute_listen(operands[pc], context, input_callback)
+                if result["status"] == "waiting_input":
+                    # 保存执行位置，下次从这条listen继续
+                    context.set_statement_index(pc - program.step_start[pc])
+                    context.set_script(script, program_counter=pc)
+                    return self._with_messages(messages, result)
+                messages.append(result["message"])
+                pc += 1
+
+            elif opcode == OP_SET:
+                self._execute_set(operands[pc], context)
+                pc += 1
+
+            elif opcode == OP_END:
+                return {
+                    "status": "finished",
+                    "message": "\n".join(messages) if messages else "流程结束"
+                }
+
+            else:
+                # OP_STEP_END：Step执行完毕，但没有明确的结束或跳转
+                context.set_statement_index(0)
+                return {
+                    "status": "finished",
+                    "message": "\n".join(messages) if messages else f"Step '{operands[pc]}' 执行完毕"
+                }
@@ -3,9 +3,12 @@
 调用大语言模型API进行用户输入的意图识别
 """
 
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import json
 import os
+import threading
 
 
 class IntentAnalyzer:
@@ -117,6 +120,24 @@ class IntentAnalyzer:
                 "error": str(e)
             }
     
+    def analyze_batch(self, user_inputs: List[str], intents: Optional[list] = None,
+                      max_workers: int = 8) -> List[Dict[str, Any]]:
+        """
+        并发识别一批用户输入的意图（每个输入一次API请求，共用同一个客户端连接池）
+        
+        Args:
+            user_inputs: 用户输入列表
+            intents: 可选的意图列表
+            max_workers: 最大并发请求数
+        
+        Returns:
+            与输入顺序一致的识别结果列表
+        """
+        if len(user_inputs) <= 1:
+            return [self.analyze(user_input, intents) for user_input in user_inputs]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(user_inputs))) as executor:
+            return list(executor.map(lambda user_input: self.analyze(user_input, intents), user_inputs))
+    
     def _build_prompt(self, user_input: str, intents: Optional[list] = None, context: Optional[Dict[str, Any]] = None) -> str:
         """构建提示词"""
         prompt = f"用户输入：{user_input}\n\n"
@@ -227,6 +248,10 @@ class MockIntentAnalyzer:
             "其他原因": ["其他", "其他原因", "其他退款原因"]
         }
     
+    def analyze_batch(self, user_inputs: List[str], intents: Optional[list] = None) -> List[Dict[str, Any]]:
+        """模拟批量意图识别"""
+        return [self.analyze(user_input, intents) for user_input in user_inputs]
+    
     def analyze(self, user_input: str, intents: Optional[list] = None) -> Dict[str, Any]:
         """模拟意图识别"""
         user_input_lower = user_input.lower()
@@ -305,3 +330,40 @@ class MockIntentAnalyzer:
             "raw_response": f"Mock analysis for: {user_input}"
         }
 
+
+
+class IntentCache:
+    """
+    意图识别结果缓存（LRU）
+    
+    相同的输入（去掉首尾空白后）直接返回上次的识别结果，不再调用LLM；识别出错的结果不缓存。
+    """
+    
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.Lock()
+    
+    def get(self, user_input: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的识别结果（副本），未命中时返回None"""
+        key = user_input.strip()
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                return None
+            self.entries.move_to_end(key)
+        return dict(result)
+    
+    def put(self, user_input: str, result: Dict[str, Any]):
+        """缓存识别结果，超过容量时淘汰最久未使用的结果"""
+        if "error" in result:
+            return
+        key = user_input.strip()
+        with self.lock:
+            self.entries[key] = dict(result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+    
+    def __len__(self):
+        return len(self.entries)
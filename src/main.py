@@ -7,17 +7,24 @@ import argparse
 import sys
 import os
 import threading
-from typing import Optional, Callable
+from time import perf_counter
+from typing import Dict, List, Optional, Callable, Iterator, Tuple
 from pathlib import Path
 
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.dsl.lexer import Lexer
-from src.dsl.parser import Parser
+from src.dsl.ast import ScriptNode
+from src.dsl.cache import ScriptCache, compile_cached, load_script
 from src.dsl.interpreter import Interpreter
-from src.runtime.execution_context import ContextManager
-from src.llm.intent_analyzer import IntentAnalyzer, MockIntentAnalyzer
+from src.dsl.vm import VMInterpreter
+from src.dsl.native import NativeInterpreter
+from src.runtime.execution_context import ContextManager, ExecutionContext
+from src.runtime.session_store import SessionStore, SQLiteSessionStore
+from src.runtime.hot_reload import ScriptReloader
+from src.runtime.profiler import Profiler
+from src.runtime.metrics import MetricsRegistry, start_http_server
+from src.llm.intent_analyzer import IntentAnalyzer, MockIntentAnalyzer, IntentCache
 
 # 尝试导入配置文件（如果存在）
 try:
@@ -31,11 +38,165 @@ except ImportError:
     DEFAULT_MODEL = None
 
 
+# 意图识别时提供给识别器的候选意图（包含所有业务场景可能用到的意图）
+INTENTS = [
+    "返回主菜单",  # 操作类意图，优先
+    "查看订单详情",
+    "查看物流信息",
+    "重新查询",
+    "重新申请",
+    "商品质量问题",
+    "商品与描述不符",
+    "不需要了",
+    "其他原因",
+    "查询进度",
+    "查询投诉",
+    "提交投诉",
+    "提交建议",
+    "物流查询",
+    "退款申请",
+    "订单查询",
+    "产品咨询",
+    "投诉建议"
+]
+
+
+# 执行引擎：tree 为树遍历解释器，vm 为字节码虚拟机，native 为转译为Python函数执行
+ENGINES = {
+    "tree": Interpreter,
+    "vm": VMInterpreter,
+    "native": NativeInterpreter,
+}
+
+
+def create_intent_analyzer(use_mock_llm: bool = False, api_key: Optional[str] = None,
+                           base_url: Optional[str] = None, model: Optional[str] = None):
+    """创建意图识别器，无法初始化LLM接口时退回模拟模式"""
+    if use_mock_llm:
+        return MockIntentAnalyzer()
+    try:
+        return IntentAnalyzer(api_key=api_key, base_url=base_url, model=model)
+    except Exception as e:
+        print(f"警告：无法初始化LLM接口，使用模拟模式。错误：{e}")
+        return MockIntentAnalyzer()
+
+
+def prepare_turn(context: ExecutionContext, user_input: Optional[str] = None) -> Callable[[str], str]:
+    """
+    为一轮对话设置待处理输入，返回供解释器使用的输入回调函数
+    
+    Args:
+        context: 用户的执行上下文
+        user_input: 用户输入（如果为None，则继续执行当前流程）
+    """
+    # 如果提供了用户输入，设置为待处理输入
+    if user_input:
+        context.set_pending_input(user_input)
+        context.set_variable("last_input", user_input)
+        # 重置输入使用标志，允许新的输入被使用
+        # 注意：这里不直接重置，因为set_pending_input已经处理了
+    
+    # 定义输入回调函数
+    def input_callback(prompt: str) -> str:
+        # 尝试获取并消费待处理的输入（只能使用一次）
+        pending = context.get_and_consume_input()
+        if pending:
+            return pending
+        # 如果没有待处理的输入，返回空字符串（表示等待输入）
+        return ""
+    
+    return input_callback
+
+
+def run_turn(interpreter: Interpreter, context: ExecutionContext, user_input: Optional[str] = None) -> dict:
+    """
+    在给定上下文上执行一轮对话
+    
+    Args:
+        interpreter: 解释器
+        context: 用户的执行上下文
+        user_input: 用户输入（如果为None，则继续执行当前流程）
+    
+    Returns:
+        执行结果字典
+    """
+    # 执行解释器
+    return interpreter.execute(context, prepare_turn(context, user_input))
+
+
+def run_turn_stream(interpreter: Interpreter, context: ExecutionContext,
+                    user_input: Optional[str] = None) -> Iterator[dict]:
+    """
+    在给定上下文上执行一轮对话，逐条产出speak话术，最后产出执行结果（见 Interpreter.execute_stream）
+    
+    第一次取值时才设置待处理输入并开始执行；中途关闭时这一轮执行完毕后才返回。
+    
+    Args:
+        interpreter: 解释器
+        context: 用户的执行上下文
+        user_input: 用户输入（如果为None，则继续执行当前流程）
+    """
+    yield from interpreter.execute_stream(context, prepare_turn(context, user_input))
+
+
+class AgentMetrics:
+    """
+    Agent系统的运行指标
+    
+    每轮对话的耗时分为解释执行和意图识别（LLM）两部分；吞吐按 Prometheus 惯例记录为
+    计数器 agent_turns_total，用 rate() 得到 turns/sec。批量处理只计入轮数和整批的耗时。
+    """
+    
+    def __init__(self, active_sessions: Callable[[], int]):
+        self.registry = MetricsRegistry(prefix="agent_")
+        registry = self.registry
+        self.turns = registry.counter("turns_total", "处理的对话轮数")
+        self.turn_seconds = registry.histogram("turn_seconds", "每轮对话的总耗时（秒）")
+        self.interpreter_seconds = registry.histogram("interpreter_seconds", "每轮对话中解释执行的耗时（秒），不含意图识别")
+        self.llm_seconds = registry.histogram("llm_seconds", "每轮对话中意图识别（LLM）的耗时（秒）")
+        self.batch_seconds = registry.histogram("batch_seconds", "每次批量处理的总耗时（秒）")
+        self.intent_cache_hits = registry.counter("intent_cache_hits_total", "意图识别缓存命中次数")
+        self.intent_cache_misses = registry.counter("intent_cache_misses_total", "意图识别缓存未命中次数")
+        self.sessions_evicted = registry.counter("sessions_evicted_total", "因空闲超时或会话数上限被淘汰的会话数")
+        registry.gauge("active_sessions", "当前的会话数", active_sessions)
+        self.llm_time = threading.local()  # 当前线程正在处理的这一轮中意图识别的累计耗时
+    
+    def start_turn(self):
+        """开始统计一轮对话"""
+        self.llm_time.seconds = 0.0
+    
+    def add_llm_time(self, seconds: float):
+        """累计意图识别的耗时"""
+        self.llm_time.seconds = getattr(self.llm_time, "seconds", 0.0) + seconds
+    
+    def finish_turn(self, seconds: float):
+        """记录一轮对话的耗时"""
+        llm = min(getattr(self.llm_time, "seconds", 0.0), seconds)
+        self.turns.inc()
+        self.turn_seconds.observe(seconds)
+        self.llm_seconds.observe(llm)
+        self.interpreter_seconds.observe(seconds - llm)
+    
+    def intent_cache_hit_rate(self) -> float:
+        """意图识别缓存命中率（没有查询过缓存时为0）"""
+        hits, misses = self.intent_cache_hits.value, self.intent_cache_misses.value
+        return hits / (hits + misses) if hits + misses else 0.0
+    
+    def export_text(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        return self.registry.export_text()
+
+
 class AgentSystem:
     """Agent系统：管理多个用户的对话"""
     
     def __init__(self, script_path: str, use_mock_llm: bool = False, api_key: Optional[str] = None, 
-                 base_url: Optional[str] = None, model: Optional[str] = None):
+                 base_url: Optional[str] = None, model: Optional[str] = None,
+                 use_cache: bool = True, cache_dir: Optional[str] = None, engine: str = "tree",
+                 profiler: Optional[Profiler] = None, intent_cache_size: int = 0,
+                 session_ttl: Optional[float] = None, max_sessions: Optional[int] = None,
+                 on_session_evict: Optional[Callable[[str, ExecutionContext, str], None]] = None,
+                 session_store: Optional[SessionStore] = None):
         """
         初始化Agent系统
         
@@ -45,59 +206,111 @@ class AgentSystem:
             api_key: LLM API密钥
             base_url: API基础URL（用于DeepSeek等兼容OpenAI的API）
             model: 使用的模型名称
+            use_cache: 是否使用编译缓存（命中时跳过词法和语法分析）
+            cache_dir: 缓存目录，默认为当前用户的缓存目录（见 default_cache_dir）
+            engine: 执行引擎，见 ENGINES
+            profiler: 执行剖析器（None表示不统计）
+            intent_cache_size: 意图识别结果缓存的容量（0表示不缓存）
+            session_ttl: 会话的最长空闲时间（秒），超过后由后台线程清理（None表示不清理）
+            max_sessions: 最多保留的会话数，超过时淘汰最久未访问的会话（None表示不限制）
+            on_session_evict: 会话被淘汰后的回调 (user_id, context, reason)，可用于持久化
+            session_store: 会话存储（每轮对话结束后保存会话状态，重启后按需恢复），None表示不持久化
         """
-        # 读取并解析脚本
-        with open(script_path, 'r', encoding='utf-8') as f:
-            script_content = f.read()
-        
-        lexer = Lexer(script_content)
-        parser = Parser(lexer)
-        self.script = parser.parse()
+        # 读取并解析脚本（优先使用编译缓存）
+        self.script_path = script_path
+        self.cache = ScriptCache(cache_dir) if use_cache else None
+        script = load_script(script_path, self.cache)
+        self.reloader: Optional[ScriptReloader] = None
         
         # 初始化意图识别器
-        if use_mock_llm:
-            self.intent_analyzer = MockIntentAnalyzer()
-        else:
-            try:
-                self.intent_analyzer = IntentAnalyzer(api_key=api_key, base_url=base_url, model=model)
-            except Exception as e:
-                print(f"警告：无法初始化LLM接口，使用模拟模式。错误：{e}")
-                self.intent_analyzer = MockIntentAnalyzer()
+        self.intent_analyzer = create_intent_analyzer(use_mock_llm, api_key, base_url, model)
+        
+        self.intent_cache = IntentCache(intent_cache_size) if intent_cache_size > 0 else None
+        
+        # 运行指标
+        self.metrics = AgentMetrics(lambda: len(self.context_manager))
+        
+        # 上下文管理器
+        def on_evict(user_id: str, context: ExecutionContext, reason: str):
+            self.metrics.sessions_evicted.inc()
+            if on_session_evict is not None:
+                on_session_evict(user_id, context, reason)
+        
+        self.context_manager = ContextManager(idle_ttl=session_ttl, max_sessions=max_sessions, on_evict=on_evict,
+                                              store=session_store)
+        if session_ttl is not None:
+            self.context_manager.start_sweeper()
         
         # 创建意图识别包装函数
         def analyze_intent(user_input: str) -> dict:
-            # 包含所有可能的意图，确保意图识别器能正确识别
-            intents = [
-                "返回主菜单",  # 操作类意图，优先
-                "查看订单详情",
-                "查看物流信息",
-                "重新查询",
-                "重新申请",
-                "商品质量问题",
-                "商品与描述不符",
-                "不需要了",
-                "其他原因",
-                "查询进度",
-                "查询投诉",
-                "提交投诉",
-                "提交建议",
-                "物流查询",
-                "退款申请",
-                "订单查询",
-                "产品咨询",
-                "投诉建议"
-            ]
-            return self.intent_analyzer.analyze(user_input, intents)
+            cached = self._cached_intent(user_input)
+            if cached is not None:
+                return cached
+            started = perf_counter()
+            try:
+                # 包含所有可能的意图，确保意图识别器能正确识别
+                result = self.intent_analyzer.analyze(user_input, INTENTS)
+            finally:
+                self.metrics.add_llm_time(perf_counter() - started)
+            if self.intent_cache is not None:
+                self.intent_cache.put(user_input, result)
+            return result
         
-        # 创建解释器
-        self.interpreter = Interpreter(self.script, analyze_intent)
+        def analyze_intents(user_inputs: List[str]) -> List[dict]:
+            # 批量处理时一起发起意图识别（只识别缓存未命中的输入）
+            results = [self._cached_intent(user_input) for user_input in user_inputs]
+            missing = [index for index, result in enumerate(results) if result is None]
+            if missing:
+                started = perf_counter()
+                try:
+                    analyzed = self.intent_analyzer.analyze_batch([user_inputs[index] for index in missing], INTENTS)
+                finally:
+                    self.metrics.add_llm_time(perf_counter() - started)
+                for index, result in zip(missing, analyzed):
+                    results[index] = result
+                    if self.intent_cache is not None and isinstance(result, dict):
+                        self.intent_cache.put(user_inputs[index], result)
+            return results
         
-        # 上下文管理器
-        self.context_manager = ContextManager()
+        # 创建解释器
+        self.interpreter = ENGINES[engine](script, analyze_intent, batch_intent_analyzer=analyze_intents,
+                                           profiler=profiler)
         
         # 线程锁
         self.lock = threading.Lock()
     
+    def _cached_intent(self, user_input: str) -> Optional[dict]:
+        """从意图识别缓存中查找结果，并记录命中情况；未启用缓存时返回None"""
+        if self.intent_cache is None:
+            return None
+        result = self.intent_cache.get(user_input)
+        if result is None:
+            self.metrics.intent_cache_misses.inc()
+        else:
+            self.metrics.intent_cache_hits.inc()
+        return result
+    
+    @property
+    def script(self):
+        """当前使用的脚本（热加载后为最新版本）"""
+        return self.interpreter.script
+    
+    def enable_hot_reload(self, poll_interval: float = 1.0) -> ScriptReloader:
+        """
+        启用脚本热加载：后台监视脚本所在目录，脚本变化后自动重新编译并替换
+        
+        Args:
+            poll_interval: 轮询间隔（秒）
+        
+        Returns:
+            热加载器
+        """
+        if self.reloader is None:
+            self.reloader = ScriptReloader(str(Path(self.script_path).parent), poll_interval, self.cache)
+            self.reloader.watch(self.script_path, self.interpreter)
+            self.reloader.start()
+        return self.reloader
+    
     def process_user_input(self, user_id: str, user_input: Optional[str] = None) -> dict:
         """
         处理用户输入
@@ -111,33 +324,224 @@ class AgentSystem:
         """
         # 获取或创建用户上下文
         context = self.context_manager.get_context(user_id)
+        self.metrics.start_turn()
+        started = perf_counter()
+        result = run_turn(self.interpreter, context, user_input)
+        self.metrics.finish_turn(perf_counter() - started)
+        self.context_manager.save(context)
+        return result
+    
+    def process_user_input_stream(self, user_id: str, user_input: Optional[str] = None) -> Iterator[dict]:
+        """
+        处理用户输入，每条speak话术产生后立即产出，便于前端逐条刷新
         
-        # 如果提供了用户输入，设置为待处理输入
-        if user_input:
-            context.set_pending_input(user_input)
-            context.set_variable("last_input", user_input)
-            # 重置输入使用标志，允许新的输入被使用
-            # 注意：这里不直接重置，因为set_pending_input已经处理了
+        Args:
+            user_id: 用户ID
+            user_input: 用户输入（如果为None，则继续执行当前流程）
         
-        # 定义输入回调函数
-        def input_callback(prompt: str) -> str:
-            # 尝试获取并消费待处理的输入（只能使用一次）
-            pending = context.get_and_consume_input()
-            if pending:
-                return pending
-            # 如果没有待处理的输入，返回空字符串（表示等待输入）
-            return ""
+        Yields:
+            {"event": "speak", "message": 话术} 事件，最后是 {"event": "status", ...} 执行结果
+        """
+        context = self.context_manager.get_context(user_id)
+        return self._measure_stream(context, run_turn_stream(self.interpreter, context, user_input))
+    
+    def _measure_stream(self, context: ExecutionContext, events: Iterator[dict]) -> Iterator[dict]:
+        """
+        统计流式处理的一轮对话耗时（不含调用方处理事件的时间），结束后保存会话
         
-        # 执行解释器
-        result = self.interpreter.execute(context, input_callback)
+        调用方中途放弃时，关闭内层生成器（这一轮在关闭时执行完毕）后同样记录耗时并保存会话。
+        """
+        self.metrics.start_turn()
+        elapsed = 0.0
+        try:
+            while True:
+                started = perf_counter()
+                event = next(events, None)
+                elapsed += perf_counter() - started
+                if event is None:
+                    break
+                yield event
+        finally:
+            started = perf_counter()
+            events.close()
+            elapsed += perf_counter() - started
+            self.metrics.finish_turn(elapsed)
+            self.context_manager.save(context)
+    
+    def process_batch(self, turns: List[Tuple[str, Optional[str]]]) -> List[dict]:
+        """
+        批量处理多个用户的输入
         
-        return result
+        所有会话先执行到需要意图识别的位置，再一起发起意图识别，之后继续执行。
+        同一个用户在一批中出现多次时，按出现顺序分到后续的子批次中依次处理。
+        
+        Args:
+            turns: [(用户ID, 用户输入)] 列表，用户输入为None表示继续执行当前流程
+        
+        Returns:
+            与 turns 顺序一致的执行结果字典列表
+        """
+        started = perf_counter()
+        results: List[Optional[dict]] = [None] * len(turns)
+        remaining = list(enumerate(turns))
+        while remaining:
+            wave, deferred, seen = [], [], set()
+            for index, (user_id, user_input) in remaining:
+                if user_id in seen:
+                    deferred.append((index, (user_id, user_input)))
+                    continue
+                seen.add(user_id)
+                context = self.context_manager.get_context(user_id)
+                wave.append((index, context, prepare_turn(context, user_input)))
+            batch_results = self.interpreter.execute_batch([(context, callback) for _, context, callback in wave])
+            for (index, context, _), result in zip(wave, batch_results):
+                results[index] = result
+                self.context_manager.save(context)
+            remaining = deferred
+        self.metrics.turns.inc(len(turns))
+        self.metrics.batch_seconds.observe(perf_counter() - started)
+        return results
     
     def start_conversation(self, user_id: str = "default"):
         """开始一个新对话"""
         context = self.context_manager.get_context(user_id)
         context.clear()
         return self.process_user_input(user_id)
+    
+    def close(self):
+        """停止后台清理线程，写入并关闭会话存储"""
+        self.context_manager.stop_sweeper()
+        if self.context_manager.store is not None:
+            self.context_manager.store.close()
+
+
+class ScenarioRegistry:
+    """
+    多业务场景注册表
+    
+    所有场景共享一个意图识别器（及其LLM客户端连接池）和一个上下文管理器，
+    内容相同的脚本只加载一份ScriptNode，各场景的解释器只引用共享的脚本。
+    链接后的ScriptNode不再被修改：热加载为变化的脚本编译出新的版本（复用的Step是拷贝，
+    见 incremental_parse），只替换监视该路径的解释器，共享同一版本的其他场景不受影响。
+    """
+    
+    def __init__(self, use_mock_llm: bool = False, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, model: Optional[str] = None,
+                 use_cache: bool = True, cache_dir: Optional[str] = None, engine: str = "tree"):
+        """
+        初始化场景注册表
+        
+        Args:
+            use_mock_llm: 是否使用模拟LLM（用于测试）
+            api_key: LLM API密钥
+            base_url: API基础URL（用于DeepSeek等兼容OpenAI的API）
+            model: 使用的模型名称
+            use_cache: 是否使用编译缓存
+            cache_dir: 缓存目录，默认为当前用户的缓存目录（见 default_cache_dir）
+            engine: 执行引擎，见 ENGINES
+        """
+        self.cache = ScriptCache(cache_dir) if use_cache else None
+        self.engine = ENGINES[engine]
+        self.intent_analyzer = create_intent_analyzer(use_mock_llm, api_key, base_url, model)
+        self.context_manager = ContextManager()
+        self.interpreters: Dict[str, Interpreter] = {}  # 场景ID -> 解释器
+        self.script_paths: Dict[str, str] = {}  # 场景ID -> 脚本路径
+        self.scripts: Dict[str, ScriptNode] = {}  # 脚本内容哈希 -> 共享的ScriptNode
+        self.reloader: Optional[ScriptReloader] = None
+    
+    def analyze_intent(self, user_input: str) -> dict:
+        """所有场景共用的意图识别函数"""
+        return self.intent_analyzer.analyze(user_input, INTENTS)
+    
+    def register(self, scenario_id: str, script_path: str) -> Interpreter:
+        """
+        注册一个业务场景
+        
+        Args:
+            scenario_id: 场景ID
+            script_path: DSL脚本文件路径
+        
+        Returns:
+            该场景的解释器
+        """
+        with open(script_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        
+        key = ScriptCache.cache_key(source)
+        script = self.scripts.get(key)
+        if script is None:
+            script = compile_cached(script_path, source, self.cache)
+            self.scripts[key] = script
+        
+        interpreter = self.engine(script, self.analyze_intent)
+        self.interpreters[scenario_id] = interpreter
+        self.script_paths[scenario_id] = script_path
+        if self.reloader is not None:
+            self.reloader.watch(script_path, interpreter)
+        return interpreter
+    
+    def load_directory(self, directory: str) -> List[str]:
+        """加载目录下的所有 .dsl 脚本，以文件名（不含扩展名）作为场景ID，返回场景ID列表"""
+        scenario_ids = []
+        for script_path in sorted(Path(directory).glob("*.dsl")):
+            self.register(script_path.stem, str(script_path))
+            scenario_ids.append(script_path.stem)
+        return scenario_ids
+    
+    def scenarios(self) -> List[str]:
+        """获取已注册的场景ID"""
+        return list(self.interpreters)
+    
+    def get_interpreter(self, scenario_id: str) -> Interpreter:
+        """获取场景的解释器"""
+        if scenario_id not in self.interpreters:
+            raise KeyError(f"Unknown scenario: {scenario_id}")
+        return self.interpreters[scenario_id]
+    
+    def get_context(self, scenario_id: str, user_id: str) -> ExecutionContext:
+        """获取用户在某个场景中的执行上下文（同一用户在不同场景中的状态相互独立）"""
+        return self.context_manager.get_context(f"{scenario_id}:{user_id}")
+    
+    def process_user_input(self, scenario_id: str, user_id: str, user_input: Optional[str] = None) -> dict:
+        """
+        按场景ID路由并处理用户输入
+        
+        Args:
+            scenario_id: 场景ID
+            user_id: 用户ID
+            user_input: 用户输入（如果为None，则继续执行当前流程）
+        
+        Returns:
+            执行结果字典
+        """
+        interpreter = self.get_interpreter(scenario_id)
+        return run_turn(interpreter, self.get_context(scenario_id, user_id), user_input)
+    
+    def process_user_input_stream(self, scenario_id: str, user_id: str,
+                                  user_input: Optional[str] = None) -> Iterator[dict]:
+        """按场景ID路由并处理用户输入，逐条产出speak话术（见 AgentSystem.process_user_input_stream）"""
+        interpreter = self.get_interpreter(scenario_id)
+        return run_turn_stream(interpreter, self.get_context(scenario_id, user_id), user_input)
+    
+    def start_conversation(self, scenario_id: str, user_id: str = "default"):
+        """在指定场景中开始一个新对话"""
+        self.get_context(scenario_id, user_id).clear()
+        return self.process_user_input(scenario_id, user_id)
+    
+    def enable_hot_reload(self, directory: str, poll_interval: float = 1.0) -> ScriptReloader:
+        """
+        启用热加载：监视脚本目录，已注册（以及之后注册）的场景脚本变化后自动重新加载
+        
+        Args:
+            directory: 脚本目录
+            poll_interval: 轮询间隔（秒）
+        """
+        if self.reloader is None:
+            self.reloader = ScriptReloader(directory, poll_interval, self.cache)
+            for scenario_id, script_path in self.script_paths.items():
+                self.reloader.watch(script_path, self.interpreters[scenario_id])
+            self.reloader.start()
+        return self.reloader
 
 
 def interactive_mode(agent: AgentSystem, user_id: str = "default"):
@@ -254,6 +658,16 @@ def main():
     parser.add_argument("--base-url", help="API基础URL（用于DeepSeek等兼容OpenAI的API）")
     parser.add_argument("--model", help="使用的模型名称（DeepSeek使用：deepseek-chat）")
     parser.add_argument("--user-id", default="default", help="用户ID（默认：default）")
+    parser.add_argument("--cache-dir", help="编译缓存目录（默认：~/.cache/dsl）")
+    parser.add_argument("--no-cache", action="store_true", help="不使用编译缓存")
+    parser.add_argument("--hot-reload", action="store_true", help="脚本文件变化时自动重新加载")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="tree", help="执行引擎（默认：tree）")
+    parser.add_argument("--profile", metavar="FILE", help="统计各Step和语句的执行耗时，退出时导出到文件")
+    parser.add_argument("--metrics-port", type=int, help="在本机该端口提供 Prometheus 格式的运行指标（/metrics）")
+    parser.add_argument("--intent-cache", type=int, default=0, help="意图识别结果缓存的容量（默认：0，不缓存）")
+    parser.add_argument("--session-ttl", type=float, help="会话的最长空闲时间（秒），超过后自动清理")
+    parser.add_argument("--max-sessions", type=int, help="最多保留的会话数，超过时淘汰最久未访问的会话")
+    parser.add_argument("--session-db", metavar="FILE", help="把会话状态保存到该SQLite文件，重启后恢复")
     
     args = parser.parse_args()
     
@@ -270,10 +684,24 @@ def main():
     try:
         # 创建Agent系统
         agent = AgentSystem(args.script, use_mock_llm=args.mock, api_key=api_key, 
-                           base_url=base_url, model=model)
+                           base_url=base_url, model=model,
+                           use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                           engine=args.engine, profiler=Profiler() if args.profile else None,
+                           intent_cache_size=args.intent_cache,
+                           session_ttl=args.session_ttl, max_sessions=args.max_sessions,
+                           session_store=SQLiteSessionStore(args.session_db) if args.session_db else None)
+        if args.hot_reload:
+            agent.enable_hot_reload()
+        if args.metrics_port is not None:
+            start_http_server(agent.metrics.registry, args.metrics_port)
         
         # 进入交互模式
-        interactive_mode(agent, args.user_id)
+        try:
+            interactive_mode(agent, args.user_id)
+        finally:
+            agent.close()
+            if args.profile:
+                agent.interpreter.profiler.export(args.profile)
     
     except Exception as e:
         print(f"错误: {e}")
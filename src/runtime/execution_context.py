@@ -3,31 +3,191 @@
 管理每个用户的独立执行环境，包括变量表、当前Step等状态
 """
 
-from typing import Dict, Any, Optional
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict, Any, Callable, List, Optional, Tuple
+import logging
 import threading
+import time
+
+from src.dsl.ast import ScriptNode, StepNode
+from src.dsl.symbols import BASE_SYMBOLS, SymbolTable
+from src.runtime.session_store import SessionStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# 槽位中没有值（区别于值为None的变量）
+UNSET = object()
+
+
+class Variables(MutableMapping):
+    """会话变量的可写视图：读写直接作用于执行上下文（按名称访问，见 ExecutionContext）"""
+    
+    __slots__ = ('context',)
+    
+    def __init__(self, context: 'ExecutionContext'):
+        self.context = context
+    
+    def __getitem__(self, name: str) -> Any:
+        value = self.context._load(name)
+        if value is UNSET:
+            raise KeyError(name)
+        return value
+    
+    def __setitem__(self, name: str, value: Any):
+        self.context.set_variable(name, value)
+    
+    def __delitem__(self, name: str):
+        if not self.context.delete_variable(name):
+            raise KeyError(name)
+    
+    def __iter__(self):
+        return iter(self.context._snapshot())
+    
+    def __len__(self):
+        return len(self.context._snapshot())
+    
+    def copy(self) -> Dict[str, Any]:
+        """所有已设置的变量（副本）"""
+        return self.context._snapshot()
+    
+    def __repr__(self):
+        return repr(self.context._snapshot())
 
 
 class ExecutionContext:
-    """执行上下文：为每个用户维护独立的执行状态"""
+    """
+    执行上下文：为每个用户维护独立的执行状态
+    
+    变量按会话当前脚本版本的符号表（symbols）分配的槽位存储在列表中，列表长度只取决于
+    该脚本用到的变量；脚本中没有出现的变量（外部按名称设置的变量、意图识别结果中的字段等）
+    存放在 overflow 字典中。解释器执行链接过的脚本时直接按槽位读写（get_slot/set_slot，不加锁）；
+    外部调用方使用按名称的接口或 variables 视图。
+    """
     
     def __init__(self, user_id: str):
         self.user_id = user_id
-        self.variables: Dict[str, Any] = {}
+        self.symbols: SymbolTable = BASE_SYMBOLS  # 槽位布局所依据的符号表（进入脚本时切换，见 use_symbols）
+        self.values: List[Any] = [UNSET] * len(BASE_SYMBOLS)  # 槽位下标 -> 变量值
+        self.overflow: Dict[str, Any] = {}  # 符号表中没有的变量
         self.current_step: Optional[str] = None
         self.pending_input: Optional[str] = None  # 待处理的用户输入
         self.input_used: bool = False  # 输入是否已被使用
         self.statement_index: int = 0  # 当前执行到的语句索引
+        self.script: Optional[ScriptNode] = None  # 会话停留在step中时所属的脚本版本（热加载时继续使用旧版本）
+        self.step_node: Optional[StepNode] = None  # 会话停留的Step节点（恢复执行时不再按名称查找）
+        self.program_counter: Optional[int] = None  # 字节码执行模式下会话停留的指令地址
         self.lock = threading.Lock()  # 用于线程安全
+        self.last_access: float = 0.0  # 上下文管理器最近一次返回该上下文的时间（启用淘汰时更新）
+    
+    @property
+    def variables(self) -> Variables:
+        """所有已设置的变量（可写视图；需要副本时使用 variables.copy()）"""
+        return Variables(self)
+    
+    def use_symbols(self, symbols: Optional[SymbolTable]):
+        """
+        按脚本版本的符号表排列槽位（解释器进入脚本或切换脚本版本时调用）
+        
+        - 新的符号表从当前的派生：槽位编号不变，只扩充列表；
+        - 当前的符号表从新的派生（停留在旧版本中的会话）：当前布局已经兼容，不做处理；
+        - 不相关的符号表：按名称重新排列。
+        之后 overflow 中已在符号表登记的变量移入槽位。未链接的脚本（symbols为None）不做处理。
+        """
+        if symbols is None or symbols is self.symbols:
+            return
+        with self.lock:
+            current = self.symbols
+            if current.extends(symbols):
+                return
+            if symbols.extends(current):
+                self.values.extend([UNSET] * (len(symbols) - len(self.values)))
+            else:
+                variables = self._slot_items()
+                self.values = [UNSET] * len(symbols)
+                self.overflow.update(variables)
+            self.symbols = symbols
+            if self.overflow:
+                for name in [name for name in self.overflow if name in symbols.slots]:
+                    self.values[symbols.slots[name]] = self.overflow.pop(name)
     
     def set_variable(self, name: str, value: Any):
         """设置变量"""
         with self.lock:
-            self.variables[name] = value
+            self._store_name(name, value)
+    
+    def set_variables(self, variables: Dict[str, Any]):
+        """一次设置多个变量"""
+        with self.lock:
+            for name, value in variables.items():
+                self._store_name(name, value)
     
     def get_variable(self, name: str) -> Any:
         """获取变量值"""
+        value = self._load(name)
+        return None if value is UNSET else value
+    
+    def delete_variable(self, name: str) -> bool:
+        """删除变量，返回变量是否存在"""
+        with self.lock:
+            slot = self.symbols.lookup(name)
+            if slot is not None and slot < len(self.values) and self.values[slot] is not UNSET:
+                self.values[slot] = UNSET
+                return True
+            return self.overflow.pop(name, UNSET) is not UNSET
+    
+    def get_slot(self, slot: int) -> Any:
+        """按槽位获取变量值（解释器的快速路径，单个会话同一时间只在一个线程中执行）"""
+        try:
+            value = self.values[slot]
+        except IndexError:
+            return None
+        return None if value is UNSET else value
+    
+    def set_slot(self, slot: int, value: Any):
+        """按槽位设置变量值"""
+        try:
+            self.values[slot] = value
+        except IndexError:
+            with self.lock:
+                self._store(slot, value)
+    
+    def _load(self, name: str) -> Any:
+        """按名称读取变量，不存在时返回UNSET"""
         with self.lock:
-            return self.variables.get(name)
+            slot = self.symbols.lookup(name)
+            if slot is None:
+                return self.overflow.get(name, UNSET)
+            return self.values[slot] if slot < len(self.values) else UNSET
+    
+    def _store_name(self, name: str, value: Any):
+        """按名称写入：符号表中有的变量写入槽位，其余写入 overflow（调用方持有锁）"""
+        slot = self.symbols.lookup(name)
+        if slot is None:
+            self.overflow[name] = value
+        else:
+            self._store(slot, value)
+    
+    def _store(self, slot: int, value: Any):
+        """写入槽位，列表短于符号表时先扩充（调用方持有锁）"""
+        values = self.values
+        if slot >= len(values):
+            values.extend([UNSET] * (max(len(self.symbols), slot + 1) - len(values)))
+        values[slot] = value
+    
+    def _slot_items(self) -> Dict[str, Any]:
+        """槽位中已设置的变量（调用方持有锁）"""
+        names = self.symbols.names
+        return {names[slot]: value for slot, value in enumerate(self.values) if value is not UNSET}
+    
+    def _snapshot(self) -> Dict[str, Any]:
+        """所有已设置的变量（副本）"""
+        with self.lock:
+            variables = self._slot_items()
+            variables.update(self.overflow)
+            return variables
     
     def set_current_step(self, step_name: str):
         """设置当前执行的Step"""
@@ -56,11 +216,60 @@ class ExecutionContext:
     def clear(self):
         """清空执行上下文"""
         with self.lock:
-            self.variables.clear()
+            self.values[:] = [UNSET] * len(self.values)
+            self.overflow.clear()
             self.current_step = None
             self.pending_input = None
             self.input_used = False
             self.statement_index = 0
+            self.script = None
+            self.step_node = None
+            self.program_counter = None
+    
+    def set_script(self, script: Optional[ScriptNode], step_node: Optional[StepNode] = None,
+                   program_counter: Optional[int] = None):
+        """设置会话当前所属的脚本版本、所在的Step节点和指令地址（None表示使用解释器的最新版本）"""
+        with self.lock:
+            self.script = script
+            self.step_node = step_node
+            self.program_counter = program_counter
+    
+    def get_script(self) -> Optional[ScriptNode]:
+        """获取会话当前所属的脚本版本"""
+        with self.lock:
+            return self.script
+    
+    def get_step_node(self) -> Optional[StepNode]:
+        """获取会话所在的Step节点"""
+        with self.lock:
+            return self.step_node
+    
+    def get_program_counter(self) -> Optional[int]:
+        """获取会话停留的指令地址（字节码执行模式）"""
+        with self.lock:
+            return self.program_counter
+    
+    def export_state(self) -> Dict[str, Any]:
+        """导出可持久化的会话状态（当前Step、语句索引和变量，见 session_store）"""
+        with self.lock:
+            variables = self._slot_items()
+            variables.update(self.overflow)
+            return {
+                "current_step": self.current_step,
+                "statement_index": self.statement_index,
+                "variables": variables,
+            }
+    
+    def restore_state(self, state: Dict[str, Any]):
+        """从持久化的会话状态恢复（会话使用最新的脚本版本）"""
+        with self.lock:
+            self.current_step = state.get("current_step")
+            self.statement_index = state.get("statement_index", 0)
+            self.script = None
+            self.step_node = None
+            self.program_counter = None
+            for name, value in state.get("variables", {}).items():
+                self._store_name(name, value)
     
     def set_statement_index(self, index: int):
         """设置当前执行到的语句索引"""
@@ -73,31 +282,286 @@ class ExecutionContext:
             return self.statement_index
     
     def __repr__(self):
-        return f"ExecutionContext(user_id={self.user_id}, step={self.current_step}, vars={len(self.variables)})"
+        return f"ExecutionContext(user_id={self.user_id}, step={self.current_step}, vars={len(self._snapshot())})"
 
 
-class ContextManager:
-    """上下文管理器：管理多个用户的执行上下文"""
+class _ContextShard:
+    """上下文分片：一部分用户的上下文（按最近访问排序，最久未访问的在前）和保护它们的锁"""
+    
+    __slots__ = ('contexts', 'lock')
     
     def __init__(self):
-        self.contexts: Dict[str, ExecutionContext] = {}
+        self.contexts: "OrderedDict[str, ExecutionContext]" = OrderedDict()
         self.lock = threading.Lock()
+
+
+# 淘汰原因
+EVICT_IDLE = "idle"  # 空闲超过 idle_ttl
+EVICT_CAPACITY = "capacity"  # 会话数超过 max_sessions
+
+# 按容量淘汰时，选中的会话被并发访问后重新比较的最多次数
+EVICT_RETRIES = 3
+
+
+class ContextManager:
+    """
+    上下文管理器：管理多个用户的执行上下文
+    
+    用户按 user_id 的哈希分到多个分片，每个分片单独加锁，不同分片上的创建和移除互不阻塞。
+    查找已存在的上下文不加锁（字典的单次读取在GIL下是原子的），只有需要创建时才获取分片的锁；
+    启用淘汰时，访问后调整分片内的顺序也在分片的锁内进行。
+    
+    可选的会话淘汰：每个分片的上下文按最近访问顺序排列（OrderedDict，访问时 move_to_end，O(1)），
+    - 空闲超过 idle_ttl 秒的会话由 sweep()（或 start_sweeper() 启动的后台线程）从队首开始移除，
+      在被清理之前再次访问时也视为已过期，返回新的上下文；
+    - 设置了 max_sessions 时，会话总数超过上限后移除所有分片中最久未访问的会话
+      （比较各分片队首的 last_access），直到总数回到上限以内；会话总数单独计数，不按分片分配容量。
+    被淘汰的上下文在移除后（不持有锁时）传给 on_evict(user_id, context, reason)，可以在此持久化；
+    回调出错时记录日志，不影响触发淘汰的调用。
+    
+    可选的会话存储（store）：创建上下文时先从存储中恢复（进程重启后按需恢复），
+    调用方在每轮对话结束后调用 save() 保存；移除会话时同时删除保存的状态，
+    被淘汰的会话在调用 on_evict 之前保存。clear_all() 只清空内存中的上下文。
+    """
+    
+    def __init__(self, shards: int = 16, idle_ttl: Optional[float] = None, max_sessions: Optional[int] = None,
+                 on_evict: Optional[Callable[[str, ExecutionContext, str], None]] = None,
+                 clock: Callable[[], float] = time.monotonic, store: Optional[SessionStore] = None):
+        """
+        Args:
+            shards: 分片数，向上取整为2的幂
+            idle_ttl: 会话的最长空闲时间（秒），None表示不按空闲时间淘汰
+            max_sessions: 最多保留的会话数，None表示不限制
+            on_evict: 会话被淘汰后的回调，参数为 (user_id, context, reason)，reason 为 EVICT_IDLE 或 EVICT_CAPACITY
+            clock: 取当前时间的函数（单调时钟，测试时可替换）
+            store: 会话存储，None表示不持久化
+        """
+        count = 1
+        while count < shards:
+            count <<= 1
+        self.shards: List[_ContextShard] = [_ContextShard() for _ in range(count)]
+        self.mask = count - 1
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.size = 0  # 所有分片的会话总数（在 size_lock 下修改）
+        self.size_lock = threading.Lock()
+        self.on_evict = on_evict
+        self.clock = clock
+        self.store = store
+        self.evicting = idle_ttl is not None or max_sessions is not None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def _shard(self, user_id: str) -> _ContextShard:
+        return self.shards[hash(user_id) & self.mask]
+    
+    @property
+    def contexts(self) -> Dict[str, ExecutionContext]:
+        """所有用户的上下文（副本）"""
+        contexts: Dict[str, ExecutionContext] = {}
+        for shard in self.shards:
+            with shard.lock:
+                contexts.update(shard.contexts)
+        return contexts
     
     def get_context(self, user_id: str) -> ExecutionContext:
         """获取或创建用户的执行上下文"""
-        with self.lock:
-            if user_id not in self.contexts:
-                self.contexts[user_id] = ExecutionContext(user_id)
-            return self.contexts[user_id]
+        shard = self.shards[hash(user_id) & self.mask]
+        context = shard.contexts.get(user_id)
+        if context is not None:
+            if not self.evicting:
+                return context
+            now = self.clock()
+            if self.idle_ttl is None or now - context.last_access <= self.idle_ttl:
+                context.last_access = now
+                # 调整顺序需要持有分片的锁：淘汰时会在锁内遍历分片
+                with shard.lock:
+                    if shard.contexts.get(user_id) is context:
+                        shard.contexts.move_to_end(user_id)
+                        return context
+                # 刚被其他线程淘汰，按新会话创建
+        evicted: List[Tuple[str, ExecutionContext, str]] = []
+        with shard.lock:
+            context = shard.contexts.get(user_id)
+            if context is not None and self.idle_ttl is not None and self.clock() - context.last_access > self.idle_ttl:
+                # 已过期但还没有被清理
+                del shard.contexts[user_id]
+                evicted.append((user_id, context, EVICT_IDLE))
+                self._resize(-1)
+                context = None
+            if context is None:
+                context = ExecutionContext(user_id)
+                if self.store is not None:
+                    state = self.store.load(user_id)
+                    if state is not None:
+                        context.restore_state(state)
+                shard.contexts[user_id] = context
+                created = True
+            else:
+                created = False
+            if self.evicting:
+                context.last_access = self.clock()
+        if created:
+            self._resize(1)
+            if self.max_sessions is not None:
+                # 不持有分片的锁时跨分片淘汰，避免两个分片的锁互相等待
+                while self.size > self.max_sessions and self._evict_oldest(user_id, evicted):
+                    pass
+        self._notify(evicted)
+        return context
+    
+    def _resize(self, delta: int):
+        """修改会话总数"""
+        with self.size_lock:
+            self.size += delta
+    
+    def _evict_oldest(self, keep: str, evicted: List[Tuple[str, ExecutionContext, str]]) -> bool:
+        """
+        移除所有分片中最久未访问的会话（不移除 keep，即刚创建的会话）
+        
+        比较和移除之间不持有所有分片的锁：选中的会话在此期间被访问（last_access 改变）时重新比较，
+        最多重试 EVICT_RETRIES 次，之后只要它还在就直接移除，不会因为其他线程的访问一直循环。
+        
+        Returns:
+            是否移除了会话
+        """
+        for attempt in range(EVICT_RETRIES + 1):
+            oldest: Optional[_ContextShard] = None
+            oldest_id = None
+            oldest_access = 0.0
+            for shard in self.shards:
+                with shard.lock:
+                    for user_id, context in shard.contexts.items():
+                        if user_id != keep:
+                            if oldest is None or context.last_access < oldest_access:
+                                oldest, oldest_id, oldest_access = shard, user_id, context.last_access
+                            break
+            if oldest is None:
+                return False
+            with oldest.lock:
+                context = oldest.contexts.get(oldest_id)
+                if context is None:
+                    # 已被其他线程移除
+                    continue
+                if context.last_access != oldest_access and attempt < EVICT_RETRIES:
+                    # 比较之后刚被访问，重新比较
+                    continue
+                del oldest.contexts[oldest_id]
+                evicted.append((oldest_id, context, EVICT_CAPACITY))
+            self._resize(-1)
+            return True
+        return False
     
     def remove_context(self, user_id: str):
         """移除用户的执行上下文"""
-        with self.lock:
-            if user_id in self.contexts:
-                del self.contexts[user_id]
+        shard = self._shard(user_id)
+        with shard.lock:
+            if shard.contexts.pop(user_id, None) is not None:
+                self._resize(-1)
+            if self.store is not None:
+                self.store.delete(user_id)
+    
+    def save(self, context: ExecutionContext) -> bool:
+        """
+        把会话的当前状态写入会话存储（未配置存储时不做任何事）
+        
+        每轮对话结束后调用，这一轮已经执行完毕：保存失败（变量无法序列化、存储已关闭等）时
+        只记录日志，不影响这一轮的结果
+        
+        Returns:
+            是否已保存（未配置存储时为True）
+        """
+        if self.store is None:
+            return True
+        return self._persist(context.user_id, context)
+    
+    def _persist(self, user_id: str, context: ExecutionContext) -> bool:
+        """写入会话存储，出错时记录日志并返回False"""
+        try:
+            self.store.save(user_id, context.export_state())
+            return True
+        except Exception:
+            logger.exception("Failed to save session %r", user_id)
+            return False
+    
+    def __len__(self):
+        """当前的会话数"""
+        return self.size
     
     def clear_all(self):
         """清空所有上下文"""
-        with self.lock:
-            self.contexts.clear()
-
+        for shard in self.shards:
+            with shard.lock:
+                self._resize(-len(shard.contexts))
+                shard.contexts.clear()
+    
+    def sweep(self) -> int:
+        """
+        移除所有空闲超过 idle_ttl 的会话
+        
+        Returns:
+            移除的会话数
+        """
+        if self.idle_ttl is None:
+            return 0
+        deadline = self.clock() - self.idle_ttl
+        evicted: List[Tuple[str, ExecutionContext, str]] = []
+        for shard in self.shards:
+            with shard.lock:
+                contexts = shard.contexts
+                # 按访问顺序排列，遇到第一个未过期的会话即可停止
+                while contexts:
+                    user_id = next(iter(contexts))
+                    if contexts[user_id].last_access > deadline:
+                        break
+                    evicted.append((user_id, contexts.pop(user_id), EVICT_IDLE))
+        self._resize(-len(evicted))
+        self._notify(evicted)
+        return len(evicted)
+    
+    def _notify(self, evicted: List[Tuple[str, ExecutionContext, str]]):
+        """
+        保存被淘汰的会话并调用淘汰回调（不持有锁）
+        
+        淘汰由其他用户的请求或后台清理触发，保存或回调出错时只记录日志并继续处理其余会话，不向调用方抛出
+        """
+        if self.store is not None:
+            for user_id, context, _ in evicted:
+                self._persist(user_id, context)
+        if self.on_evict is None:
+            return
+        for user_id, context, reason in evicted:
+            try:
+                self.on_evict(user_id, context, reason)
+            except Exception:
+                logger.exception("on_evict failed for session %r (%s)", user_id, reason)
+    
+    def start_sweeper(self, interval: Optional[float] = None):
+        """
+        启动后台清理线程
+        
+        Args:
+            interval: 清理间隔（秒），默认为 idle_ttl 的一半（最长60秒）
+        """
+        if self._thread and self._thread.is_alive():
+            return
+        if interval is None:
+            interval = min(self.idle_ttl / 2, 60.0) if self.idle_ttl else 60.0
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="ContextSweeper", daemon=True)
+        self._thread.start()
+    
+    def stop_sweeper(self):
+        """停止后台清理线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self, interval: float):
+        while not self._stop_event.wait(interval):
+            try:
+                self.sweep()
+            except Exception:
+                # 回调失败的会话已经移除，清理线程继续运行
+                pass
@@ -0,0 +1,126 @@
+"""
+脚本热加载（Hot Reload）
+后台轮询脚本目录，脚本文件变化时增量重新编译，并原子替换解释器当前使用的脚本
+"""
+
+from typing import Dict, List, Optional, Tuple
+from pathlib import Path
+import os
+import threading
+import weakref
+
+from src.dsl.ast import ScriptNode
+from src.dsl.cache import ScriptCache, recompile
+from src.dsl.interpreter import Interpreter
+
+
+class ScriptReloader:
+    """
+    脚本热加载器
+
+    替换只是对 Interpreter.script 的一次属性赋值，请求路径上不需要任何全局锁。
+    已经停在某个step中的会话通过 ExecutionContext.script 引用旧版本的ScriptNode，
+    旧版本依靠引用计数保留，直到最后一个会话离开该step后自动释放。
+    """
+
+    def __init__(self, directory: str, poll_interval: float = 1.0, cache: Optional[ScriptCache] = None):
+        """
+        初始化热加载器
+
+        Args:
+            directory: 监视的脚本目录
+            poll_interval: 轮询间隔（秒）
+            cache: 编译缓存，重新编译后写入（可选）
+        """
+        self.directory = Path(directory)
+        self.poll_interval = poll_interval
+        self.cache = cache
+        self.interpreters: Dict[str, List[Interpreter]] = {}  # 脚本路径 -> 使用该脚本的解释器
+        self.errors: Dict[str, str] = {}  # 脚本路径 -> 最近一次编译错误
+        self.reload_count = 0
+        self._snapshot: Dict[str, Tuple[int, int]] = self._scan()
+        self._retired: Dict[str, "weakref.WeakSet[ScriptNode]"] = {}  # 被替换下来的旧版本
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, script_path: str, interpreter: Interpreter):
+        """注册需要热加载的脚本及其解释器（同一脚本可以被多个解释器共享）"""
+        path = str(Path(script_path).resolve())
+        self.interpreters.setdefault(path, []).append(interpreter)
+        self._retired.setdefault(path, weakref.WeakSet())
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """扫描目录下的 .dsl 文件，返回 路径 -> (修改时间, 大小)"""
+        snapshot = {}
+        try:
+            entries = list(os.scandir(self.directory))
+        except OSError:
+            return snapshot
+        for entry in entries:
+            if entry.name.endswith('.dsl') and entry.is_file():
+                stat = entry.stat()
+                snapshot[str(Path(entry.path).resolve())] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def check(self) -> List[str]:
+        """轮询一次目录，重新加载发生变化的脚本，返回成功重新加载的脚本路径"""
+        snapshot = self._scan()
+        changed = [path for path, stat in snapshot.items() if self._snapshot.get(path) != stat]
+        self._snapshot = snapshot
+
+        reloaded = []
+        for path in changed:
+            if path in self.interpreters and self.reload(path):
+                reloaded.append(path)
+        return reloaded
+
+    def reload(self, script_path: str) -> bool:
+        """
+        重新编译脚本并替换解释器中的脚本
+
+        编译或链接失败时保留当前版本，错误信息记录在 errors 中
+        """
+        path = str(Path(script_path).resolve())
+        interpreters = self.interpreters[path]
+        old_script = interpreters[0].script
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            new_script = recompile(old_script, source)
+        except Exception as e:
+            self.errors[path] = str(e)
+            return False
+
+        if self.cache is not None:
+            self.cache.store(path, self.cache.cache_key(source), new_script)
+
+        # 原子替换：新的轮次读取到新版本，进行中的会话继续持有旧版本的引用
+        for interpreter in interpreters:
+            self._retired[path].add(interpreter.script)
+            interpreter.script = new_script
+        self.errors.pop(path, None)
+        self.reload_count += 1
+        return True
+
+    def retained_versions(self, script_path: str) -> int:
+        """获取仍被会话引用而保留的旧版本数量"""
+        return len(self._retired.get(str(Path(script_path).resolve()), ()))
+
+    def start(self):
+        """启动后台轮询线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ScriptReloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台轮询线程"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.poll_interval):
+            self.check()
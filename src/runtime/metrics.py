@@ -0,0 +1,248 @@
+"""
+运行指标（Metrics）
+进程内的计数器、仪表和固定分桶的延迟直方图，可以导出为 Prometheus 文本格式，
+也可以启动一个本地HTTP端点供 Prometheus 抓取
+"""
+
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Sequence, Tuple
+import math
+import threading
+
+
+# 默认的延迟分桶（秒）：覆盖从几十微秒的纯解释执行到数秒的LLM调用
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Striped:
+    """
+    按线程分片的累加单元
+
+    每个线程只写自己的单元，写入不加锁；读取时汇总所有单元。
+    已退出线程的单元在读取和登记新线程时合并到基数中，线程频繁创建时单元数不会无限增长。
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.local = threading.local()
+        self.cells: List[Tuple[threading.Thread, list]] = []
+        self.base = [0] * size  # 已退出线程的累计值
+        self.lock = threading.Lock()
+
+    def cell(self) -> list:
+        """当前线程的单元"""
+        try:
+            return self.local.cell
+        except AttributeError:
+            cell = [0] * self.size
+            with self.lock:
+                self._fold()
+                self.cells.append((threading.current_thread(), cell))
+            self.local.cell = cell
+            return cell
+
+    def _fold(self):
+        """把已退出线程的单元合并到基数中（调用方持有锁）"""
+        alive = []
+        for thread, cell in self.cells:
+            if thread.is_alive():
+                alive.append((thread, cell))
+            else:
+                self.base = [total + value for total, value in zip(self.base, cell)]
+        self.cells = alive
+
+    def totals(self) -> list:
+        """所有线程的汇总值"""
+        with self.lock:
+            self._fold()
+            totals = list(self.base)
+            for _, cell in self.cells:
+                for index, value in enumerate(cell):
+                    totals[index] += value
+        return totals
+
+
+class Counter:
+    """单调递增的计数器（按 Prometheus 惯例，名称以 _total 结尾）"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.striped = _Striped(1)
+
+    def inc(self, amount: float = 1):
+        self.striped.cell()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self.striped.totals()[0]
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, "", self.value)]
+
+
+class Gauge:
+    """仪表：读取时调用函数获取当前值"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, help_text: str, function: Callable[[], float]):
+        self.name = name
+        self.help = help_text
+        self.function = function
+
+    @property
+    def value(self) -> float:
+        return self.function()
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, "", self.value)]
+
+
+class Histogram:
+    """
+    固定分桶的直方图
+
+    单元布局：每个分桶一个计数，之后是 +Inf 分桶的计数和观测值之和。
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(sorted(buckets))
+        self.striped = _Striped(len(self.bounds) + 2)
+
+    def observe(self, value: float):
+        cell = self.striped.cell()
+        cell[bisect_left(self.bounds, value)] += 1
+        cell[-1] += value
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """(每个分桶的累计计数（含 +Inf）, 总次数, 观测值之和)"""
+        totals = self.striped.totals()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+    def quantile(self, q: float) -> float:
+        """按分桶线性插值估计分位数（与 Prometheus histogram_quantile 相同），没有观测值时为NaN"""
+        cumulative, count, _ = self.snapshot()
+        if count == 0:
+            return math.nan
+        rank = q * count
+        for index, running in enumerate(cumulative):
+            if running >= rank:
+                if index == len(self.bounds):
+                    # 落在 +Inf 分桶，返回最大的有限边界
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                previous = cumulative[index - 1] if index else 0
+                in_bucket = running - previous
+                return lower + (self.bounds[index] - lower) * ((rank - previous) / in_bucket if in_bucket else 1.0)
+        return self.bounds[-1]
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        cumulative, count, total = self.snapshot()
+        samples = [(self.name + "_bucket", f'le="{_format_value(bound)}"', running)
+                   for bound, running in zip(self.bounds, cumulative)]
+        samples.append((self.name + "_bucket", 'le="+Inf"', count))
+        samples.append((self.name + "_sum", "", total))
+        samples.append((self.name + "_count", "", count))
+        return samples
+
+
+def _format_value(value: float) -> str:
+    """Prometheus 文本格式的数值"""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if value.is_integer():
+            return str(int(value)) if abs(value) < 1e15 else repr(value)
+        return repr(value)
+    return str(value)
+
+
+class MetricsRegistry:
+    """指标注册表：按名称登记指标，导出为 Prometheus 文本格式"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(self.prefix + name, help_text))
+
+    def gauge(self, name: str, help_text: str, function: Callable[[], float]) -> Gauge:
+        return self._register(Gauge(self.prefix + name, help_text, function))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, help_text, buckets))
+
+    def get(self, name: str):
+        """按名称（包含前缀）获取指标"""
+        return self.metrics.get(name)
+
+    def export_text(self) -> str:
+        """导出为 Prometheus 文本格式（0.0.4）"""
+        lines = []
+        with self.lock:
+            metrics = list(self.metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                label_text = "{" + labels + "}" if labels else ""
+                lines.append(f"{name}{label_text} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def start_http_server(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    在后台线程中启动HTTP端点，GET /metrics 返回 Prometheus 文本格式
+
+    Args:
+        registry: 指标注册表
+        port: 端口（0 表示由系统分配，实际端口见 server.server_address）
+        host: 监听地址，默认只监听本机
+
+    Returns:
+        HTTP服务器，调用 shutdown() 停止
+    """
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.export_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 抓取请求很频繁，不输出访问日志
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
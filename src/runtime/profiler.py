@@ -0,0 +1,150 @@
+"""
+执行剖析器（Profiler）
+按Step和语句（所在行号）统计执行次数、累计耗时和最大耗时，另外单独统计意图识别调用的耗时
+"""
+
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, List, Tuple, Union
+import threading
+
+
+class ProfileStat:
+    """一项统计：次数、累计耗时、最大耗时（秒）"""
+
+    __slots__ = ('count', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float, count: int = 1):
+        self.count += count
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "total": self.total, "max": self.max}
+
+
+class ActiveTimer:
+    """
+    只累计执行时间的计时器
+
+    解释器的执行是生成器，产出话术或意图识别请求后会被挂起，驱动方（批量执行、流式执行）
+    在此期间推进其他会话或等待意图识别；挂起期间暂停计时，恢复执行后继续。
+    """
+
+    __slots__ = ('suspended', 'paused_at')
+
+    def __init__(self):
+        self.suspended = 0.0  # 累计的挂起时间
+        self.paused_at = 0.0
+
+    def now(self) -> float:
+        """不包含挂起时间的当前时刻，两次读数之差即期间的执行时间"""
+        return perf_counter() - self.suspended
+
+    def pause(self):
+        self.paused_at = perf_counter()
+
+    def resume(self):
+        self.suspended += perf_counter() - self.paused_at
+
+
+class Profiler:
+    """
+    执行剖析器
+
+    通过 Interpreter(profiler=...) 启用；未启用时解释器不做任何计时。
+    Step的耗时从进入（或恢复到）Step开始，到等待输入、结束或跳转为止；Step和语句的耗时
+    只包含执行时间，不包含执行挂起（产出话术、等待意图识别）期间的时间，见 ActiveTimer。
+    意图识别按调用单独统计（批量识别一批算一次调用）。
+    多个会话可以在不同线程中共享同一个剖析器。
+    """
+
+    # 导出文件的列
+    COLUMNS = ("kind", "step", "line", "statement", "count", "total_ms", "avg_ms", "max_ms")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.steps: Dict[str, ProfileStat] = {}
+        self.statements: Dict[Tuple[str, int, str], ProfileStat] = {}  # (Step名称, 行号, 语句类型)
+        self.intents: Dict[str, ProfileStat] = {}  # 调用方式 -> 统计
+        self.intent_inputs = 0  # 意图识别的输入条数
+
+    def record_step(self, step_name: str, seconds: float):
+        """记录一次Step执行"""
+        with self.lock:
+            stat = self.steps.get(step_name)
+            if stat is None:
+                stat = self.steps[step_name] = ProfileStat()
+            stat.add(seconds)
+
+    def record_statement(self, step_name: str, line_number: int, statement_type: str, seconds: float):
+        """记录一次语句执行"""
+        key = (step_name, line_number, statement_type)
+        with self.lock:
+            stat = self.statements.get(key)
+            if stat is None:
+                stat = self.statements[key] = ProfileStat()
+            stat.add(seconds)
+
+    def record_intent(self, mode: str, seconds: float, inputs: int = 1):
+        """记录一次意图识别调用（mode：analyze 或 analyze_batch）"""
+        with self.lock:
+            stat = self.intents.get(mode)
+            if stat is None:
+                stat = self.intents[mode] = ProfileStat()
+            stat.add(seconds)
+            self.intent_inputs += inputs
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        获取当前统计的副本（耗时单位为秒）
+
+        Returns:
+            {"steps": {Step名称: 统计}, "statements": {(Step名称, 行号, 语句类型): 统计},
+             "intents": {调用方式: 统计}, "intent_inputs": 输入条数}
+        """
+        with self.lock:
+            return {
+                "steps": {name: stat.as_dict() for name, stat in self.steps.items()},
+                "statements": {key: stat.as_dict() for key, stat in self.statements.items()},
+                "intents": {mode: stat.as_dict() for mode, stat in self.intents.items()},
+                "intent_inputs": self.intent_inputs,
+            }
+
+    def reset(self):
+        """清空统计"""
+        with self.lock:
+            self.steps.clear()
+            self.statements.clear()
+            self.intents.clear()
+            self.intent_inputs = 0
+
+    def rows(self) -> List[tuple]:
+        """按固定顺序排列的扁平统计行（列见 COLUMNS），同一脚本两次剖析的结果可以逐行对比"""
+        snapshot = self.snapshot()
+        rows = []
+        for name, stat in sorted(snapshot["steps"].items()):
+            rows.append(self._row("step", name, "", "", stat))
+        for (name, line, statement_type), stat in sorted(snapshot["statements"].items()):
+            rows.append(self._row("statement", name, line, statement_type, stat))
+        for mode, stat in sorted(snapshot["intents"].items()):
+            rows.append(self._row("intent", "", "", mode, stat))
+        return rows
+
+    @staticmethod
+    def _row(kind: str, step: str, line: Union[int, str], statement: str, stat: Dict[str, Any]) -> tuple:
+        count = stat["count"]
+        return (kind, step, line, statement, count, f"{stat['total'] * 1e3:.3f}",
+                f"{stat['total'] * 1e3 / count if count else 0.0:.3f}", f"{stat['max'] * 1e3:.3f}")
+
+    def export(self, path: Union[str, Path]):
+        """导出为制表符分隔的文本文件（第一行为列名）"""
+        lines = ["\t".join(self.COLUMNS)]
+        lines.extend("\t".join(str(value) for value in row) for row in self.rows())
+        Path(path).write_text("\n".join(lines) + "\n", encoding="utf-8")
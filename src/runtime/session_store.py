@@ -0,0 +1,202 @@
+"""
+会话存储（Session Store）
+保存用户会话的状态（当前Step、语句索引和变量），进程重启后按需恢复
+
+会话状态是 ExecutionContext.export_state() 返回的字典：
+    {"current_step": str或None, "statement_index": int, "variables": {变量名: 值}}
+会话停留时所属的脚本版本和Step节点不保存，恢复后的会话使用最新的脚本版本。
+"""
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Optional
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+class SessionStoreClosed(Exception):
+    """会话存储已关闭后仍被读写"""
+    def __init__(self, store: 'SessionStore'):
+        super().__init__(f"{type(store).__name__} is closed")
+
+
+class SessionStore(ABC):
+    """会话存储接口：按用户ID读写会话状态（子类必须实现 load、save 和 delete）"""
+
+    @abstractmethod
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """读取会话状态，没有保存过时返回None"""
+
+    @abstractmethod
+    def save(self, user_id: str, state: Dict[str, Any]):
+        """保存会话状态（可以延迟写入）"""
+
+    @abstractmethod
+    def delete(self, user_id: str):
+        """删除会话状态"""
+
+    def flush(self):
+        """把延迟写入的状态立即写入存储"""
+
+    def close(self):
+        """写入剩余的状态并释放资源"""
+        self.flush()
+
+
+class MemorySessionStore(SessionStore):
+    """进程内的会话存储（不持久化，用于测试和不需要重启恢复的部署）"""
+
+    def __init__(self):
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            return self.states.get(user_id)
+
+    def save(self, user_id: str, state: Dict[str, Any]):
+        with self.lock:
+            self.states[user_id] = state
+
+    def delete(self, user_id: str):
+        with self.lock:
+            self.states.pop(user_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    基于本地SQLite文件的会话存储，延迟批量写入（write-behind）
+
+    save() 只把状态序列化后记入待写入表，同一会话在两次写入之间多次保存只写最后一次；
+    后台线程每隔 flush_interval 秒（或待写入的会话数达到 batch_size 时）在一个事务中写入所有待写入的会话。
+    进程崩溃时最多丢失最近 flush_interval 秒内的更新。变量的值需要能序列化为JSON。
+    close() 之后的读写抛出 SessionStoreClosed（关闭前保存的状态都已写入）。
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5, batch_size: int = 512):
+        """
+        Args:
+            path: 数据库文件路径（":memory:" 表示不落盘，用于测试）
+            flush_interval: 后台写入的间隔（秒）
+            batch_size: 待写入的会话数达到该值时提前写入
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.pending: Dict[str, Optional[tuple]] = {}  # 用户ID -> 待写入的行（None表示待删除）
+        self.lock = threading.Lock()  # 保护 pending
+        self.db_lock = threading.Lock()  # 保护数据库连接，写入期间持有，保证各批次按顺序提交
+        self.connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "user_id TEXT PRIMARY KEY, current_step TEXT, statement_index INTEGER NOT NULL, "
+            "variables TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self.flush_count = 0  # 已写入的批次数
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="SQLiteSessionStore", daemon=True)
+        self._thread.start()
+
+    def load(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            self._check_open()
+            if user_id in self.pending:
+                return self._decode(self.pending[user_id])
+        with self.db_lock:
+            self._check_open()
+            row = self.connection.execute(
+                "SELECT user_id, current_step, statement_index, variables, updated_at FROM sessions WHERE user_id = ?",
+                (user_id,)
+            ).fetchone()
+        return self._decode(row)
+
+    def save(self, user_id: str, state: Dict[str, Any]):
+        # 在调用方线程中序列化：状态在此刻定格，序列化错误也由调用方处理
+        row = (user_id, state.get("current_step"), state.get("statement_index", 0),
+               json.dumps(state.get("variables", {}), ensure_ascii=False), time.time())
+        with self.lock:
+            self._check_open()
+            self.pending[user_id] = row
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def delete(self, user_id: str):
+        with self.lock:
+            self._check_open()
+            self.pending[user_id] = None
+
+    def flush(self) -> int:
+        """
+        在一个事务中写入所有待写入的会话
+
+        Returns:
+            写入（或删除）的会话数
+        """
+        with self.db_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+            if not batch:
+                return 0
+            rows = [row for row in batch.values() if row is not None]
+            deleted = [(user_id,) for user_id, row in batch.items() if row is None]
+            connection = self.connection
+            connection.execute("BEGIN")
+            try:
+                if rows:
+                    connection.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", rows)
+                if deleted:
+                    connection.executemany("DELETE FROM sessions WHERE user_id = ?", deleted)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                # 写入失败的会话放回待写入表（保留之后更新的状态）
+                with self.lock:
+                    batch.update(self.pending)
+                    self.pending = batch
+                raise
+            self.flush_count += 1
+        return len(batch)
+
+    def close(self):
+        """停止后台线程，写入剩余的状态并关闭数据库"""
+        with self.lock:
+            if self._closed:
+                return
+            # 在 lock 下标记关闭：之前进入 save() 的状态都在 pending 中，由下面的 flush() 写入
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        with self.db_lock:
+            self.connection.close()
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                # 待写入的会话已经放回，下一次继续尝试；后台线程不能因为任何错误退出
+                logger.exception("Failed to flush sessions to %s", self.path)
+
+    def _check_open(self):
+        """关闭后不再接受读写，避免写入被静默丢弃"""
+        if self._closed:
+            raise SessionStoreClosed(self)
+
+    @staticmethod
+    def _decode(row: Optional[tuple]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        _, current_step, statement_index, variables, _ = row
+        return {"current_step": current_step, "statement_index": statement_index,
+                "variables": json.loads(variables)}
@@ -21,6 +21,20 @@ def run_all_tests():
     suite.addTests(loader.loadTestsFromName('test_parser'))
     suite.addTests(loader.loadTestsFromName('test_interpreter'))
     suite.addTests(loader.loadTestsFromName('test_intent_analyzer'))
+    suite.addTests(loader.loadTestsFromName('test_cache'))
+    suite.addTests(loader.loadTestsFromName('test_incremental'))
+    suite.addTests(loader.loadTestsFromName('test_hot_reload'))
+    suite.addTests(loader.loadTestsFromName('test_registry'))
+    suite.addTests(loader.loadTestsFromName('test_bulk'))
+    suite.addTests(loader.loadTestsFromName('test_synthetic'))
+    suite.addTests(loader.loadTestsFromName('test_linker'))
+    suite.addTests(loader.loadTestsFromName('test_vm'))
+    suite.addTests(loader.loadTestsFromName('test_batch'))
+    suite.addTests(loader.loadTestsFromName('test_execution_context'))
+    suite.addTests(loader.loadTestsFromName('test_native'))
+    suite.addTests(loader.loadTestsFromName('test_profiler'))
+    suite.addTests(loader.loadTestsFromName('test_metrics'))
+    suite.addTests(loader.loadTestsFromName('test_session_store'))
     
     # 运行测试
     runner = unittest.TextTestRunner(verbosity=2)
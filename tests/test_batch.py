@@ -0,0 +1,124 @@
+"""
+批量执行测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.cache import compile_source
+from src.dsl.interpreter import Interpreter
+from src.llm.intent_analyzer import MockIntentAnalyzer
+from src.main import AgentSystem, INTENTS
+from src.runtime.execution_context import ExecutionContext
+
+
+SCRIPT = '''
+step start {
+    speak "欢迎"
+    listen user_input
+    branch user_intent == "订单查询" -> order
+    branch user_intent == "退款申请" -> refund
+    speak "未识别"
+    end
+}
+step order {
+    speak "请输入订单号"
+    listen order_id
+    speak "订单${order_id}已发货"
+    end
+}
+step refund {
+    speak "退款处理中"
+    end
+}
+'''
+
+ORDER_SCRIPT = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+
+
+class TestExecuteBatch(unittest.TestCase):
+    """Interpreter.execute_batch 测试类"""
+
+    def setUp(self):
+        self.script = compile_source(SCRIPT)
+        analyzer = MockIntentAnalyzer()
+        self.calls = []
+
+        def analyze_intents(user_inputs):
+            self.calls.append(list(user_inputs))
+            return [analyzer.analyze(user_input, INTENTS) for user_input in user_inputs]
+
+        self.interpreter = Interpreter(self.script, lambda text: analyzer.analyze(text, INTENTS),
+                                       batch_intent_analyzer=analyze_intents)
+
+    def start(self, count):
+        contexts = [ExecutionContext(f"user{i}") for i in range(count)]
+        for context in contexts:
+            self.interpreter.execute(context)
+        return contexts
+
+    def test_intents_issued_together(self):
+        """测试所有会话的意图识别在一次批量调用中完成，结果与逐个执行一致"""
+        inputs = ["查询订单", "我要退款", "你好"]
+        contexts = self.start(3)
+        turns = [(context, (lambda text: lambda prompt: text)(text)) for context, text in zip(contexts, inputs)]
+        results = self.interpreter.execute_batch(turns)
+
+        self.assertEqual(self.calls, [inputs])
+        expected_contexts = self.start(3)
+        expected = [self.interpreter.execute(context, lambda prompt, text=text: text)
+                    for context, text in zip(expected_contexts, inputs)]
+        self.assertEqual(results, expected)
+        self.assertEqual([c.current_step for c in contexts], ["order", "refund", "start"])
+
+    def test_no_intent_needed(self):
+        """测试不需要意图识别的会话不会发起识别"""
+        contexts = self.start(2)
+        for context in contexts:
+            context.set_current_step("order")
+            context.set_statement_index(1)
+        results = self.interpreter.execute_batch([(context, lambda prompt: "12345") for context in contexts])
+        self.assertEqual(self.calls, [])
+        self.assertEqual([r["message"] for r in results], ["收到输入: 12345\n订单12345已发货"] * 2)
+
+    def test_analyzer_failure(self):
+        """测试批量识别失败时意图为unknown"""
+        def failing(user_inputs):
+            raise RuntimeError("timeout")
+
+        self.interpreter.batch_intent_analyzer = failing
+        contexts = self.start(1)
+        result, = self.interpreter.execute_batch([(contexts[0], lambda prompt: "查询订单")])
+        self.assertEqual(result["message"], "收到输入: 查询订单\n未识别")
+        self.assertEqual(contexts[0].get_variable("user_intent"), "unknown")
+
+    def test_duplicate_contexts(self):
+        """测试同一批中的上下文不能重复"""
+        context = ExecutionContext("user")
+        with self.assertRaises(ValueError):
+            self.interpreter.execute_batch([(context, None), (context, None)])
+
+
+class TestProcessBatch(unittest.TestCase):
+    """AgentSystem.process_batch 测试类"""
+
+    def test_matches_sequential(self):
+        """测试批量处理与逐个处理的结果一致，同一用户的多次输入按顺序处理"""
+        turns = [("a", None), ("b", None), ("a", "1"), ("b", "查询订单"), ("a", "12345"), ("c", None)]
+        batch = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False)
+        sequential = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False)
+
+        results = batch.process_batch(turns)
+        expected = [sequential.process_user_input(user_id, user_input) for user_id, user_input in turns]
+        self.assertEqual(results, expected)
+        for user_id in ("a", "b", "c"):
+            self.assertEqual(batch.context_manager.get_context(user_id).variables,
+                             sequential.context_manager.get_context(user_id).variables)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+批量编译测试
+"""
+
+import pickle
+import shutil
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.bulk import compile_directory
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+
+class TestBulkCompile(unittest.TestCase):
+    """批量编译测试类"""
+    
+    def setUp(self):
+        """设置测试环境：复制示例脚本并加入一个有语法错误的脚本"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        for script_path in SCRIPTS_DIR.glob("*.dsl"):
+            shutil.copy(script_path, self.temp_dir.name)
+        Path(self.temp_dir.name, "broken.dsl").write_text('step start {\n    speak\n}\n', encoding="utf-8")
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_process_pool_collects_errors(self):
+        """测试进程池编译：错误逐文件收集，不中断其余文件"""
+        results = compile_directory(self.temp_dir.name, workers=2)
+        
+        self.assertEqual(len(results), 5)
+        failed = [result for result in results if not result.ok]
+        self.assertEqual(len(failed), 1)
+        self.assertTrue(failed[0].path.endswith("broken.dsl"))
+        self.assertIn("line 2", failed[0].error)
+        
+        order = next(result for result in results if result.path.endswith("order_inquiry.dsl"))
+        self.assertIsNotNone(order.script.get_step("order_detail"))
+        self.assertGreater(order.elapsed, 0)
+    
+    def test_results_are_picklable(self):
+        """测试编译结果可以pickle"""
+        results = compile_directory(self.temp_dir.name, workers=1)
+        restored = pickle.loads(pickle.dumps(results))
+        self.assertEqual([r.path for r in restored], [r.path for r in results])
+        self.assertEqual(
+            [len(r.script.steps) for r in restored if r.ok],
+            [len(r.script.steps) for r in results if r.ok]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+编译缓存测试
+"""
+
+import os
+import pickle
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl import cache as cache_module
+from src.dsl.cache import ScriptCache, load_script
+
+
+class TestScriptCache(unittest.TestCase):
+    """编译缓存测试类"""
+    
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = Path(self.temp_dir.name) / "demo.dsl"
+        self.script_path.write_text('step start {\n    speak "hello"\n    end\n}\n', encoding="utf-8")
+        self.cache = ScriptCache(str(Path(self.temp_dir.name) / "cache"))
+    
+    def tearDown(self):
+        self.temp_dir.cleanup()
+    
+    def test_cache_hit_skips_parsing(self):
+        """测试缓存命中时跳过编译"""
+        first = load_script(str(self.script_path), self.cache)
+        self.assertTrue(self.cache.cache_path(str(self.script_path)).exists())
+        
+        with mock.patch.object(cache_module, "compile_source") as compile_source:
+            second = load_script(str(self.script_path), self.cache)
+            compile_source.assert_not_called()
+        
+        self.assertEqual(second.steps[0].name, first.steps[0].name)
+        self.assertEqual(second.steps[0].statements[0].message, "hello")
+    
+    def test_content_change_invalidates(self):
+        """测试脚本内容变化后缓存失效"""
+        load_script(str(self.script_path), self.cache)
+        self.script_path.write_text('step other {\n    end\n}\n', encoding="utf-8")
+        
+        script = load_script(str(self.script_path), self.cache)
+        self.assertEqual(script.steps[0].name, "other")
+    
+    def test_compiler_version_invalidates(self):
+        """测试编译器版本变化后缓存失效"""
+        load_script(str(self.script_path), self.cache)
+        key = self.cache.cache_key(self.script_path.read_text(encoding="utf-8"))
+        
+        with mock.patch.object(cache_module, "COMPILER_VERSION", "other"):
+            self.assertIsNone(self.cache.load(str(self.script_path), key))
+    
+    def test_corrupted_entry_is_ignored(self):
+        """测试损坏的缓存条目被忽略"""
+        cache_path = self.cache.cache_path(str(self.script_path))
+        cache_path.parent.mkdir(parents=True)
+        cache_path.write_bytes(b"not a pickle")
+        
+        script = load_script(str(self.script_path), self.cache)
+        self.assertEqual(script.steps[0].name, "start")
+    
+    def test_same_name_in_shared_directory(self):
+        """测试共用缓存目录时，不同目录下的同名脚本使用各自的缓存条目"""
+        paths = []
+        for name, message in (("a", "from a"), ("b", "from b")):
+            path = Path(self.temp_dir.name) / name / "main.dsl"
+            path.parent.mkdir()
+            path.write_text(f'step start {{\n    speak "{message}"\n    end\n}}\n', encoding="utf-8")
+            paths.append(str(path))
+        self.assertNotEqual(self.cache.cache_path(paths[0]), self.cache.cache_path(paths[1]))
+        
+        for path in paths:
+            load_script(path, self.cache)
+        with mock.patch.object(cache_module, "compile_source") as compile_source:
+            messages = [load_script(path, self.cache).steps[0].statements[0].message for path in paths]
+            compile_source.assert_not_called()
+        self.assertEqual(messages, ["from a", "from b"])
+
+    
+    def test_unsigned_entry_is_not_unpickled(self):
+        """测试没有正确签名的条目不会被反序列化（植入的pickle不会执行）"""
+        load_script(str(self.script_path), self.cache)
+        cache_path = self.cache.cache_path(str(self.script_path))
+        planted = pickle.dumps((os.system, ("exit 1",)))
+        for data in (planted, b"\0" * 32 + planted):
+            cache_path.write_bytes(data)
+            with mock.patch.object(pickle, "loads") as loads:
+                script = load_script(str(self.script_path), self.cache)
+                loads.assert_not_called()
+            self.assertEqual(script.steps[0].name, "start")
+    
+    def test_any_load_error_is_a_miss(self):
+        """测试签名正确但反序列化时抛出任意异常的条目视为未命中"""
+        load_script(str(self.script_path), self.cache)
+        for error in (KeyError("x"), IndexError(), RecursionError(), MemoryError()):
+            with mock.patch.object(pickle, "loads", side_effect=error):
+                script = load_script(str(self.script_path), self.cache)
+            self.assertEqual(script.steps[0].name, "start")
+    
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX only")
+    def test_writable_directory_is_not_used(self):
+        """测试允许其他用户写入的缓存目录不被使用，新建的目录和密钥只有当前用户可以访问"""
+        load_script(str(self.script_path), self.cache)
+        self.assertEqual(self.cache.cache_dir.stat().st_mode & 0o777, 0o700)
+        self.assertEqual((self.cache.cache_dir / cache_module.KEY_FILE_NAME).stat().st_mode & 0o777, 0o600)
+        
+        shared = Path(self.temp_dir.name) / "shared"
+        shared.mkdir()
+        shared.chmod(0o777)
+        cache = ScriptCache(str(shared))
+        self.assertIsNone(cache.secret())
+        load_script(str(self.script_path), cache)
+        self.assertEqual(list(shared.iterdir()), [])
+    
+    def test_default_directory(self):
+        """测试默认缓存目录位于用户缓存目录下，而不是脚本旁边"""
+        with mock.patch.dict(os.environ, {"XDG_CACHE_HOME": str(Path(self.temp_dir.name) / "home")}):
+            cache = ScriptCache()
+        self.assertEqual(cache.cache_dir, Path(self.temp_dir.name) / "home" / "dsl")
+        self.assertEqual(cache.cache_path(str(self.script_path)).parent, cache.cache_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,285 @@
+"""
+执行上下文测试
+"""
+
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.symbols import BASE_SYMBOLS
+from src.runtime.execution_context import ExecutionContext, ContextManager, EVICT_CAPACITY, EVICT_IDLE
+
+
+class TestExecutionContext(unittest.TestCase):
+    """执行上下文测试类"""
+
+    def test_name_and_slot_access(self):
+        """测试按名称和按槽位访问的是同一个变量"""
+        symbols = BASE_SYMBOLS.derive()
+        slot = symbols.intern("order_id")
+        context = ExecutionContext("test_user")
+        context.use_symbols(symbols)
+        context.set_variable("order_id", "12345")
+        self.assertEqual(context.get_slot(slot), "12345")
+
+        context.set_slot(slot, "67890")
+        self.assertEqual(context.get_variable("order_id"), "67890")
+        self.assertIsNone(context.get_variable("never_defined_name"))
+
+    def test_slots_sized_per_script(self):
+        """测试槽位只按会话所用脚本的符号表分配，脚本中没有的变量存放在overflow中"""
+        symbols = BASE_SYMBOLS.derive()
+        for name in ("order_id", "name"):
+            symbols.intern(name)
+        # 其他脚本登记的变量名不影响这个会话
+        for index in range(1000):
+            BASE_SYMBOLS.derive().intern(f"other{index}")
+
+        context = ExecutionContext("test_user")
+        context.use_symbols(symbols)
+        self.assertEqual(len(context.values), 3)
+        for index in range(1000):
+            context.set_variable(f"dynamic{index}", index)
+        self.assertEqual(len(context.values), 3)
+        self.assertEqual(len(context.overflow), 1000)
+        self.assertEqual(context.get_variable("dynamic7"), 7)
+        self.assertEqual(len(ExecutionContext("other_user").values), len(BASE_SYMBOLS))
+
+    def test_use_symbols(self):
+        """测试切换符号表：派生的符号表保持槽位，不相关的符号表按名称重新排列"""
+        first = BASE_SYMBOLS.derive()
+        first.intern("order_id")
+        context = ExecutionContext("test_user")
+        context.use_symbols(first)
+        context.set_variables({"order_id": "12345", "reason": "质量问题"})
+        self.assertEqual(context.overflow, {"reason": "质量问题"})
+
+        # 热加载的新版本：原有槽位不变，新登记的变量从overflow移入槽位
+        second = first.derive()
+        second.intern("reason")
+        context.use_symbols(second)
+        self.assertEqual(context.overflow, {})
+        self.assertEqual(context.get_slot(second.lookup("reason")), "质量问题")
+        # 回到旧版本（停留在旧版本中的会话）时布局仍然兼容
+        context.use_symbols(first)
+        self.assertIs(context.symbols, second)
+
+        unrelated = BASE_SYMBOLS.derive()
+        unrelated.intern("reason")
+        unrelated.intern("order_id")
+        context.use_symbols(unrelated)
+        self.assertEqual(context.get_slot(unrelated.lookup("order_id")), "12345")
+        self.assertEqual(context.variables.copy(), {"order_id": "12345", "reason": "质量问题"})
+
+    def test_variables_snapshot(self):
+        """测试variables只包含设置过的变量（值为None的变量也包含在内），clear后清空"""
+        context = ExecutionContext("test_user")
+        context.set_variables({"intent": "订单查询", "confidence": 0.9, "entities": None})
+        self.assertEqual(context.variables, {"intent": "订单查询", "confidence": 0.9, "entities": None})
+
+        context.clear()
+        self.assertEqual(context.variables, {})
+        self.assertIsNone(context.get_variable("intent"))
+
+    def test_variables_writable(self):
+        """测试通过variables写入和删除变量"""
+        context = ExecutionContext("test_user")
+        context.variables["order_id"] = "12345"
+        context.variables["user_intent"] = "订单查询"
+        self.assertEqual(context.get_variable("order_id"), "12345")
+        self.assertEqual(context.get_variable("user_intent"), "订单查询")
+        self.assertEqual(context.variables["order_id"], "12345")
+
+        del context.variables["order_id"]
+        self.assertNotIn("order_id", context.variables)
+        with self.assertRaises(KeyError):
+            del context.variables["order_id"]
+        self.assertEqual(dict(context.variables), {"user_intent": "订单查询"})
+
+
+class TestContextManager(unittest.TestCase):
+    """上下文管理器测试类"""
+
+    def test_shards(self):
+        """测试按用户分片后的查找、移除、计数和清空"""
+        manager = ContextManager(shards=5)
+        self.assertEqual(len(manager.shards), 8)
+        contexts = {user_id: manager.get_context(user_id) for user_id in (f"user{i}" for i in range(100))}
+        self.assertEqual(len(manager), 100)
+        self.assertIs(manager.get_context("user7"), contexts["user7"])
+        self.assertEqual(manager.contexts, contexts)
+
+        manager.remove_context("user7")
+        manager.remove_context("missing")
+        self.assertEqual(len(manager), 99)
+        self.assertIsNot(manager.get_context("user7"), contexts["user7"])
+
+        manager.clear_all()
+        self.assertEqual(len(manager), 0)
+
+    def test_concurrent_creation(self):
+        """测试多个线程同时查找同一批用户时，每个用户只创建一个上下文"""
+        manager = ContextManager()
+        user_ids = [f"user{i}" for i in range(200)]
+        seen = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            seen.append([manager.get_context(user_id) for user_id in user_ids])
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for contexts in seen[1:]:
+            self.assertTrue(all(a is b for a, b in zip(contexts, seen[0])))
+        self.assertEqual(len(manager), 200)
+
+
+class TestContextEviction(unittest.TestCase):
+    """会话淘汰测试类"""
+
+    def setUp(self):
+        self.now = 0.0
+        self.evicted = []
+
+    def create_manager(self, **kwargs) -> ContextManager:
+        return ContextManager(shards=1, clock=lambda: self.now,
+                              on_evict=lambda user_id, context, reason: self.evicted.append((user_id, reason)),
+                              **kwargs)
+
+    def test_idle_ttl(self):
+        """测试空闲超时：清理时只移除过期的会话，访问会刷新空闲时间，过期后再访问得到新的上下文"""
+        manager = self.create_manager(idle_ttl=10)
+        first = manager.get_context("a")
+        manager.get_context("b")
+        self.now = 5.0
+        manager.get_context("c")
+        self.now = 8.0
+        self.assertIs(manager.get_context("a"), first)
+
+        self.now = 14.0
+        self.assertEqual(manager.sweep(), 1)
+        self.assertEqual(self.evicted, [("b", EVICT_IDLE)])
+        self.assertEqual(sorted(manager.contexts), ["a", "c"])
+
+        self.now = 30.0
+        self.assertIsNot(manager.get_context("a"), first)
+        self.assertEqual(self.evicted[1:], [("a", EVICT_IDLE)])
+        self.assertEqual(manager.sweep(), 1)
+        self.assertEqual(sorted(manager.contexts), ["a"])
+
+    def test_max_sessions(self):
+        """测试会话数上限：淘汰最久未访问的会话"""
+        manager = self.create_manager(max_sessions=2)
+        context = manager.get_context("a")
+        manager.get_context("b")
+        manager.get_context("a")
+        manager.get_context("c")
+        self.assertEqual(self.evicted, [("b", EVICT_CAPACITY)])
+        self.assertEqual(list(manager.contexts), ["a", "c"])
+        self.assertIs(manager.get_context("a"), context)
+        self.assertEqual(manager.sweep(), 0)
+
+    def test_max_sessions_across_shards(self):
+        """测试默认分片数下上限是全局的：达到上限之前不淘汰，超过后准确地保持在上限，淘汰最久未访问的会话"""
+        for max_sessions in (2, 32):
+            with self.subTest(max_sessions=max_sessions):
+                self.evicted = []
+                manager = ContextManager(max_sessions=max_sessions, clock=lambda: self.now,
+                                         on_evict=lambda user_id, context, reason:
+                                         self.evicted.append((user_id, reason)))
+                for index in range(max_sessions):
+                    self.now = float(index)
+                    manager.get_context(f"user{index}")
+                self.assertEqual(len(manager), max_sessions)
+                self.assertEqual(self.evicted, [])
+
+                for index in range(max_sessions, max_sessions + 10):
+                    self.now = float(index)
+                    manager.get_context(f"user{index}")
+                    self.assertEqual(len(manager), max_sessions)
+                    self.assertEqual(len(manager.contexts), max_sessions)
+                self.assertEqual(self.evicted, [(f"user{index}", EVICT_CAPACITY) for index in range(10)])
+
+    def test_evict_behind_new_session(self):
+        """测试刚创建的会话位于分片队首时，仍然淘汰它之后最久未访问的会话"""
+        manager = self.create_manager(max_sessions=1)
+        manager.get_context("new")
+        self.now = 1.0
+        manager.max_sessions = None
+        manager.get_context("other")
+        manager.max_sessions = 1
+        evicted = []
+        worker = threading.Thread(target=manager._evict_oldest, args=("new", evicted), daemon=True)
+        worker.start()
+        worker.join(timeout=5)
+        self.assertFalse(worker.is_alive())
+        self.assertEqual([user_id for user_id, _, _ in evicted], ["other"])
+        self.assertEqual(list(manager.contexts), ["new"])
+
+    def test_concurrent_access_with_cap(self):
+        """测试并发访问和按容量淘汰同时进行时，会话数准确保持在上限"""
+        manager = ContextManager(max_sessions=20)
+        errors = []
+
+        def worker(number):
+            try:
+                for index in range(2000):
+                    manager.get_context(f"user{number}-{index % 40}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(number,)) for number in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(manager), 20)
+        self.assertEqual(len(manager.contexts), 20)
+
+    def test_callback_error_and_sweeper(self):
+        """测试回调出错时记录日志、其余会话仍被通知且不影响触发淘汰的调用，以及后台清理线程"""
+        def on_evict(user_id, context, reason):
+            self.evicted.append(user_id)
+            raise RuntimeError("persist failed")
+
+        manager = ContextManager(shards=1, idle_ttl=0.01, on_evict=on_evict)
+        manager.get_context("a")
+        manager.get_context("b")
+        time.sleep(0.02)
+        with self.assertLogs("src.runtime.execution_context", level="ERROR") as logs:
+            self.assertEqual(manager.sweep(), 2)
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(self.evicted, ["a", "b"])
+
+        capped = ContextManager(max_sessions=1, on_evict=on_evict)
+        capped.get_context("x")
+        with self.assertLogs("src.runtime.execution_context", level="ERROR"):
+            self.assertEqual(capped.get_context("y").user_id, "y")
+        self.assertEqual(self.evicted, ["a", "b", "x"])
+        self.assertEqual(len(manager), 0)
+
+        manager.get_context("c")
+        with self.assertLogs("src.runtime.execution_context", level="ERROR"):
+            manager.start_sweeper(interval=0.01)
+            try:
+                deadline = time.monotonic() + 5
+                while len(manager) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                manager.stop_sweeper()
+        self.assertEqual(len(manager), 0)
+        self.assertEqual(self.evicted, ["a", "b", "x", "c"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+脚本热加载测试
+"""
+
+import gc
+import os
+import unittest
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.cache import load_script
+from src.dsl.interpreter import Interpreter
+from src.runtime.execution_context import ExecutionContext
+from src.runtime.hot_reload import ScriptReloader
+
+
+VERSION_1 = '''
+step start {
+    speak "旧版欢迎"
+    listen answer
+    speak "旧版收尾"
+    end
+}
+'''
+
+VERSION_2 = '''
+step start {
+    speak "新版欢迎"
+    listen answer
+    speak "新版收尾"
+    end
+}
+'''
+
+
+class TestScriptReloader(unittest.TestCase):
+    """热加载测试类"""
+    
+    def setUp(self):
+        """设置测试环境"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.script_path = Path(self.temp_dir.name) / "demo.dsl"
+        self.script_path.write_text(VERSION_1, encoding="utf-8")
+        self.interpreter = Interpreter(load_script(str(self.script_path)))
+        self.reloader = ScriptReloader(self.temp_dir.name)
+        self.reloader.watch(str(self.script_path), self.interpreter)
+    
+    def tearDown(self):
+        self.reloader.stop()
+        self.temp_dir.cleanup()
+    
+    def write_script(self, source: str):
+        """写入新版本脚本（修改时间向后推，避免文件系统时间精度导致漏检）"""
+        self.script_path.write_text(source, encoding="utf-8")
+        stat = self.script_path.stat()
+        os.utime(self.script_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    
+    def test_reload_swaps_script(self):
+        """测试脚本变化后替换解释器中的脚本"""
+        old_script = self.interpreter.script
+        self.write_script(VERSION_2)
+        
+        self.assertEqual(self.reloader.check(), [str(self.script_path.resolve())])
+        self.assertIsNot(self.interpreter.script, old_script)
+        self.assertEqual(self.reloader.check(), [])
+        
+        result = self.interpreter.execute(ExecutionContext("new_user"))
+        self.assertIn("新版欢迎", result["message"])
+    
+    def test_session_in_step_finishes_on_old_version(self):
+        """测试停在step中的会话在旧版本上完成该step，之后的新轮次使用新版本"""
+        context = ExecutionContext("user")
+        result = self.interpreter.execute(context)
+        self.assertEqual(result["status"], "waiting_input")
+        
+        self.write_script(VERSION_2)
+        self.reloader.check()
+        self.assertEqual(self.reloader.retained_versions(str(self.script_path)), 1)
+        
+        result = self.interpreter.execute(context, lambda prompt: "好的")
+        self.assertEqual(result["status"], "finished")
+        self.assertIn("旧版收尾", result["message"])
+        
+        # 会话离开step后不再引用旧版本，旧版本随引用计数释放
+        gc.collect()
+        self.assertEqual(self.reloader.retained_versions(str(self.script_path)), 0)
+        context.set_statement_index(0)
+        result = self.interpreter.execute(context)
+        self.assertIn("新版欢迎", result["message"])
+    
+    def test_compile_error_keeps_old_version(self):
+        """测试新版本编译失败时保留旧版本"""
+        old_script = self.interpreter.script
+        self.write_script('step start {\n    speak\n}\n')
+        
+        self.assertEqual(self.reloader.check(), [])
+        self.assertIs(self.interpreter.script, old_script)
+        self.assertIn(str(self.script_path.resolve()), self.reloader.errors)
+
+
+if __name__ == '__main__':
+    unittest.main()
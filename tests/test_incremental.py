@@ -0,0 +1,107 @@
+"""
+增量编译测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser, ParseError
+from src.dsl.cache import compile_source, recompile
+from src.dsl.incremental import incremental_parse, split_steps
+from src.dsl.linker import LinkError
+
+
+SOURCE = '''# 示例脚本
+step start {
+    speak "欢迎"
+    listen user_input
+    branch user_intent == "查询" -> query
+    end
+}
+
+step query {
+    speak "查询中 ${order_id}"  # 行尾注释 }
+    end
+}
+'''
+
+
+def snapshot(script):
+    """提取脚本结构（含行号）用于比较"""
+    return [
+        (step.name, step.line_number, [(repr(s), s.line_number) for s in step.statements])
+        for step in script.steps
+    ]
+
+
+class TestIncrementalParse(unittest.TestCase):
+    """增量编译测试类"""
+    
+    def test_split_steps(self):
+        """测试按 step 块切分源码"""
+        chunks = split_steps(SOURCE)
+        self.assertEqual(len(chunks), 2)
+        self.assertEqual([line for _, _, line in chunks], [2, 9])
+        self.assertTrue(SOURCE[chunks[1][0]:chunks[1][1]].startswith("step query"))
+    
+    def test_same_result_as_parser(self):
+        """测试增量编译结果与整体编译一致"""
+        script = incremental_parse(None, SOURCE)
+        self.assertEqual(snapshot(script), snapshot(Parser(Lexer(SOURCE)).parse()))
+    
+    def test_reuses_unchanged_steps(self):
+        """测试只重新解析发生变化的 step"""
+        previous = incremental_parse(None, SOURCE)
+        edited = SOURCE.replace('speak "欢迎"', 'speak "欢迎光临"\n    speak "新增一行"')
+        
+        before = snapshot(previous)
+        script = incremental_parse(previous, edited)
+        
+        # 未变化的块不重新解析：复用的是节点的拷贝，解析结果（话术模板）与上一版本共享
+        reused = script.get_step("query")
+        self.assertIsNot(reused, previous.steps[1])
+        self.assertIs(reused.statements[0].template, previous.steps[1].statements[0].template)
+        self.assertEqual(reused.fingerprint, previous.steps[1].fingerprint)
+        # 复用的节点行号随位置更新，上一版本的行号保持不变
+        self.assertEqual(snapshot(script), snapshot(Parser(Lexer(edited)).parse()))
+        self.assertEqual(snapshot(previous), before)
+    
+    def test_failed_link_keeps_previous(self):
+        """测试新版本链接失败时，上一版本的行号和跳转目标保持不变"""
+        previous = compile_source(SOURCE)
+        before = snapshot(previous)
+        target = previous.steps[0].statements[2].target
+        edited = "\n\n" + SOURCE.replace("-> query", "-> missing")
+        
+        with self.assertRaises(LinkError) as raised:
+            recompile(previous, edited)
+        self.assertIn("at line 7", str(raised.exception))
+        self.assertEqual(snapshot(previous), before)
+        self.assertIs(previous.steps[0].statements[2].target, target)
+    
+    def test_error_position(self):
+        """测试变化块的错误位置换算为整个脚本中的位置"""
+        previous = incremental_parse(None, SOURCE)
+        edited = SOURCE.replace('    end\n}\n\nstep query', '    speak\n}\n\nstep query')
+        
+        with self.assertRaises(ParseError) as expected:
+            Parser(Lexer(edited)).parse()
+        with self.assertRaises(ParseError) as actual:
+            incremental_parse(previous, edited)
+        self.assertEqual(str(actual.exception), str(expected.exception))
+    
+    def test_irregular_source_falls_back(self):
+        """测试无法切分的源码退回整体编译"""
+        source = 'step a { "unterminated }'
+        self.assertIsNone(split_steps(source))
+        with self.assertRaises(ParseError):
+            incremental_parse(None, source)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -11,6 +11,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.dsl.lexer import Lexer
 from src.dsl.parser import Parser
+from src.dsl.ast import SpeakNode, ListenNode
 from src.dsl.interpreter import Interpreter
 from src.runtime.execution_context import ExecutionContext
 
@@ -120,6 +121,182 @@ step start {
         message = result.get("message", "")
         self.assertIn("张三", message)
 
+    def test_long_jump_chain(self):
+        """测试跳转不消耗调用栈：单轮内连续跳转数千个Step"""
+        steps = 5000
+        source = "\n".join(
+            f'step s{i} {{ speak "第{i}步" branch flag == "go" -> s{i + 1} }}' for i in range(steps)
+        ) + f'\nstep s{steps} {{ speak "完成" end }}'
+        script = Parser(Lexer(source)).parse()
+
+        context = ExecutionContext("test_user")
+        context.set_variable("flag", "go")
+        result = Interpreter(script, step_budget=steps + 1).execute(context)
+        self.assertEqual(result, {"status": "finished", "message": "完成"})
+
+        context = ExecutionContext("test_user")
+        context.set_variable("flag", "go")
+        result = Interpreter(script, step_budget=50).execute(context)
+        self.assertEqual(result["error"], "Step budget exceeded")
+        self.assertEqual(context.get_current_step(), "s50")
+        self.assertTrue(result["message"].startswith("第49步\n"))
+
+    def test_resume_does_not_revisit_statements(self):
+        """测试从listen恢复时直接定位到保存的位置，不再访问之前的语句"""
+        class RecordingList(list):
+            """记录被访问的下标"""
+            def __init__(self, items):
+                super().__init__(items)
+                self.accessed = []
+
+            def __getitem__(self, index):
+                self.accessed.append(index)
+                return super().__getitem__(index)
+
+            def __iter__(self):
+                return (self[index] for index in range(len(self)))
+
+        body = "\n".join(f"    listen answer_{index}" for index in range(1000))
+        script = Parser(Lexer(f"step start {{\n{body}\n    end\n}}\n")).parse()
+        step = script.get_step("start")
+        step.statements = RecordingList(step.statements)
+        interpreter = Interpreter(script)
+        context = ExecutionContext("test_user")
+        for _ in range(998):
+            context.set_pending_input("好的")
+            interpreter.execute(context, lambda prompt: context.get_and_consume_input() or "")
+        self.assertEqual(context.get_statement_index(), 998)
+
+        step.statements.accessed.clear()
+        context.set_pending_input("好的")
+        result = interpreter.execute(context, lambda prompt: context.get_and_consume_input() or "")
+        self.assertEqual(result["status"], "waiting_input")
+        self.assertEqual(result["variable"], "answer_999")
+        self.assertEqual(step.statements.accessed, [998, 999])
+
+    def test_execute_stream(self):
+        """测试流式执行：speak逐条产出，最后是与execute相同的执行结果"""
+        events = list(Interpreter(self.script).execute_stream(ExecutionContext("test_user")))
+        self.assertEqual(events[0], {"event": "speak", "message": "欢迎"})
+        expected = Interpreter(self.script).execute(ExecutionContext("test_user"))
+        self.assertEqual(events[-1], dict(expected, event="status"))
+
+        # 跳转前已经产出的话术不会撤回，执行结果的消息仍只包含新步骤的话术
+        context = ExecutionContext("test_user")
+        context.set_variable("user_intent", "查询")
+        interpreter = Interpreter(self.script)
+        interpreter.execute(context)
+        stream = interpreter.execute_stream(context, lambda prompt: "查询订单")
+        self.assertEqual(next(stream), {"event": "speak", "message": "查询中"})
+        self.assertEqual(list(stream), [{"event": "status", "status": "finished", "message": "查询中"}])
+
+    def test_execute_stream_abandoned(self):
+        """测试流式执行中途被放弃时，这一轮在关闭时执行完毕，会话状态与完整执行相同"""
+        analyzer = lambda text: {"intent": "查询"}
+        expected_context = ExecutionContext("test_user")
+        expected = Interpreter(self.script, analyzer).execute(expected_context, lambda prompt: "查询订单")
+
+        context = ExecutionContext("test_user")
+        stream = Interpreter(self.script, analyzer).execute_stream(context, lambda prompt: "查询订单")
+        self.assertEqual(next(stream), {"event": "speak", "message": "欢迎"})
+        stream.close()
+        self.assertEqual(context.get_current_step(), expected_context.get_current_step())
+        self.assertEqual(context.get_statement_index(), expected_context.get_statement_index())
+        self.assertEqual(context.variables, expected_context.variables)
+        self.assertEqual(context.get_current_step(), "query")
+        self.assertEqual(expected["message"], "查询中")
+
+    def test_speak_template(self):
+        """测试话术编译：常量话术不做替换，未定义的变量保留占位符"""
+        static = SpeakNode("商品名称：智能手表")
+        dynamic = SpeakNode("订单号：${order_id}，${missing}。")
+        self.assertEqual(static.template, ("商品名称：智能手表",))
+        self.assertEqual(dynamic.template, ("订单号：", "order_id", "，", "missing", "。"))
+
+        interpreter = Interpreter(self.script)
+        context = ExecutionContext("test_user")
+        context.set_variable("order_id", 12345)
+        self.assertIs(interpreter._execute_speak(static, context)["message"], static.template[0])
+        self.assertEqual(interpreter._execute_speak(dynamic, context)["message"], "订单号：12345，${missing}。")
+
+    def test_listen_classification(self):
+        """测试编译时确定的意图识别方式与按变量名逐次判断的结果一致"""
+        def legacy_should_recognize(variable_name, user_input):
+            var_lower = variable_name.lower()
+            if "input" in var_lower or "intent" in var_lower:
+                return True
+            data_fields = {"order_id", "complaint_id", "complaint_content", "suggestion_content", "contact_info",
+                           "refund_reason", "refund_reason_code", "refund_reason_detail", "logistics_number", "confirm"}
+            if var_lower in data_fields:
+                if user_input.strip().isdigit():
+                    return False
+                return var_lower.startswith("refund_reason")
+            if user_input.strip().isdigit() and len(user_input.strip()) <= 3:
+                return len(user_input.strip()) == 1 and user_input.strip() in "123456789"
+            return "user" in var_lower or "input" in var_lower
+
+        interpreter = Interpreter(self.script)
+        variables = ["user_input", "User_Intent", "order_id", "ORDER_ID", "refund_reason", "refund_reason_detail",
+                     "confirm", "user_choice", "answer", "logistics_number"]
+        inputs = ["1", " 7 ", "0", "12", "123", "1234", "查询订单", "质量问题", "abc1"]
+        for variable in variables:
+            node = ListenNode(variable)
+            for user_input in inputs:
+                self.assertEqual(interpreter._recognize_input(node.recognize, user_input),
+                                 legacy_should_recognize(variable, user_input), (variable, user_input))
+
+    def test_listen_annotation(self):
+        """测试显式标注的listen语句跳过按变量名的判断"""
+        calls = []
+
+        def analyzer(user_input):
+            calls.append(user_input)
+            return {"intent": "查询"}
+
+        source = '''
+step start {
+    listen order_id intent
+    listen user_input raw
+    end
+}
+'''
+        script = Parser(Lexer(source)).parse()
+        context = ExecutionContext("test_user")
+        interpreter = Interpreter(script, analyzer)
+        interpreter.execute(context, lambda prompt: "12345")
+        self.assertEqual(calls, ["12345"])
+
+    def test_branch_conditions_shipped_scripts(self):
+        """测试结构化条件与按字符串解析条件的结果一致（四个业务场景的所有branch）"""
+        import re
+
+        def legacy_evaluate(condition, context):
+            var_name, operator, value_str = re.match(r'(\w+)\s*(==|!=)\s*(".*?"|\'.*?\'|\w+)', condition).groups()
+            if value_str[0] in '"\'':
+                compare_value = value_str[1:-1]
+            else:
+                compare_value = context.get_variable(value_str)
+                if compare_value is None:
+                    try:
+                        compare_value = float(value_str) if '.' in value_str else int(value_str)
+                    except ValueError:
+                        compare_value = value_str
+            equal = str(context.get_variable(var_name)) == str(compare_value)
+            return equal if operator == "==" else not equal
+
+        interpreter = Interpreter(self.script)
+        scripts_dir = Path(__file__).parent.parent / "scripts"
+        for path in sorted(scripts_dir.glob("*.dsl")):
+            script = Parser(Lexer(path.read_text(encoding="utf-8"))).parse()
+            branches = [s for step in script.steps for s in step.statements if s.node_type.value == "branch"]
+            values = {b.predicate.literal for b in branches} | {None, 1, "", "unknown"}
+            for branch in branches:
+                for value in values:
+                    context = ExecutionContext("test_user")
+                    context.set_variable(branch.predicate.variable, value)
+                    self.assertEqual(interpreter._evaluate_condition(branch, context),
+                                     legacy_evaluate(branch.condition, context), (path.name, branch.condition, value))
+
 
 if __name__ == '__main__':
     unittest.main()
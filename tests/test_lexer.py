@@ -9,7 +9,7 @@ from pathlib import Path
 # 添加项目根目录到路径
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.dsl.lexer import Lexer, Token, TokenType
+from src.dsl.lexer import Lexer, Token, TokenBuffer, TokenType
 
 
 class TestLexer(unittest.TestCase):
@@ -67,6 +67,45 @@ class TestLexer(unittest.TestCase):
         
         number_token = [t for t in tokens if t.token_type == TokenType.NUMBER][0]
         self.assertEqual(number_token.value, "123")
+    
+    def test_engines_produce_same_tokens(self):
+        """测试快速引擎与旧引擎输出一致（含行号和列号）"""
+        sources = [
+            'step start {\n    speak "多行\\n字符串 ${name}"\n    set x = 1.5\n}',
+            "speak 'a\\'b' \"跨\n行\" # 注释\nbranch a != b -> c ! - 中文 ½",
+            '"未闭合的字符串',
+        ]
+        scripts_dir = Path(__file__).parent.parent / "scripts"
+        sources.extend(path.read_text(encoding="utf-8") for path in sorted(scripts_dir.glob("*.dsl")))
+        
+        for source in sources:
+            fast = Lexer(source, engine="fast").tokenize()
+            legacy = Lexer(source, engine="legacy").tokenize()
+            self.assertEqual(
+                [(t.token_type, t.value, t.line_number, t.column) for t in fast],
+                [(t.token_type, t.value, t.line_number, t.column) for t in legacy]
+            )
+    
+    def test_token_buffer(self):
+        """测试结构数组Token缓冲区与Token列表一致"""
+        source = 'step start {\n    speak "你好 ${name}"\n    branch a == 1 -> end_step\n}'
+        tokens = Lexer(source).tokenize()
+        buffer = Lexer(source).tokenize_compact()
+        
+        self.assertIsInstance(buffer, TokenBuffer)
+        self.assertEqual(len(buffer), len(tokens))
+        self.assertEqual(
+            [(t.token_type, t.value, t.line_number, t.column) for t in buffer],
+            [(t.token_type, t.value, t.line_number, t.column) for t in tokens]
+        )
+        self.assertEqual(buffer[-1].token_type, TokenType.EOF)
+        self.assertEqual(buffer.value(5), "你好 ${name}")
+        self.assertFalse(hasattr(tokens[0], "__dict__"))
+    
+    def test_unknown_engine(self):
+        """测试未知引擎名称"""
+        with self.assertRaises(ValueError):
+            Lexer("", engine="unknown")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,201 @@
+"""
+链接器测试
+"""
+
+import pickle
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+from src.dsl.ast import ScriptNode
+from src.dsl.linker import link, LinkError, build_step_graph
+from src.dsl.cache import compile_source
+from src.dsl.interpreter import Interpreter
+from src.runtime.execution_context import ExecutionContext
+
+
+def parse(source: str):
+    return Parser(Lexer(source)).parse()
+
+
+class TestLinker(unittest.TestCase):
+    """链接器测试类"""
+
+    def test_resolve_targets(self):
+        """测试branch目标解析为Step节点"""
+        script = link(parse('''
+        step start {
+            listen user_input
+            branch user_intent == "查询" -> query
+        }
+        step query {
+            speak "查询中"
+        }
+        '''))
+        branch = script.get_step("start").statements[1]
+        self.assertTrue(script.linked)
+        self.assertIs(branch.target, script.get_step("query"))
+        self.assertEqual(build_step_graph(script), {"start": [("query", True)], "query": []})
+
+    def test_missing_target(self):
+        """测试不存在的跳转目标"""
+        script = parse('''
+        step start {
+            listen user_input
+            branch user_intent == "查询" -> query
+        }
+        ''')
+        with self.assertRaises(LinkError) as cm:
+            link(script)
+        self.assertIn("query", str(cm.exception))
+        self.assertIn("line 4", str(cm.exception))
+        self.assertFalse(script.linked)
+
+    def test_unreachable_step(self):
+        """测试不可达的Step"""
+        with self.assertRaises(LinkError) as cm:
+            link(parse('''
+            step start {
+                end
+            }
+            step orphan {
+                end
+            }
+            '''))
+        self.assertIn("orphan", str(cm.exception))
+
+    def test_cycle_without_listen(self):
+        """测试不经过listen的循环"""
+        source = '''
+        step start {
+            branch flag == "1" -> loop
+        }
+        step loop {
+            set flag = "1"
+            branch flag == "1" -> start
+        }
+        '''
+        with self.assertRaises(LinkError) as cm:
+            link(parse(source))
+        self.assertIn("Cycle without listen", str(cm.exception))
+        # 关闭图校验时只解析目标
+        self.assertTrue(link(parse(source), validate=False).linked)
+
+    def test_cycle_with_listen(self):
+        """测试经过listen的循环是合法的"""
+        script = link(parse('''
+        step start {
+            listen user_input
+            branch user_intent == "再来" -> start
+        }
+        '''))
+        self.assertTrue(script.linked)
+
+    def test_shipped_scripts(self):
+        """测试项目自带的脚本都能通过链接校验"""
+        for path in sorted((Path(__file__).parent.parent / "scripts").glob("*.dsl")):
+            with self.subTest(script=path.name):
+                self.assertTrue(compile_source(path.read_text(encoding="utf-8")).linked)
+
+    def test_pickle_relinks(self):
+        """测试序列化后重新解析链接目标"""
+        script = compile_source('''
+        step start {
+            listen user_input
+            branch user_intent == "查询" -> query
+        }
+        step query {
+            speak "查询中"
+        }
+        ''')
+        restored = pickle.loads(pickle.dumps(script))
+        self.assertIs(restored.get_step("start").statements[1].target, restored.get_step("query"))
+
+    def test_shared_steps_not_modified(self):
+        """测试用其他版本已链接的Step构造新脚本时，链接的是拷贝，原版本的跳转目标不变"""
+        previous = compile_source('''
+        step start {
+            listen user_input
+            branch user_input == "查询" -> query
+        }
+        step query {
+            speak "旧版"
+        }
+        ''')
+        start = previous.get_step("start")
+        edited = parse('''
+        step query {
+            speak "新版"
+        }
+        ''')
+        script = link(ScriptNode([start, edited.steps[0]]))
+        
+        self.assertIs(start.statements[1].target, previous.get_step("query"))
+        self.assertIsNot(script.get_step("start"), start)
+        self.assertIs(script.get_step("start").statements[1].target, script.get_step("query"))
+
+    def test_interpreter_uses_linked_target(self):
+        """测试解释器跳转使用链接的目标节点"""
+        script = compile_source('''
+        step start {
+            listen user_input
+            branch user_input == "查询" -> query
+        }
+        step query {
+            speak "查询中"
+            listen order_id
+        }
+        ''')
+        interpreter = Interpreter(script)
+        context = ExecutionContext("user1")
+        inputs = ["查询"]
+        result = interpreter.execute(context, lambda prompt: inputs.pop() if inputs else "")
+        self.assertEqual(result["status"], "waiting_input")
+        self.assertEqual(context.get_current_step(), "query")
+        self.assertIs(context.get_step_node(), script.get_step("query"))
+
+
+    def test_bind_slots(self):
+        """测试链接时把变量名解析为本版本符号表中的槽位下标，反序列化后重新解析"""
+        source = '''
+        step start {
+            speak "订单${order_id}，${name}"
+            listen order_id
+            set name = order_id
+            branch user_intent == expected -> start
+        }
+        '''
+        self.assertIsNone(parse(source).steps[0].statements[1].slot)
+
+        script = compile_source(source)
+        for restored in (script, pickle.loads(pickle.dumps(script))):
+            speak, listen, set_node, branch = restored.steps[0].statements
+            symbols = restored.symbols
+            self.assertEqual(speak.slots, (None, symbols.lookup("order_id"), None, symbols.lookup("name"), None))
+            self.assertEqual(listen.slot, symbols.lookup("order_id"))
+            self.assertEqual((set_node.slot, set_node.value_slot), (symbols.lookup("name"), symbols.lookup("order_id")))
+            self.assertEqual((branch.variable_slot, branch.reference_slot),
+                             (symbols.lookup("user_intent"), symbols.lookup("expected")))
+            # 每个版本的符号表只包含本脚本的变量
+            self.assertEqual(symbols.names, ["user_intent", "order_id", "name", "expected"])
+
+    def test_linked_matches_unlinked(self):
+        """测试按槽位执行（链接后）与按名称执行（未链接）的结果一致"""
+        path = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+        source = path.read_text(encoding="utf-8")
+        inputs = ["查询订单", "12345", "1", "2", "你好", "退款"]
+        runs = []
+        for script in (parse(source), compile_source(source)):
+            interpreter = Interpreter(script, lambda text: {"intent": "订单查询" if "订单" in text else "unknown"})
+            context = ExecutionContext("user1")
+            results = [interpreter.execute(context, lambda prompt, text=text: text) for text in inputs]
+            runs.append((results, context.variables.copy()))
+        self.assertEqual(runs[0], runs[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+运行指标测试
+"""
+
+import threading
+import unittest
+import urllib.request
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import AgentSystem
+from src.runtime.metrics import MetricsRegistry, start_http_server
+from src.runtime.session_store import MemorySessionStore
+
+
+ORDER_SCRIPT = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+
+
+class TestMetrics(unittest.TestCase):
+    """指标注册表测试类"""
+
+    def test_counter_threads(self):
+        """测试多个线程分别累加，汇总值正确（包括已退出线程的累计值）"""
+        registry = MetricsRegistry()
+        counter = registry.counter("events_total", "事件数")
+
+        def work():
+            for _ in range(1000):
+                counter.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counter.inc(5)
+        self.assertEqual(counter.value, 8005)
+        self.assertEqual(len(counter.striped.cells), 1)
+
+    def test_histogram(self):
+        """测试直方图分桶、分位数估计和 Prometheus 文本格式"""
+        registry = MetricsRegistry(prefix="test_")
+        histogram = registry.histogram("latency_seconds", "延迟", buckets=(0.1, 1.0))
+        for value in (0.05, 0.05, 0.5, 2.0):
+            histogram.observe(value)
+        registry.gauge("sessions", "会话数", lambda: 3)
+
+        self.assertEqual(histogram.snapshot(), ([2, 3, 4], 4, 2.6))
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.1)
+        self.assertAlmostEqual(histogram.quantile(0.625), 0.55)
+        self.assertEqual(histogram.quantile(0.99), 1.0)
+        self.assertEqual(registry.export_text(), "\n".join([
+            "# HELP test_latency_seconds 延迟",
+            "# TYPE test_latency_seconds histogram",
+            'test_latency_seconds_bucket{le="0.1"} 2',
+            'test_latency_seconds_bucket{le="1"} 3',
+            'test_latency_seconds_bucket{le="+Inf"} 4',
+            "test_latency_seconds_sum 2.6",
+            "test_latency_seconds_count 4",
+            "# HELP test_sessions 会话数",
+            "# TYPE test_sessions gauge",
+            "test_sessions 3",
+        ]) + "\n")
+
+        with self.assertRaises(ValueError):
+            registry.counter("sessions", "重复的名称")
+
+    def test_http_endpoint(self):
+        """测试本地HTTP端点"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "请求数").inc(2)
+        server = start_http_server(registry, 0)
+        try:
+            url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                body = response.read().decode("utf-8")
+                self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            self.assertIn("requests_total 2", body)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestAgentMetrics(unittest.TestCase):
+    """Agent系统运行指标测试类"""
+
+    def test_turns_and_cache(self):
+        """测试每轮对话的计数、耗时分解、会话数和意图识别缓存命中率"""
+        agent = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, intent_cache_size=16)
+        for user_id in ("a", "b"):
+            for user_input in (None, "12345", "1"):
+                agent.process_user_input(user_id, user_input)
+        list(agent.process_user_input_stream("c"))
+        agent.process_batch([("d", None), ("d", "12345"), ("d", "1")])
+
+        metrics = agent.metrics
+        self.assertEqual(metrics.turns.value, 10)
+        self.assertEqual(metrics.turn_seconds.snapshot()[1], 7)
+        self.assertEqual(metrics.llm_seconds.snapshot()[1], 7)
+        self.assertEqual(metrics.batch_seconds.snapshot()[1], 1)
+        self.assertEqual((metrics.intent_cache_hits.value, metrics.intent_cache_misses.value), (2, 1))
+        self.assertAlmostEqual(metrics.intent_cache_hit_rate(), 2 / 3)
+        self.assertGreater(metrics.llm_seconds.snapshot()[2], 0)
+
+        text = metrics.export_text()
+        self.assertIn("agent_turns_total 10", text)
+        self.assertIn("agent_active_sessions 4", text)
+        self.assertIn('agent_turn_seconds_bucket{le="+Inf"} 7', text)
+
+
+    def test_abandoned_stream(self):
+        """测试流式处理在第一次取值时才开始；中途放弃时这一轮执行完毕，记录耗时并保存会话"""
+        store = MemorySessionStore()
+        agent = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, session_store=store)
+        agent.process_user_input("a")
+        stream = agent.process_user_input_stream("a", "12345")
+        self.assertIsNone(agent.context_manager.get_context("a").get_variable("last_input"))
+
+        self.assertEqual(next(stream)["event"], "speak")
+        stream.close()
+        self.assertEqual(agent.metrics.turns.value, 2)
+        self.assertEqual(store.load("a")["current_step"], "verify_order")
+        self.assertEqual(store.load("a")["variables"]["order_id"], "12345")
+
+
+if __name__ == '__main__':
+    unittest.main()
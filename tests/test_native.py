@@ -0,0 +1,159 @@
+"""
+转译器与转译执行引擎测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+from src.dsl.ast import ScriptNode, StepNode, SpeakNode, BranchNode
+from src.dsl.transpiler import transpile, transpiled_for
+from src.dsl.interpreter import Interpreter
+from src.dsl.native import NativeInterpreter
+from src.main import ScenarioRegistry
+from src.runtime.execution_context import ExecutionContext
+from tests.test_vm import CONVERSATIONS, SCRIPTS_DIR
+
+
+def parse(source: str):
+    return Parser(Lexer(source)).parse()
+
+
+def run_both(script, inputs, **kwargs):
+    """用树遍历解释器和转译执行引擎运行同一组输入，返回两边每轮的结果和会话状态"""
+    transcripts = []
+    for engine in (Interpreter, NativeInterpreter):
+        interpreter = engine(script, **kwargs)
+        context = ExecutionContext("user")
+        turns = []
+        for user_input in inputs:
+            pending = [user_input] if user_input is not None else []
+            result = interpreter.execute(context, lambda prompt: pending.pop() if pending else "")
+            turns.append((result, context.get_current_step(), context.get_statement_index(), dict(context.variables)))
+        transcripts.append(turns)
+    return transcripts
+
+
+class TestTranspiler(unittest.TestCase):
+    """转译器测试类"""
+
+    def test_segments(self):
+        """测试每个Step在第一条语句和每条listen处切分，speak为常量追加，branch为if比较"""
+        transpiled = transpile(parse('''
+        step start {
+            speak "欢迎"
+            listen user_input
+            branch user_intent == "查询" -> query
+            listen answer
+        }
+        step query {
+            end
+        }
+        '''))
+        self.assertEqual(sorted(transpiled.entries["start"]), [0, 1, 3])
+        self.assertEqual(sorted(transpiled.entries["query"]), [0])
+        self.assertIn("append('欢迎')", transpiled.source)
+        self.assertIn("if value == '查询':", transpiled.source)
+        compile(transpiled.source, "<dsl>", "exec")
+
+    def test_transpiled_shared(self):
+        """测试同一脚本版本只转译一次"""
+        script = parse('step start { end }')
+        self.assertIs(transpiled_for(script), transpiled_for(script))
+
+
+class TestNativeInterpreter(unittest.TestCase):
+    """转译执行引擎与树遍历解释器一致性测试类"""
+
+    def test_shipped_scripts(self):
+        """测试四个业务场景的每轮结果与树遍历解释器一致"""
+        registries = [ScenarioRegistry(use_mock_llm=True, use_cache=False, engine=name) for name in ("tree", "native")]
+        for registry in registries:
+            registry.load_directory(str(SCRIPTS_DIR))
+        for scenario in registries[0].scenarios():
+            for number, inputs in enumerate(CONVERSATIONS):
+                user = f"user{number}"
+                with self.subTest(scenario=scenario, conversation=number):
+                    for user_input in [None] + inputs:
+                        results = [registry.process_user_input(scenario, user, user_input) for registry in registries]
+                        self.assertEqual(results[0], results[1])
+                        contexts = [registry.get_context(scenario, user) for registry in registries]
+                        self.assertEqual(contexts[0].current_step, contexts[1].current_step)
+                        self.assertEqual(contexts[0].variables, contexts[1].variables)
+
+    def test_stream_falls_back_to_tree(self):
+        """测试字节码和转译引擎的流式执行沿用树遍历解释器，与普通执行交替进行时结果一致"""
+        tree = ScenarioRegistry(use_mock_llm=True, use_cache=False, engine="tree")
+        tree.load_directory(str(SCRIPTS_DIR))
+        for engine in ("vm", "native"):
+            registry = ScenarioRegistry(use_mock_llm=True, use_cache=False, engine=engine)
+            registry.load_directory(str(SCRIPTS_DIR))
+            for scenario in registry.scenarios():
+                for number, inputs in enumerate(CONVERSATIONS):
+                    user = f"{engine}{number}"
+                    with self.subTest(engine=engine, scenario=scenario, conversation=number):
+                        for turn, user_input in enumerate([None] + inputs):
+                            expected = tree.process_user_input(scenario, user, user_input)
+                            if turn % 2:
+                                events = list(registry.process_user_input_stream(scenario, user, user_input))
+                                result = {k: v for k, v in events[-1].items() if k != "event"}
+                            else:
+                                result = registry.process_user_input(scenario, user, user_input)
+                            self.assertEqual(result, expected)
+
+    def test_resume_after_end(self):
+        """测试end之后、跳转、set引用变量以及Step执行完毕时的执行位置与树遍历解释器一致"""
+        script = parse('''
+        step start {
+            speak ""
+            listen answer
+            branch answer == "go" -> next
+            speak "${missing}"
+            speak "收尾"
+            end
+        }
+        step next {
+            set flag = "1"
+            set copy = answer
+            speak "${flag}号"
+            branch copy != expected -> start
+        }
+        ''')
+        tree, native = run_both(script, [None, "stay", None, "go", None, "go"])
+        self.assertEqual(tree, native)
+
+    def test_resume_inside_segment(self):
+        """测试恢复位置不在片段起点时交给树遍历解释器执行"""
+        script = parse('step start { speak "一" speak "二" listen answer speak "三" }')
+        context = ExecutionContext("user")
+        context.set_current_step("start")
+        context.set_statement_index(1)
+        result = NativeInterpreter(script).execute(context)
+        self.assertEqual(result["message"], "二\n等待用户输入")
+        self.assertEqual(context.get_statement_index(), 2)
+
+    def test_unlinked_errors(self):
+        """测试跳转目标不存在、单轮Step数超限和无效条件"""
+        missing = parse('step start { speak "前" branch a == "None" -> nowhere }')
+        tree, native = run_both(missing, [None])
+        self.assertEqual(tree, native)
+        self.assertEqual(native[0][0]["error"], "Step not found: nowhere")
+
+        loop = parse('step start { speak "循环" branch a == "None" -> start }')
+        tree, native = run_both(loop, [None], step_budget=10)
+        self.assertEqual(tree, native)
+        self.assertEqual(native[0][0]["error"], "Step budget exceeded")
+
+        invalid = ScriptNode([StepNode("start", [SpeakNode("前"), BranchNode("?", "start")])])
+        tree, native = run_both(invalid, [None])
+        self.assertEqual(tree, native)
+        self.assertEqual(native[0][0]["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -10,8 +10,8 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from src.dsl.lexer import Lexer
-from src.dsl.parser import Parser, ParseError
-from src.dsl.ast import StepNode, SpeakNode, ListenNode, BranchNode, SetNode, EndNode
+from src.dsl.parser import Parser, ParseError, StreamingParser
+from src.dsl.ast import StepNode, SpeakNode, ListenNode, BranchNode, SetNode, EndNode, Condition
 
 
 class TestParser(unittest.TestCase):
@@ -50,6 +50,23 @@ step start {
         self.assertIsInstance(listen_node, ListenNode)
         self.assertEqual(listen_node.variable, "user_input")
     
+    def test_parse_listen_annotation(self):
+        """测试解析Listen语句的意图识别标注"""
+        source = '''
+step start {
+    listen order_id intent
+    listen user_input raw
+    listen answer
+    end
+}
+'''
+        statements = Parser(Lexer(source)).parse().steps[0].statements
+        self.assertEqual([s.recognize for s in statements[:3]], ["always", "never", "menu"])
+        self.assertIsInstance(statements[3], EndNode)
+        
+        with self.assertRaises(ParseError):
+            Parser(Lexer('step start {\n    listen order_id maybe\n}')).parse()
+    
     def test_parse_branch(self):
         """测试解析Branch语句"""
         source = '''
@@ -65,6 +82,26 @@ step start {
         self.assertIsInstance(branch_node, BranchNode)
         self.assertEqual(branch_node.condition, 'user_intent == "订单查询"')
         self.assertEqual(branch_node.target_step, "query_order")
+        self.assertEqual(branch_node.predicate, Condition("user_intent", "==", "订单查询"))
+
+    def test_parse_branch_operands(self):
+        """测试Branch条件的操作数类型"""
+        source = '''
+step start {
+    branch count != 10 -> start
+    branch user_intent == expected -> start
+}
+'''
+        lexer = Lexer(source)
+        parser = Parser(lexer)
+        script = parser.parse()
+
+        number, reference = (statement.predicate for statement in script.steps[0].statements)
+        self.assertTrue(number.negate)
+        self.assertEqual(number.literal, "10")
+        self.assertIsNone(number.reference)
+        self.assertEqual(reference.reference, "expected")
+        self.assertEqual(reference.literal, "expected")
     
     def test_parse_set(self):
         """测试解析Set语句"""
@@ -120,6 +157,42 @@ step query {
         
         with self.assertRaises(ParseError):
             parser.parse()
+    
+    def test_streaming_parser_same_result(self):
+        """测试流式解析与一次性解析结果一致"""
+        source = '''
+step start {
+    speak "hello"
+    listen user_input
+    branch user_intent == "查询" -> query
+    set count = 1
+    end
+}
+step query {
+    speak "查询中"
+}
+'''
+        expected = Parser(Lexer(source)).parse()
+        parser = StreamingParser(Lexer(source))
+        script = parser.parse()
+        
+        self.assertEqual([s.name for s in script.steps], [s.name for s in expected.steps])
+        self.assertEqual(
+            [repr(n) for s in script.steps for n in s.statements],
+            [repr(n) for s in expected.steps for n in s.statements]
+        )
+        # 解析结束时缓冲区只剩EOF，不保留完整Token列表
+        self.assertEqual(len(parser.buffer), 1)
+        self.assertEqual(parser.tokens, [])
+    
+    def test_streaming_parser_error_position(self):
+        """测试流式解析的错误行号和列号与一次性解析一致"""
+        for source in ('step start { speak "hello"', 'step a {\n  branch x -> y }', 'step a {\n set x = }'):
+            with self.assertRaises(ParseError) as expected:
+                Parser(Lexer(source)).parse()
+            with self.assertRaises(ParseError) as actual:
+                StreamingParser(Lexer(source)).parse()
+            self.assertEqual(str(actual.exception), str(expected.exception))
 
 
 if __name__ == '__main__':
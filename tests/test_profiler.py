@@ -0,0 +1,116 @@
+"""
+执行剖析器测试
+"""
+
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.interpreter import Interpreter
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+from src.main import ENGINES
+from src.runtime.execution_context import ExecutionContext
+from src.runtime.profiler import Profiler
+
+
+SOURCE = '''step start {
+    speak "欢迎"
+    listen user_input
+    branch user_intent == "查询" -> query
+    end
+}
+step query {
+    speak "查询中"
+    end
+}
+'''
+
+
+class TestProfiler(unittest.TestCase):
+    """执行剖析器测试类"""
+
+    def run_turns(self, engine: str, profiler: Profiler):
+        interpreter = ENGINES[engine](Parser(Lexer(SOURCE)).parse(), lambda text: {"intent": "查询"},
+                                      profiler=profiler)
+        context = ExecutionContext("test_user")
+        interpreter.execute(context)
+        return interpreter.execute(context, lambda prompt: "查询订单")
+
+    def test_counts(self):
+        """测试按Step、语句和意图识别统计次数，各执行引擎结果相同"""
+        for engine in sorted(ENGINES):
+            with self.subTest(engine=engine):
+                profiler = Profiler()
+                result = self.run_turns(engine, profiler)
+                self.assertEqual(result["message"], "查询中")
+
+                snapshot = profiler.snapshot()
+                self.assertEqual({name: stat["count"] for name, stat in snapshot["steps"].items()},
+                                 {"start": 2, "query": 1})
+                self.assertEqual({key: stat["count"] for key, stat in snapshot["statements"].items()}, {
+                    ("start", 2, "speak"): 1,
+                    ("start", 3, "listen"): 2,
+                    ("start", 4, "branch"): 1,
+                    ("query", 8, "speak"): 1,
+                    ("query", 9, "end"): 1,
+                })
+                self.assertEqual(snapshot["intents"]["analyze"]["count"], 1)
+                self.assertEqual(snapshot["intent_inputs"], 1)
+                for stat in snapshot["steps"].values():
+                    self.assertGreaterEqual(stat["total"], stat["max"])
+
+    def test_reset_and_export(self):
+        """测试清空统计，以及导出为按固定顺序排列的制表符分隔文件"""
+        profiler = Profiler()
+        self.run_turns("tree", profiler)
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "profile.tsv"
+            profiler.export(path)
+            lines = path.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines[0].split("\t"), list(Profiler.COLUMNS))
+        self.assertEqual([tuple(line.split("\t")[:5]) for line in lines[1:]], [
+            ("step", "query", "", "", "1"),
+            ("step", "start", "", "", "2"),
+            ("statement", "query", "8", "speak", "1"),
+            ("statement", "query", "9", "end", "1"),
+            ("statement", "start", "2", "speak", "1"),
+            ("statement", "start", "3", "listen", "2"),
+            ("statement", "start", "4", "branch", "1"),
+            ("intent", "", "", "analyze", "1"),
+        ])
+
+        profiler.reset()
+        self.assertEqual(profiler.snapshot(), {"steps": {}, "statements": {}, "intents": {}, "intent_inputs": 0})
+        self.assertEqual(profiler.rows(), [])
+
+    def test_suspended_time_excluded(self):
+        """测试批量执行和流式执行时，挂起期间（批量意图识别、驱动方处理话术）不计入Step和语句的耗时"""
+        def slow_batch(texts):
+            time.sleep(0.2)
+            return [{"intent": "查询"} for _ in texts]
+
+        profiler = Profiler()
+        interpreter = Interpreter(Parser(Lexer(SOURCE)).parse(), lambda text: {"intent": "查询"},
+                                  batch_intent_analyzer=slow_batch, profiler=profiler)
+        contexts = [ExecutionContext(f"user{index}") for index in range(3)]
+        interpreter.execute_batch([(context, None) for context in contexts])
+        results = interpreter.execute_batch([(context, lambda prompt: "查询订单") for context in contexts])
+        self.assertEqual([result["message"] for result in results], ["查询中"] * 3)
+        for context in contexts:
+            for event in interpreter.execute_stream(context):
+                time.sleep(0.05)
+
+        snapshot = profiler.snapshot()
+        self.assertGreaterEqual(snapshot["intents"]["analyze_batch"]["total"], 0.2)
+        for stat in list(snapshot["steps"].values()) + list(snapshot["statements"].values()):
+            self.assertLess(stat["total"], 0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+多业务场景注册表测试
+"""
+
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import ScenarioRegistry
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+FLOW = '''step start {
+    speak "欢迎"
+    listen answer
+    branch answer == "1" -> detail
+    end
+}
+
+step detail {
+    speak "原版详情"
+    end
+}
+'''
+
+# 开头插入一行（复用的 start 行号后移），并修改 detail
+EDITED_FLOW = "# 修改后的版本\n" + FLOW.replace("原版详情", "新版详情")
+
+
+def structure(script):
+    """提取脚本中所有节点的标识、行号和链接结果，用于判断脚本是否被修改"""
+    return [
+        (id(step), step.line_number, [
+            (id(statement), statement.line_number, id(getattr(statement, "target", None)))
+            for statement in step.statements
+        ])
+        for step in script.steps
+    ]
+
+
+class TestScenarioRegistry(unittest.TestCase):
+    """场景注册表测试类"""
+    
+    def setUp(self):
+        """设置测试环境"""
+        self.registry = ScenarioRegistry(use_mock_llm=True, use_cache=False)
+        self.scenarios = self.registry.load_directory(str(SCRIPTS_DIR))
+    
+    def test_load_directory(self):
+        """测试按文件名注册所有场景"""
+        self.assertEqual(self.scenarios, [
+            "after_sales_complaint", "logistics_tracking", "order_inquiry", "refund_application"
+        ])
+        self.assertEqual(len(self.registry.scripts), 4)
+    
+    def test_shared_resources(self):
+        """测试各场景共享意图识别器和上下文管理器，相同脚本只加载一份"""
+        interpreter = self.registry.register("order_copy", str(SCRIPTS_DIR / "order_inquiry.dsl"))
+        
+        self.assertIs(interpreter.script, self.registry.get_interpreter("order_inquiry").script)
+        self.assertEqual(len(self.registry.scripts), 4)
+        analyzers = {self.registry.get_interpreter(s).intent_analyzer for s in self.registry.scenarios()}
+        self.assertEqual(len(analyzers), 1)
+    
+    def test_route_by_scenario(self):
+        """测试按场景ID路由，同一用户在不同场景中的状态相互独立"""
+        result = self.registry.start_conversation("order_inquiry", "user")
+        self.assertIn("订单查询系统", result["message"])
+        result = self.registry.start_conversation("refund_application", "user")
+        self.assertIn("退款申请系统", result["message"])
+        
+        result = self.registry.process_user_input("order_inquiry", "user", "123")
+        self.assertIn("正在验证订单号 123", result["message"])
+        self.assertEqual(len(self.registry.context_manager.contexts), 2)
+    
+    def test_process_user_input_stream(self):
+        """测试流式处理：逐条产出的话术与一次性处理的结果消息一致"""
+        self.registry.start_conversation("order_inquiry", "user")
+        events = list(self.registry.process_user_input_stream("order_inquiry", "user", "123"))
+        self.assertEqual(events[-1]["event"], "status")
+        self.assertEqual(events[-1]["status"], "waiting_input")
+        lines = [event["message"] for event in events[:-1]]
+        self.assertTrue(all(event["event"] == "speak" for event in events[:-1]))
+        self.assertEqual(lines[0], "正在验证订单号 123...")
+        self.assertTrue(events[-1]["message"].startswith("\n".join(lines)))
+    
+    def test_reload_keeps_shared_script(self):
+        """测试内容相同的两个场景共享脚本，重新加载其中一个（成功或失败）不修改共享的版本"""
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ScenarioRegistry(use_mock_llm=True, use_cache=False)
+            paths = [Path(directory) / name for name in ("a.dsl", "b.dsl")]
+            for path in paths:
+                path.write_text(FLOW, encoding="utf-8")
+                registry.register(path.stem, str(path))
+            shared = registry.get_interpreter("a").script
+            self.assertIs(registry.get_interpreter("b").script, shared)
+            before = structure(shared)
+            
+            reloader = registry.enable_hot_reload(directory)
+            reloader.stop()
+            paths[1].write_text(EDITED_FLOW, encoding="utf-8")
+            self.assertTrue(reloader.reload(str(paths[1])))
+            paths[1].write_text(EDITED_FLOW.replace("-> detail", "-> missing"), encoding="utf-8")
+            self.assertFalse(reloader.reload(str(paths[1])))
+            
+            self.assertIs(registry.get_interpreter("a").script, shared)
+            self.assertIsNot(registry.get_interpreter("b").script, shared)
+            self.assertEqual(structure(shared), before)
+    
+    def test_reload_one_of_deduped_scenarios(self):
+        """测试重新加载两个共享脚本的场景之一后，另一个场景仍按自己的流程跳转"""
+        with tempfile.TemporaryDirectory() as directory:
+            registry = ScenarioRegistry(use_mock_llm=True, use_cache=False)
+            paths = [Path(directory) / name for name in ("a.dsl", "b.dsl")]
+            for path in paths:
+                path.write_text(FLOW, encoding="utf-8")
+                registry.register(path.stem, str(path))
+            reloader = registry.enable_hot_reload(directory)
+            reloader.stop()
+            paths[1].write_text(EDITED_FLOW, encoding="utf-8")
+            self.assertTrue(reloader.reload(str(paths[1])))
+            
+            for scenario_id, expected in (("a", "原版详情"), ("b", "新版详情")):
+                registry.start_conversation(scenario_id, "user")
+                result = registry.process_user_input(scenario_id, "user", "1")
+                self.assertIn(expected, result["message"])
+                self.assertNotIn({"a": "新版详情", "b": "原版详情"}[scenario_id], result["message"])
+    
+    def test_unknown_scenario(self):
+        """测试未注册的场景"""
+        with self.assertRaises(KeyError):
+            self.registry.process_user_input("unknown", "user", "hi")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+"""
+会话存储测试
+"""
+
+import datetime
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.main import AgentSystem
+from src.runtime.execution_context import ContextManager, ExecutionContext
+from src.runtime.session_store import MemorySessionStore, SessionStore, SessionStoreClosed, SQLiteSessionStore
+
+
+ORDER_SCRIPT = Path(__file__).parent.parent / "scripts" / "order_inquiry.dsl"
+
+
+class TestSessionStore(unittest.TestCase):
+    """会话存储测试类"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.directory.name) / "sessions.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_and_restore(self):
+        """测试会话状态的导出和恢复"""
+        context = ExecutionContext("test_user")
+        context.set_current_step("query")
+        context.set_statement_index(2)
+        context.set_variables({"order_id": "12345", "entities": {"订单号": "12345"}})
+        state = context.export_state()
+        self.assertEqual(state, {"current_step": "query", "statement_index": 2,
+                                 "variables": {"order_id": "12345", "entities": {"订单号": "12345"}}})
+
+        restored = ExecutionContext("test_user")
+        restored.restore_state(state)
+        self.assertEqual(restored.export_state(), state)
+        self.assertIsNone(restored.get_script())
+
+    def test_sqlite_write_behind(self):
+        """测试延迟写入：多次保存合并为一次，一个批次写入，关闭后重新打开可以读取"""
+        store = SQLiteSessionStore(self.path, flush_interval=60)
+        for index in range(3):
+            store.save("a", {"current_step": "start", "statement_index": index, "variables": {"n": index}})
+        store.save("b", {"current_step": "query", "statement_index": 0, "variables": {}})
+        self.assertEqual(store.load("a")["statement_index"], 2)
+        self.assertEqual(store.flush(), 2)
+        self.assertEqual(store.flush(), 0)
+        self.assertEqual(store.load("a"), {"current_step": "start", "statement_index": 2, "variables": {"n": 2}})
+
+        store.delete("b")
+        self.assertIsNone(store.load("b"))
+        store.save("c", {"current_step": None, "statement_index": 0, "variables": {"名称": "测试"}})
+        store.close()
+
+        reopened = SQLiteSessionStore(self.path)
+        try:
+            self.assertEqual(reopened.load("a")["variables"], {"n": 2})
+            self.assertIsNone(reopened.load("b"))
+            self.assertEqual(reopened.load("c")["variables"], {"名称": "测试"})
+        finally:
+            reopened.close()
+
+    def test_sqlite_closed(self):
+        """测试关闭后的读写抛出 SessionStoreClosed，关闭前的保存已经写入"""
+        store = SQLiteSessionStore(self.path, flush_interval=60)
+        store.save("a", {"current_step": "start", "statement_index": 0, "variables": {}})
+        store.close()
+        store.close()
+        with self.assertRaises(SessionStoreClosed):
+            store.save("b", {"current_step": "start", "statement_index": 0, "variables": {}})
+        with self.assertRaises(SessionStoreClosed):
+            store.load("a")
+        with self.assertRaises(SessionStoreClosed):
+            store.delete("a")
+
+        reopened = SQLiteSessionStore(self.path)
+        try:
+            self.assertIsNotNone(reopened.load("a"))
+            self.assertIsNone(reopened.load("b"))
+        finally:
+            reopened.close()
+
+    def test_abstract_interface(self):
+        """测试没有实现全部读写方法的存储不能实例化"""
+        class PartialStore(SessionStore):
+            def load(self, user_id):
+                return None
+
+        with self.assertRaises(TypeError):
+            PartialStore()
+        with self.assertRaises(TypeError):
+            SessionStore()
+
+    def test_context_manager(self):
+        """测试创建上下文时从存储恢复，淘汰时保存，移除时删除"""
+        store = MemorySessionStore()
+        manager = ContextManager(shards=1, max_sessions=1, store=store)
+        context = manager.get_context("a")
+        context.set_current_step("query")
+        manager.get_context("b")
+        self.assertEqual(store.load("a")["current_step"], "query")
+
+        restored = manager.get_context("a")
+        self.assertIsNot(restored, context)
+        self.assertEqual(restored.get_current_step(), "query")
+
+        manager.remove_context("a")
+        self.assertIsNone(store.load("a"))
+        self.assertIsNone(manager.get_context("a").get_current_step())
+
+    def test_unserializable_variable(self):
+        """测试变量无法序列化时保存失败只记录日志：这一轮的结果照常返回，批量处理中的其他会话不受影响"""
+        agent = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False,
+                            session_store=SQLiteSessionStore(self.path, flush_interval=60))
+        try:
+            for user_id in ("a", "b"):
+                agent.process_user_input(user_id)
+            agent.context_manager.get_context("a").set_variable("created_at", datetime.datetime.now())
+            with self.assertLogs("src.runtime.execution_context", level="ERROR"):
+                self.assertEqual(agent.process_user_input("a", "12345")["status"], "waiting_input")
+            with self.assertLogs("src.runtime.execution_context", level="ERROR"):
+                results = agent.process_batch([("a", "1"), ("b", "12345")])
+            self.assertEqual([result["status"] for result in results], ["waiting_input"] * 2)
+            self.assertEqual(agent.context_manager.store.load("b")["variables"]["order_id"], "12345")
+        finally:
+            agent.close()
+
+    def test_evicted_save_failure(self):
+        """测试淘汰时某个会话保存失败，其余被淘汰的会话仍然保存，淘汰回调照常调用"""
+        now = [0.0]
+        notified = []
+        store = SQLiteSessionStore(self.path, flush_interval=60)
+        manager = ContextManager(shards=1, idle_ttl=10, store=store, clock=lambda: now[0],
+                                 on_evict=lambda user_id, context, reason: notified.append(user_id))
+        manager.get_context("a").set_variable("tags", {"vip"})
+        manager.get_context("b").set_variable("order_id", "12345")
+        now[0] = 20.0
+        with self.assertLogs("src.runtime.execution_context", level="ERROR"):
+            self.assertEqual(manager.sweep(), 2)
+        self.assertEqual(notified, ["a", "b"])
+        self.assertIsNone(store.load("a"))
+        self.assertEqual(store.load("b")["variables"], {"order_id": "12345"})
+        store.close()
+
+    def test_flush_thread_survives_errors(self):
+        """测试后台写入出现任意异常时记录日志并继续重试"""
+        store = SQLiteSessionStore(self.path, flush_interval=0.01)
+        flush = store.flush
+        failures = []
+
+        def failing_flush():
+            if not failures:
+                failures.append(True)
+                raise ValueError("unexpected")
+            return flush()
+
+        store.flush = failing_flush
+        try:
+            with self.assertLogs("src.runtime.session_store", level="ERROR"):
+                store.save("a", {"current_step": "start", "statement_index": 0, "variables": {}})
+                deadline = time.monotonic() + 5
+                while (not failures or store.pending) and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            self.assertTrue(store._thread.is_alive())
+            self.assertEqual(store.pending, {})
+            self.assertEqual(store.flush_count, 1)
+        finally:
+            store.close()
+
+    def test_restart(self):
+        """测试进程重启后会话从中断的位置继续，结果与不中断时相同"""
+        inputs = [None, "12345", "1", "返回主菜单"]
+        for engine in ("tree", "vm", "native"):
+            with self.subTest(engine=engine):
+                uninterrupted = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, engine=engine)
+                expected = [uninterrupted.process_user_input("user", text) for text in inputs]
+
+                path = str(Path(self.directory.name) / f"{engine}.db")
+                agent = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, engine=engine,
+                                    session_store=SQLiteSessionStore(path))
+                results = [agent.process_user_input("user", text) for text in inputs[:2]]
+                agent.close()
+
+                restarted = AgentSystem(str(ORDER_SCRIPT), use_mock_llm=True, use_cache=False, engine=engine,
+                                        session_store=SQLiteSessionStore(path))
+                results += [restarted.process_user_input("user", text) for text in inputs[2:]]
+                restarted.close()
+                self.assertEqual(results, expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+合成脚本生成器测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from benchmarks.synthetic import generate_script
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+from src.dsl.ast import BranchNode, SpeakNode
+
+
+class TestSyntheticScript(unittest.TestCase):
+    """合成脚本生成器测试类"""
+    
+    def test_shape(self):
+        """测试生成的脚本可以解析，且规模符合参数"""
+        source = generate_script(steps=20, statements_per_step=10, string_length=30,
+                                 var_density=2, branch_fanout=4, seed=1)
+        script = Parser(Lexer(source)).parse()
+        
+        self.assertEqual(len(script.steps), 20)
+        self.assertEqual(script.steps[0].name, "start")
+        for step in script.steps:
+            # 10条speak/set + listen + 4条branch + end
+            self.assertEqual(len(step.statements), 16)
+            branches = [s for s in step.statements if isinstance(s, BranchNode)]
+            self.assertEqual(len(branches), 4)
+            self.assertTrue(all(script.get_step(b.target_step) for b in branches))
+        
+        speak = next(s for s in script.steps[0].statements if isinstance(s, SpeakNode))
+        self.assertEqual(speak.message.count("${"), 2)
+        self.assertEqual(len(speak.message), 30)
+    
+    def test_deterministic(self):
+        """测试相同参数和种子生成相同脚本"""
+        self.assertEqual(generate_script(5, seed=3), generate_script(5, seed=3))
+        self.assertNotEqual(generate_script(5, seed=3), generate_script(5, seed=4))
+
+
+if __name__ == '__main__':
+    unittest.main()
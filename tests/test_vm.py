@@ -0,0 +1,149 @@
+"""
+字节码编译器与虚拟机测试
+"""
+
+import unittest
+import sys
+from pathlib import Path
+
+# 添加项目根目录到路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.dsl.lexer import Lexer
+from src.dsl.parser import Parser
+from src.dsl.ast import ScriptNode, StepNode, SpeakNode, BranchNode
+from src.dsl.bytecode import compile_program, program_for, OP_BRANCH, OP_STEP_END
+from src.dsl.interpreter import Interpreter
+from src.dsl.vm import VMInterpreter
+from src.main import ScenarioRegistry
+from src.runtime.execution_context import ExecutionContext
+
+
+SCRIPTS_DIR = Path(__file__).parent.parent / "scripts"
+
+# 覆盖各场景主要分支的输入序列
+CONVERSATIONS = [
+    ["1", "12345", "查看订单详情", "返回主菜单", "2", "退出"],
+    ["查询订单", "abc", "重新查询", "67890", "查看物流信息", "返回主菜单"],
+    ["退款", "12345", "商品质量问题", "确认", "返回主菜单"],
+    ["投诉", "提交投诉", "商品有问题", "13800000000", "查询投诉", "1", "返回主菜单"],
+    ["物流", "SF123456", "返回主菜单", "3", "4", "5", "你好"],
+]
+
+
+def parse(source: str):
+    return Parser(Lexer(source)).parse()
+
+
+def run_both(script, inputs, **kwargs):
+    """用两种执行模式运行同一组输入，返回两边每轮的结果和会话状态"""
+    transcripts = []
+    for engine in (Interpreter, VMInterpreter):
+        interpreter = engine(script, **kwargs)
+        context = ExecutionContext("user")
+        turns = []
+        for user_input in inputs:
+            pending = [user_input] if user_input is not None else []
+            result = interpreter.execute(context, lambda prompt: pending.pop() if pending else "")
+            turns.append((result, context.get_current_step(), context.get_statement_index(), dict(context.variables)))
+        transcripts.append(turns)
+    return transcripts
+
+
+class TestBytecode(unittest.TestCase):
+    """字节码编译测试类"""
+
+    def test_layout(self):
+        """测试每个Step编译为连续的指令段，branch目标为指令地址"""
+        program = compile_program(parse('''
+        step start {
+            speak "欢迎"
+            listen user_input
+            branch user_intent == "查询" -> query
+        }
+        step query {
+            end
+        }
+        '''))
+        self.assertEqual(program.entry, {"start": 0, "query": 4})
+        self.assertEqual(program.opcodes[2], OP_BRANCH)
+        self.assertEqual(program.operands[2][1], 4)
+        self.assertEqual(program.opcodes[3], OP_STEP_END)
+        self.assertEqual(program.step_start, [0, 0, 0, 0, 4, 4])
+        self.assertIn("BRANCH", program.disassemble())
+
+    def test_program_shared(self):
+        """测试同一脚本版本只编译一次"""
+        script = parse('step start { end }')
+        self.assertIs(program_for(script), program_for(script))
+
+
+class TestVMInterpreter(unittest.TestCase):
+    """虚拟机与树遍历解释器一致性测试类"""
+
+    def test_shipped_scripts(self):
+        """测试四个业务场景的每轮结果与树遍历解释器一致"""
+        registries = [ScenarioRegistry(use_mock_llm=True, use_cache=False, engine=name) for name in ("tree", "vm")]
+        for registry in registries:
+            registry.load_directory(str(SCRIPTS_DIR))
+        for scenario in registries[0].scenarios():
+            for number, inputs in enumerate(CONVERSATIONS):
+                user = f"user{number}"
+                with self.subTest(scenario=scenario, conversation=number):
+                    for user_input in [None] + inputs:
+                        results = [registry.process_user_input(scenario, user, user_input) for registry in registries]
+                        self.assertEqual(results[0], results[1])
+                        contexts = [registry.get_context(scenario, user) for registry in registries]
+                        self.assertEqual(contexts[0].current_step, contexts[1].current_step)
+                        self.assertEqual(contexts[0].variables, contexts[1].variables)
+
+    def test_resume_after_end(self):
+        """测试end之后、跳转以及Step执行完毕时的执行位置与树遍历解释器一致"""
+        script = parse('''
+        step start {
+            speak ""
+            listen answer
+            branch answer == "go" -> next
+            speak "收尾"
+            end
+        }
+        step next {
+            set flag = "1"
+            speak "${flag}号"
+        }
+        ''')
+        tree, vm = run_both(script, [None, "stay", None, "go", None, "go"])
+        self.assertEqual(tree, vm)
+
+    def test_unlinked_errors(self):
+        """测试未链接脚本的跳转目标不存在和单轮Step数超限"""
+        missing = parse('''
+        step start {
+            speak "前"
+            branch a == "None" -> nowhere
+        }
+        ''')
+        tree, vm = run_both(missing, [None])
+        self.assertEqual(tree, vm)
+        self.assertEqual(vm[0][0]["error"], "Step not found: nowhere")
+
+        loop = parse('''
+        step start {
+            speak "循环"
+            branch a == "None" -> start
+        }
+        ''')
+        tree, vm = run_both(loop, [None], step_budget=10)
+        self.assertEqual(tree, vm)
+        self.assertEqual(vm[0][0]["error"], "Step budget exceeded")
+
+    def test_invalid_condition(self):
+        """测试执行错误"""
+        script = ScriptNode([StepNode("start", [SpeakNode("前"), BranchNode("?", "start")])])
+        tree, vm = run_both(script, [None])
+        self.assertEqual(tree, vm)
+        self.assertEqual(vm[0][0]["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()